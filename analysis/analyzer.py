@@ -31,7 +31,7 @@ class AIAnalyzer:
     async def predict_trend(self, symbol: str) -> Dict:
         try:
             async with self.exchange_manager.get_exchange('binance', 'spot') as exchange:
-                ohlcv = await exchange.fetch_ohlcv(symbol, timeframe='1h', limit=100)
+                ohlcv = await exchange.fetch_ohlcv(symbol, timeframe='1h', limit=Config.OHLCV_LIMIT)
                 closes = np.array([x[4] for x in ohlcv])
                 
                 sma_short = np.mean(closes[-10:])
@@ -9,19 +9,25 @@ class LiquidityAnalyzer:
      def __init__(self, exchange_manager):
          self.exchange_manager = exchange_manager
 
-     async def get_liquidity_score(self, symbol: str, exchange: str) -> float:
+     async def get_order_book(self, symbol: str, exchange: str, ex_type: str = 'spot') -> Dict:
+        orderbook = self.exchange_manager.live.get_order_book(f"{exchange}_{ex_type}", symbol)
+        if orderbook is not None:
+            return orderbook
+        async with self.exchange_manager.get_exchange(exchange, ex_type) as ex:
+            return await ex.fetch_order_book(symbol, limit=Config.ORDER_BOOK_DEPTH)
+
+     async def get_liquidity_score(self, symbol: str, exchange: str, ex_type: str = 'spot') -> float:
         try:
-            async with self.exchange_manager.get_exchange(exchange, 'spot') as ex:
-                orderbook = await ex.fetch_order_book(symbol, limit=10)
-                
-                bid_volume = sum(x[1] for x in orderbook['bids'])
-                ask_volume = sum(x[1] for x in orderbook['asks'])
-                
-                avg_volume = (bid_volume + ask_volume) / 2
-                price = (orderbook['bids'][0][0] + orderbook['asks'][0][0]) / 2
-                liquidity_score = (avg_volume * price) / 1000000
-                
-                return liquidity_score
+            orderbook = await self.get_order_book(symbol, exchange, ex_type)
+
+            bid_volume = sum(x[1] for x in orderbook['bids'])
+            ask_volume = sum(x[1] for x in orderbook['asks'])
+
+            avg_volume = (bid_volume + ask_volume) / 2
+            price = (orderbook['bids'][0][0] + orderbook['asks'][0][0]) / 2
+            liquidity_score = (avg_volume * price) / 1000000
+
+            return liquidity_score
         except Exception as e:
             logger.error(f"Liquidity check error: {e}")
             return 0.0
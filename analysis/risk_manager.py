@@ -33,8 +33,8 @@ class RiskManager:
     async def calculate_volatility(self, symbol: str, period: str = '1h') -> float:
         try:
             async with self.exchange_manager.get_exchange('binance', 'spot') as exchange:
-                ohlcv = await exchange.fetch_ohlcv(symbol, timeframe=period, limit=24)
-                closes = [x[4] for x in ohlcv]
+                ohlcv = await exchange.fetch_ohlcv(symbol, timeframe=period, limit=Config.OHLCV_LIMIT)
+                closes = np.array([x[4] for x in ohlcv[-24:]])
                 returns = np.diff(closes) / closes[:-1]
                 return np.std(returns) * 100 * np.sqrt(24)
         except Exception as e:
@@ -20,7 +20,7 @@ logger = logging.getLogger(__name__)
 exchange_manager = ExchangeManager()
 trading_engine = TradingEngine(exchange_manager)
 analyzer = AIAnalyzer(exchange_manager)
-position_manager = PositionManager()
+position_manager = PositionManager(exchange_manager)
 auto_strategies = AutoStrategies(exchange_manager)
 
 router = Router()
@@ -368,10 +368,7 @@ async def cmd_balance(message: types.Message):
         balances = {}
         for exchange_name in api_keys:
             try:
-                async with exchange_manager.get_exchange(exchange_name) as exchange:
-                    exchange.apiKey = api_keys[exchange_name]['key']
-                    exchange.secret = api_keys[exchange_name]['secret']
-                    
+                async with exchange_manager.user_clients.client(message.from_user.id, exchange_name) as exchange:
                     balance = await exchange.fetch_balance()
                     usdt_balance = balance['total'].get('USDT', 0)
                     balances[exchange_name] = usdt_balance
@@ -432,6 +429,7 @@ async def cmd_add_api(message: types.Message):
         await db.execute(
             "UPDATE users SET api_keys = ? WHERE user_id = ?",
             (json.dumps(current_keys), message.from_user.id))
+        await exchange_manager.user_clients.invalidate(message.from_user.id)
         
         await message.answer(
             f"✅ API ключи для {exchange.upper()} добавлены\n\n"
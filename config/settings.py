@@ -11,7 +11,7 @@ class Config:
     VIP_PRICE = 50  # $ в месяц
     FREE_SIGNALS = 3
     MIN_PROFIT = 0.3  # Минимальный процент прибыли
-    COMMISSION = 0.2  # Общая комиссия
+    COMMISSION = 0.2  # Общая комиссия (если биржа не сообщает свою, берётся половина на ногу)
     DEFAULT_LEVERAGE = 10  # Плечо по умолчанию для фьючерсов
     AI_MODEL_NAME = "finiteautomata/bertweet-base-sentiment-analysis"
     EXCHANGES = ["binance", "bybit", "bingx"]
@@ -20,6 +20,98 @@ class Config:
     MIN_ARBITRAGE_VOLUME = 1000 #Минимальный объем для арбитража (USDT)
     MAX_RETRIES = 3  # Максимальное количество попыток для API запросов
     RETRY_DELAY = 1.5  # Задержка между попытками в секундах
+    PRICE_DEADLINE = 3.0  # Сколько ждать котировки со всех бирж, сек
+    MAX_QUOTE_SKEW = 1.0  # Допустимый разброс времени получения котировок в одном снимке, сек
+    SNAPSHOT_DEADLINE = 10.0  # Сколько ждать срез тикеров со всех бирж, сек
+    SNAPSHOT_BATCH_SIZE = 10  # Размер пачки запросов fetch_ticker, если биржа не умеет fetch_tickers
+    ORDER_BOOK_DEPTH = 10  # Глубина стакана для анализа ликвидности
+    OHLCV_LIMIT = 100  # Число свечей в запросах анализа (одинаковое, чтобы запросы объединялись)
+    STREAMING_ENABLED = True  # Потоковые котировки через websocket (ccxt.pro)
+    STREAM_MAX_AGE = 5.0  # Котировка из потока считается свежей, сек
+    STREAM_RECONNECT_DELAY = 1.0  # Начальная задержка переподключения потока, сек
+    STREAM_RECONNECT_MAX_DELAY = 60.0  # Максимальная задержка переподключения, сек
+    # Лимиты запросов на биржу и тип рынка: (вес в секунду, максимальный всплеск);
+    # ключ '<биржа>_<тип>' задаёт лимит отдельно для spot или futures
+    RATE_LIMITS = {
+        'binance': (20, 40),
+        'bybit': (10, 20),
+        'bingx': (5, 10),
+        'kucoin': (10, 20),
+        'okx': (10, 20),
+        'default': (5, 10)
+    }
+    # Веса эндпоинтов (остальные методы весят 1)
+    ENDPOINT_WEIGHTS = {
+        'load_markets': 20,
+        'fetch_tickers': 40,
+        'fetch_order_book': 5,
+        'fetch_ohlcv': 2,
+        'fetch_balance': 10,
+        'fetch_positions': 5,
+        'fetch_funding_rates': 10,
+        'fetch_open_orders': 3
+    }
+    # Время жизни кэша рыночных данных по виду, сек
+    CACHE_TTL = {
+        'ticker': 2.0,
+        'order_book': 1.0,
+        'ohlcv': 30.0,
+        'funding': 60.0
+    }
+    CACHE_STALE_FACTOR = 1.0  # Сколько TTL после истечения ещё отдавать старые данные, обновляя в фоне
+    CACHE_MAX_ENTRIES = 5000  # Предел записей кэша (LRU)
+    MARKETS_CACHE_PATH = 'markets_cache.json'  # Файловый кэш метаданных рынков
+    MARKETS_CACHE_MAX_AGE = 6 * 3600  # Возраст кэша рынков, после которого он обновляется при старте, сек
+    MARKETS_REFRESH_INTERVAL = 6  # Период фонового обновления кэша рынков, часы
+    CLIENT_IDLE_TIMEOUT = 300  # Закрывать соединения с биржей после простоя, сек
+    CLIENT_HEALTH_INTERVAL = 60  # Период проверки соединений с биржами, сек
+    BALANCE_REFRESH_INTERVAL = 30  # Фоновое обновление кэша балансов, сек
+    BALANCE_MAX_AGE = 300  # Старше этого баланс запрашивается перед ордером, сек
+    USER_CLIENT_IDLE_TIMEOUT = 900  # Закрывать авторизованные клиенты пользователей после простоя, сек
+    FEE_REFERENCE_SIZE = 1000  # Размер сделки для пересчёта комиссии вывода в %, USDT
+    INCLUDE_TRANSFER_COST = True  # Учитывать вывод базовой валюты с биржи покупки
+    MIN_LIQUIDITY = 0.05  # Минимальная глубина стакана (оценка LiquidityAnalyzer), млн USDT
+    PIPELINE_WORKERS = {  # Воркеры стадий конвейера мониторинга
+        'liquidity': 8,
+        'depth': 8,
+        'risk': 4,
+        'execute': 2,
+        'notify': 4
+    }
+    PIPELINE_VENUE_CONCURRENCY = 4  # Одновременных обращений конвейера к одной бирже
+    PIPELINE_QUEUE_SIZE = 50  # Ёмкость очередей между стадиями
+    MONITOR_INTERVAL = 60  # Период цикла мониторинга, сек
+    MONITOR_MIN_INTERVAL = 30  # Нижняя граница адаптивного периода мониторинга, сек
+    MONITOR_MAX_INTERVAL = 300  # Верхняя граница адаптивного периода мониторинга, сек
+    MONITOR_ADAPTIVE = True  # Подстраивать период мониторинга под длительность цикла
+    MONITOR_OVERLAP = 'coalesce'  # Запуск во время идущего цикла: skip, queue или coalesce
+    MONITOR_JITTER = 1.0  # Случайная задержка запуска цикла, до стольких сек
+    SCHEDULER_ADAPTIVE_HEADROOM = 1.5  # Адаптивный период — сглаженная длительность запуска × столько
+    AUTO_TRADE_ENABLED = False  # Запускать цикл автоторговли (реальные ордера пользователей)
+    AUTO_TRADE_INTERVAL = 60  # Период цикла автоторговли, сек
+    ANALYSIS_SNAPSHOT_TTL = 30  # Снимок анализа рынка моложе этого переиспользуется, сек
+    ANALYSIS_CONCURRENCY = 8  # Одновременно анализируемых символов
+    EXECUTION_SLIPPAGE = 0.1  # Допуск цены лимитных ног арбитража от цены сигнала, %
+    EXECUTION_FILL_TIMEOUT = 5  # Сколько ждать заполнения ноги до отмены остатка, сек
+    EXECUTION_POLL_INTERVAL = 0.2  # Период опроса статуса ордеров ноги, сек
+    MONITOR_PROCESSES = 0  # Процессов-шардов мониторинга (0 — мониторинг в процессе бота)
+    SHARD_REPLICAS = 100  # Виртуальных узлов шарда в кольце консистентного хеширования
+    BUS_URL = ''  # Шина внешних воркеров мониторинга, напр. sqlite:///bus.db (пусто — без воркеров)
+    BUS_HEARTBEAT_INTERVAL = 5  # Период heartbeat воркера, сек
+    BUS_HEARTBEAT_TIMEOUT = 20  # Воркер без heartbeat дольше этого считается выбывшим, сек
+    BUS_POLL_INTERVAL = 0.5  # Период чтения шины ботом, сек
+    BUS_RETENTION = 3600  # Сколько хранить сообщения шины, сек
+    OPPORTUNITY_EXPIRY = 150  # Возможность закрывается, если её не видели столько секунд
+    OPPORTUNITY_RENOTIFY_STEP = 0.5  # Повторное уведомление при росте прибыли на столько п.п.
+    FUNDING_MIN_CARRY = 10.0  # Минимальная годовая доходность разницы фандинга, %
+    FUNDING_REFRESH_LEAD = 120  # За сколько до начисления фандинга обновлять ставки, сек
+    FUNDING_REFRESH_INTERVAL = 600  # Максимальный интервал между обновлениями ставок, сек
+    FUNDING_HISTORY_DAYS = 30  # Сколько хранить историю фандинга, дней
+    BASIS_HORIZON = 24  # За сколько часов учитывать фандинг в доходности базиса
+    PAIR_TIMEFRAME = '1h'  # Таймфрейм скринера пар
+    PAIR_Z_ENTRY = 2.0  # Отклонение спреда пары для сигнала, в сигмах
+    PAIR_MIN_CORRELATION = 0.8  # Минимальная корреляция лог-цен пары
+    PAIR_MAX_HALF_LIFE = 48  # Максимальный период полураспада спреда, баров
     MAX_LEVERAGE = {
         'binance': 20,
         'bybit': 100,
@@ -63,6 +63,30 @@ class Database:
                 last_updated DATETIME,
                 PRIMARY KEY (exchange, symbol)
             );
+            
+            CREATE TABLE IF NOT EXISTS funding_rates (
+                exchange TEXT,
+                symbol TEXT,
+                funding_time INTEGER,
+                rate REAL,
+                PRIMARY KEY (exchange, symbol, funding_time)
+            ) WITHOUT ROWID;
+            
+            CREATE TABLE IF NOT EXISTS opportunity_lifecycles (
+                lifecycle_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                symbol TEXT,
+                buy_exchange TEXT,
+                sell_exchange TEXT,
+                type TEXT,
+                first_seen REAL,
+                last_seen REAL,
+                peak_profit REAL,
+                peak_at REAL,
+                last_profit REAL,
+                decay_rate REAL,
+                observations INTEGER,
+                notified BOOLEAN
+            );
             ''')
 
     async def execute(self, query: str, params: tuple = ()):
@@ -73,6 +97,14 @@ class Database:
             logger.error(f"Database error: {e}")
             raise
 
+    async def execute_many(self, query: str, params: List[tuple]):
+        try:
+            with self.conn:
+                return self.conn.executemany(query, params)
+        except sqlite3.Error as e:
+            logger.error(f"Database error: {e}")
+            raise
+
     async def fetch(self, query: str, params: tuple = ()):
         try:
             with self.conn:
@@ -0,0 +1,172 @@
+import asyncio
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+# (user_id или None для общего клиента, биржа, тип рынка)
+Account = Tuple[Optional[int], str, str]
+Loader = Callable[[], Awaitable[Dict]]
+
+
+class BalanceCache:
+    """Кэш балансов по аккаунтам для предторговых проверок.
+
+    Баланс обновляется в фоне, а не перед каждым ордером. При размещении
+    ордера сумма резервируется сразу, а после подтверждения биржей резерв
+    получает ключ ордера и время подтверждения (``acknowledge``). Резерв
+    снимается только успешным обновлением, начатым после подтверждения:
+    снимок, запрошенный раньше, может ещё не учитывать ордер. События
+    ордеров запускают фоновое обновление (если обновление уже идёт —
+    повторное сразу после него).
+
+    Периодически обновляются только аккаунты с открытыми резервами или
+    использованные за последние ``max_age`` секунд; ``forget`` убирает
+    аккаунт закрытого клиента вместе с его загрузчиком.
+    """
+
+    def __init__(self, refresh_interval: float = Config.BALANCE_REFRESH_INTERVAL,
+                 max_age: float = Config.BALANCE_MAX_AGE):
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.hits = 0
+        self.refreshes = 0
+        self._balances: Dict[Account, Dict] = {}
+        self._updated: Dict[Account, float] = {}
+        self._loaders: Dict[Account, Loader] = {}
+        self._used: Dict[Account, float] = {}
+        self._reservations: Dict[int, Dict] = {}
+        self._refreshing: Dict[Account, asyncio.Future] = {}
+        self._requested: Set[Account] = set()
+        self._ids = itertools.count(1)
+
+    async def refresh(self, account: Account, loader: Optional[Loader] = None) -> Dict:
+        """Загрузка баланса с биржи (одна на аккаунт одновременно)"""
+        if loader is not None:
+            self._loaders[account] = loader
+        if account in self._refreshing:
+            return await asyncio.shield(self._refreshing[account])
+
+        async def load():
+            started = time.monotonic()
+            balance = await self._loaders[account]()
+            if account not in self._loaders:
+                # Аккаунт забыт, пока шёл запрос
+                return balance
+            self._balances[account] = balance
+            self._updated[account] = time.monotonic()
+            self.refreshes += 1
+            for rid, reservation in list(self._reservations.items()):
+                acked_at = reservation['acked_at']
+                if reservation['account'] == account and acked_at is not None and acked_at < started:
+                    del self._reservations[rid]
+            return balance
+
+        def done(_):
+            self._refreshing.pop(account, None)
+            if account in self._requested:
+                self._requested.discard(account)
+                self._refresh_background(account)
+
+        future = asyncio.ensure_future(load())
+        self._refreshing[account] = future
+        future.add_done_callback(done)
+        return await asyncio.shield(future)
+
+    def _refresh_background(self, account: Account) -> None:
+        if account not in self._loaders:
+            return
+        if account in self._refreshing:
+            # Идущее обновление могло начаться до события — повторим после него
+            self._requested.add(account)
+            return
+
+        async def run():
+            try:
+                await self.refresh(account)
+            except Exception as e:
+                logger.warning(f"Background balance refresh failed for {account[1]} ({account[2]}): {e}")
+        asyncio.ensure_future(run())
+
+    def reserved(self, account: Account, currency: str) -> float:
+        return sum(
+            reservation['amount'] for reservation in self._reservations.values()
+            if reservation['account'] == account and reservation['currency'] == currency
+        )
+
+    async def available(self, account: Account, currency: str, loader: Loader) -> float:
+        """Свободный остаток за вычетом резервов; сеть — только если кэша нет"""
+        self._loaders[account] = loader
+        self._used[account] = time.monotonic()
+        age = time.monotonic() - self._updated.get(account, float('-inf'))
+        if account not in self._balances or age > self.max_age:
+            await self.refresh(account)
+        else:
+            self.hits += 1
+            if age > self.refresh_interval:
+                self._refresh_background(account)
+        free = self._balances[account].get('free', {}).get(currency) or 0
+        return free - self.reserved(account, currency)
+
+    def reserve(self, account: Account, currency: str, amount: float) -> int:
+        """Оптимистичное резервирование суммы под ордер"""
+        rid = next(self._ids)
+        self._used[account] = time.monotonic()
+        self._reservations[rid] = {
+            'account': account,
+            'currency': currency,
+            'amount': amount,
+            'order_key': None,
+            'acked_at': None
+        }
+        return rid
+
+    def acknowledge(self, reservation_id: int, order_key: Optional[str] = None) -> None:
+        """Ордер резерва подтверждён биржей; снимет его следующее обновление"""
+        reservation = self._reservations.get(reservation_id)
+        if reservation is not None:
+            reservation['order_key'] = order_key
+            reservation['acked_at'] = time.monotonic()
+
+    def release(self, reservation_id: int) -> None:
+        """Снятие резерва (ордер не был размещён)"""
+        self._reservations.pop(reservation_id, None)
+
+    def invalidate(self, account: Account) -> None:
+        """Событие ордера или исполнения: баланс обновляется в фоне"""
+        self._refresh_background(account)
+
+    def forget(self, account: Account) -> None:
+        """Аккаунт закрытого клиента: загрузчик и баланс больше не нужны.
+
+        Неподтверждённые резервы остаются до ответа биржи на их ордера.
+        """
+        self._loaders.pop(account, None)
+        self._balances.pop(account, None)
+        self._updated.pop(account, None)
+        self._used.pop(account, None)
+        self._requested.discard(account)
+        for rid, reservation in list(self._reservations.items()):
+            if reservation['account'] == account and reservation['acked_at'] is not None:
+                del self._reservations[rid]
+
+    async def refresh_stale(self) -> None:
+        """Фоновое обновление устаревших балансов активных аккаунтов"""
+        now = time.monotonic()
+        reserved = {reservation['account'] for reservation in self._reservations.values()}
+        for account in list(self._loaders):
+            if account not in reserved and now - self._used.get(account, float('-inf')) > self.max_age:
+                continue
+            if now - self._updated.get(account, float('-inf')) > self.refresh_interval:
+                self._refresh_background(account)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'accounts': len(self._balances),
+            'hits': self.hits,
+            'refreshes': self.refreshes,
+            'reservations': len(self._reservations)
+        }
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import time
+import contextlib
+import ccxt
+from typing import Dict, Tuple
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+PoolKey = Tuple[str, str]
+
+
+class ClientPool:
+    """Пул долгоживущих клиентов бирж.
+
+    Клиент не закрывается после каждого запроса: его aiohttp-сессия с
+    keep-alive соединениями живёт между вызовами. Простаивающие дольше
+    ``idle_timeout`` клиенты закрываются (сессия откроется заново при
+    следующем запросе), клиенты с сетевыми ошибками переоткрываются.
+    Ошибка отмечается сама, если ``ccxt.NetworkError`` вышла из блока
+    ``acquire``; вызывающие, которые перехватывают ошибки внутри блока,
+    сообщают о них через ``mark_broken``.
+    """
+
+    def __init__(self, idle_timeout: float = Config.CLIENT_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._clients: Dict[PoolKey, object] = {}
+        self._last_used: Dict[PoolKey, float] = {}
+        self._in_use: Dict[PoolKey, int] = {}
+        self._broken = set()
+        self._keys: Dict[int, PoolKey] = {}
+
+    def register(self, key: PoolKey, client) -> None:
+        """Добавление клиента в пул"""
+        self._clients[key] = client
+        self._keys[id(client)] = key
+        self._in_use.setdefault(key, 0)
+
+    def mark_broken(self, client) -> None:
+        """Переоткрытие клиента после освобождения всеми пользователями"""
+        key = self._keys.get(id(client))
+        if key is not None:
+            self._broken.add(key)
+
+    def __contains__(self, key: PoolKey) -> bool:
+        return key in self._clients
+
+    @contextlib.asynccontextmanager
+    async def acquire(self, key: PoolKey):
+        """Выдача клиента без закрытия соединения после использования"""
+        client = self._clients[key]
+        if key in self._broken and not self._in_use[key]:
+            await self._reset(key)
+        self._in_use[key] += 1
+        try:
+            yield client
+        except ccxt.NetworkError:
+            self._broken.add(key)
+            raise
+        finally:
+            self._in_use[key] -= 1
+            self._last_used[key] = time.monotonic()
+            if key in self._broken and not self._in_use[key]:
+                await self._reset(key)
+
+    def _is_open(self, key: PoolKey) -> bool:
+        return getattr(self._clients[key], 'session', None) is not None
+
+    async def _reset(self, key: PoolKey) -> None:
+        """Закрытие сессии клиента; при следующем запросе ccxt откроет новую"""
+        self._broken.discard(key)
+        try:
+            await self._clients[key].close()
+        except Exception as e:
+            logger.error(f"Error closing exchange {key[0]} ({key[1]}): {e}")
+
+    async def evict_idle(self) -> int:
+        """Закрытие простаивающих соединений"""
+        now = time.monotonic()
+        evicted = 0
+        for key in list(self._clients):
+            if self._in_use[key] or not self._is_open(key):
+                continue
+            if now - self._last_used.get(key, now) >= self.idle_timeout:
+                await self._reset(key)
+                evicted += 1
+        if evicted:
+            logger.info(f"Evicted {evicted} idle exchange clients")
+        return evicted
+
+    async def check_health(self) -> None:
+        """Проверка открытых соединений лёгким запросом"""
+        async def ping(key: PoolKey):
+            client = self._clients[key]
+            try:
+                await client.fetch_time()
+            except Exception as e:
+                logger.warning(f"Health check failed for {key[0]} ({key[1]}): {e}")
+                if not self._in_use[key]:
+                    await self._reset(key)
+                else:
+                    self._broken.add(key)
+
+        keys = [
+            key for key in self._clients
+            if self._is_open(key) and not self._in_use[key]
+            and self._clients[key].has.get('fetchTime')
+        ]
+        await asyncio.gather(*(ping(key) for key in keys))
+
+    async def maintain(self) -> None:
+        """Периодическое обслуживание пула"""
+        await self.evict_idle()
+        await self.check_health()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'clients': len(self._clients),
+            'open': sum(1 for key in self._clients if self._is_open(key)),
+            'in_use': sum(1 for n in self._in_use.values() if n)
+        }
+
+    async def close_all(self) -> None:
+        """Закрытие всех соединений при остановке"""
+        for key in list(self._clients):
+            if self._is_open(key):
+                await self._reset(key)
@@ -0,0 +1,50 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+def freeze(value) -> Hashable:
+    """Приведение аргументов запроса к хешируемому ключу"""
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+class SingleFlight:
+    """Объединение одинаковых одновременных запросов в один.
+
+    Пока запрос с ключом ``key`` выполняется, повторные вызовы с тем же
+    ключом ждут его результат вместо отправки нового запроса.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.saved = 0
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable]):
+        self.calls += 1
+        future = self._inflight.get(key)
+        if future is not None:
+            self.saved += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(factory())
+        self._inflight[key] = future
+
+        def forget(_):
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        future.add_done_callback(forget)
+        return await asyncio.shield(future)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'calls': self.calls,
+            'saved': self.saved,
+            'in_flight': len(self._inflight)
+        }
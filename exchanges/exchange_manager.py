@@ -1,20 +1,38 @@
 import asyncio
 import logging
+import time
 import ccxt
 import contextlib
+import numpy as np
 from typing import Dict, List, Optional, Tuple
 from ccxt.async_support import (binance, bybit, bingx, kucoin, okx)
 from config.settings import Config
+from exchanges.balance_cache import BalanceCache
+from exchanges.client_pool import ClientPool
+from exchanges.coalescing import SingleFlight
+from exchanges.fee_table import FeeTable
+from exchanges.market_cache import TTLCache
+from exchanges.markets_cache import MarketsCache
+from exchanges.rate_limiter import ManagedClient, scheduler_stats
+from exchanges.streaming import LiveMarketCache
+from exchanges.user_clients import UserClientPool
+from strategies.spread_matrix import build_matrices
 
 logger = logging.getLogger(__name__)
 
 class ExchangeManager:
-    def __init__(self):
-        """Инициализация подключений к биржам"""
+    def __init__(self, use_markets_cache: bool = True):
+        """Инициализация подключений к биржам.
+
+        Встроенный лимитер ccxt отключён: все запросы проходят через общий
+        для процесса планировщик биржи и типа рынка (см. ``exchanges.rate_limiter``).
+        Рынки берутся из файлового кэша, если он есть.
+        """
         self.exchanges = {
             'binance': {
-                'spot': binance({'enableRateLimit': True}),
+                'spot': binance({'enableRateLimit': False}),
                 'futures': binance({
+                    'enableRateLimit': False,
                     'options': {
                         'defaultType': 'future',
                         'adjustForTimeDifference': True
@@ -22,8 +40,9 @@ class ExchangeManager:
                 })
             },
             'bybit': {
-                'spot': bybit({'enableRateLimit': True}),
+                'spot': bybit({'enableRateLimit': False}),
                 'futures': bybit({
+                    'enableRateLimit': False,
                     'options': {
                         'defaultType': 'contract',
                         'leverage': 10  # Default leverage
@@ -31,8 +50,9 @@ class ExchangeManager:
                 })
             },
             'bingx': {
-                'spot': bingx({'enableRateLimit': True}),
+                'spot': bingx({'enableRateLimit': False}),
                 'futures': bingx({
+                    'enableRateLimit': False,
                     'options': {
                         'defaultType': 'swap',
                         'adjustForTimeDifference': True
@@ -40,8 +60,9 @@ class ExchangeManager:
                 })
             },
             'kucoin': {
-                'spot': kucoin({'enableRateLimit': True}),
+                'spot': kucoin({'enableRateLimit': False}),
                 'futures': kucoin({
+                    'enableRateLimit': False,
                     'options': {
                         'defaultType': 'futures',
                         'leverage': 3
@@ -49,8 +70,9 @@ class ExchangeManager:
                 })
             },
             'okx': {
-                'spot': okx({'enableRateLimit': True}),
+                'spot': okx({'enableRateLimit': False}),
                 'futures': okx({
+                    'enableRateLimit': False,
                     'options': {
                         'defaultType': 'futures',
                         'leverage': 5
@@ -58,52 +80,211 @@ class ExchangeManager:
                 })
             }
         }
-        self.active_connections = set()
+        self.pool = ClientPool()
+        self.flight = SingleFlight()
+        self.cache = TTLCache()
+        for ex_name, ex_types in self.exchanges.items():
+            for ex_type, client in ex_types.items():
+                self.pool.register((ex_name, ex_type), ManagedClient(client, ex_name, ex_type, self.flight, self.cache))
+        self.live = LiveMarketCache()
+        self.user_clients = UserClientPool(self)
+        self.balances = BalanceCache()
+        self.markets_cache = MarketsCache()
+        self.fees = FeeTable(self)
+        if use_markets_cache:
+            self.markets_cache.apply(self)
 
     @contextlib.asynccontextmanager
     async def get_exchange(self, exchange: str, ex_type: str = 'spot'):
-        """Контекстный менеджер для безопасной работы с биржей"""
-        if exchange not in self.exchanges or ex_type not in self.exchanges[exchange]:
+        """Контекстный менеджер для работы с биржей через пул соединений"""
+        if (exchange, ex_type) not in self.pool:
             raise ValueError(f"Exchange {exchange} {ex_type} not configured")
-            
-        ex = self.exchanges[exchange][ex_type]
-        self.active_connections.add(ex)
-        try:
+
+        async with self.pool.acquire((exchange, ex_type)) as ex:
             yield ex
-        finally:
-            try:
-                await ex.close()
-                self.active_connections.discard(ex)
-            except Exception as e:
-                logger.error(f"Error closing exchange: {e}")
 
-    async def get_prices(self, symbol: str) -> Dict[str, Dict]:
-        """Получение цен на всех биржах"""
-        prices = {}
-        for ex_name, ex_types in self.exchanges.items():
-            ex_type = 'futures' if ':USDT' in symbol else 'spot'
-            if ex_type not in ex_types:
+    def _report_error(self, client, error: Exception) -> None:
+        """Сетевая ошибка, перехваченная внутри ``get_exchange``, помечает клиент в пуле"""
+        if isinstance(error, ccxt.NetworkError):
+            self.pool.mark_broken(client)
+
+    def market_type(self, symbol: str, exchange: Optional[str] = None) -> str:
+        """Тип рынка символа (``spot`` или ``futures``) по метаданным рынков.
+
+        Пока рынки не загружены, используется формат единых символов ccxt:
+        у контрактов после ``:`` указана валюта расчётов.
+        """
+        for ex_name in ([exchange] if exchange else self.exchanges):
+            for client in self.exchanges.get(ex_name, {}).values():
+                market = (client.markets or {}).get(symbol)
+                if market:
+                    return 'futures' if market.get('contract') else 'spot'
+        return 'futures' if ':' in symbol else 'spot'
+
+    @staticmethod
+    def _quote(ticker: Dict, ex_type: str, started: float, received_at: float) -> Dict:
+        """Приведение тикера ccxt к формату котировки.
+
+        ``received_at`` — момент получения тикера от биржи (для тикера из
+        кэша — момент исходного запроса), поэтому ``latency`` отсчитывается
+        от начала опроса только для свежих ответов.
+        """
+        return {
+            'bid': ticker['bid'],
+            'ask': ticker['ask'],
+            'last': ticker['last'],
+            'volume': ticker['baseVolume'],
+            'type': ex_type,
+            'received_at': received_at,
+            'latency': max(0.0, received_at - started)
+        }
+
+    @staticmethod
+    async def wait_all(coros: Dict[str, object], deadline: float, what: str) -> Dict[str, object]:
+        """Параллельный запуск с общим дедлайном; возвращает успевшие результаты.
+
+        Ключи ``coros`` — имена задач (обычно биржи), ``what`` — что
+        запрашивается, для сообщения о превышении дедлайна.
+        """
+        tasks = {asyncio.ensure_future(coro): name for name, coro in coros.items()}
+        if not tasks:
+            return {}
+
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(
+                f"Deadline {deadline}s exceeded for {what}: "
+                f"no answer from {', '.join(sorted(tasks[t] for t in pending))}"
+            )
+
+        results = {}
+        for task in done:
+            if task.cancelled() or task.exception() is not None:
                 continue
-                
-            async with self.get_exchange(ex_name, ex_type) as exchange:
-                for attempt in range(Config.MAX_RETRIES):
-                    try:
-                        ticker = await exchange.fetch_ticker(symbol)
-                        prices[f"{ex_name}_{ex_type}"] = {
-                            'bid': ticker['bid'],
-                            'ask': ticker['ask'],
-                            'last': ticker['last'],
-                            'volume': ticker['baseVolume'],
-                            'type': ex_type
-                        }
-                        break
-                    except Exception as e:
-                        if attempt == Config.MAX_RETRIES - 1:
-                            logger.error(f"Error getting price from {ex_name} ({ex_type}): {e}")
+            if task.result():
+                results[tasks[task]] = task.result()
+        return results
+
+    async def _fetch_price(self, ex_name: str, ex_type: str, symbol: str, started: float) -> Optional[Dict]:
+        """Котировка с одной биржи с повторными попытками"""
+        async with self.get_exchange(ex_name, ex_type) as exchange:
+            for attempt in range(Config.MAX_RETRIES):
+                try:
+                    ticker, received_at = await exchange.fetch_timed('fetch_ticker', symbol)
+                    return self._quote(ticker, ex_type, started, received_at)
+                except Exception as e:
+                    self._report_error(exchange, e)
+                    if attempt == Config.MAX_RETRIES - 1:
+                        logger.error(f"Error getting price from {ex_name} ({ex_type}): {e}")
+                    else:
                         await asyncio.sleep(Config.RETRY_DELAY)
+        return None
+
+    async def get_prices(self, symbol: str, deadline: Optional[float] = None) -> Dict[str, Dict]:
+        """Параллельное получение цен на всех биржах.
+
+        Свежие котировки берутся из потокового кэша ``live``, остальные
+        биржи опрашиваются одновременно; по истечении ``deadline`` секунд
+        возвращаются только успевшие ответить. В каждой котировке есть
+        ``received_at`` (момент получения тикера от биржи, для ответа из
+        кэша — исходного) и ``latency`` (задержка ответа от начала опроса).
+        """
+        deadline = Config.PRICE_DEADLINE if deadline is None else deadline
+        ex_type = self.market_type(symbol)
+        started = time.monotonic()
+        prices = self.live.get_prices(symbol)
 
+        prices.update(await self.wait_all({
+            f"{ex_name}_{ex_type}": self._fetch_price(ex_name, ex_type, symbol, started)
+            for ex_name, ex_types in self.exchanges.items()
+            if ex_type in ex_types and f"{ex_name}_{ex_type}" not in prices
+        }, deadline, symbol))
         return prices
 
+    async def _fetch_venue_tickers(self, ex_name: str, ex_type: str, symbols: List[str],
+                                   started: float) -> Dict[str, Dict]:
+        """Все тикеры биржи одним запросом или пачками по символу"""
+        async with self.get_exchange(ex_name, ex_type) as exchange:
+            try:
+                await exchange.load_markets()
+                symbols = [s for s in symbols if s in exchange.markets]
+            except Exception as e:
+                self._report_error(exchange, e)
+                logger.error(f"Error loading markets for {ex_name} ({ex_type}): {e}")
+                return {}
+            if not symbols:
+                return {}
+
+            if exchange.has.get('fetchTickers'):
+                try:
+                    tickers, received_at = await exchange.fetch_timed('fetch_tickers', symbols)
+                    return {
+                        symbol: self._quote(ticker, ex_type, started, received_at)
+                        for symbol, ticker in tickers.items()
+                        if symbol in symbols
+                    }
+                except Exception as e:
+                    self._report_error(exchange, e)
+                    logger.warning(f"Bulk tickers failed on {ex_name} ({ex_type}), falling back: {e}")
+
+            quotes = {}
+            batch = Config.SNAPSHOT_BATCH_SIZE
+            for i in range(0, len(symbols), batch):
+                chunk = symbols[i:i + batch]
+                tickers = await asyncio.gather(
+                    *(exchange.fetch_timed('fetch_ticker', symbol) for symbol in chunk),
+                    return_exceptions=True
+                )
+                for symbol, timed in zip(chunk, tickers):
+                    if isinstance(timed, Exception):
+                        self._report_error(exchange, timed)
+                        logger.error(f"Error getting price for {symbol} from {ex_name} ({ex_type}): {timed}")
+                        continue
+                    ticker, received_at = timed
+                    quotes[symbol] = self._quote(ticker, ex_type, started, received_at)
+            return quotes
+
+    async def get_snapshot(self, symbols: Optional[List[str]] = None,
+                           deadline: Optional[float] = None) -> Dict:
+        """Срез цен по всем биржам и символам с единым временем снимка.
+
+        Возвращает матрицу ``prices[venue][symbol]`` (venue вида
+        ``binance_spot``) с котировками в формате ``get_prices``.
+        """
+        symbols = symbols or Config.TRADING_PAIRS
+        deadline = Config.SNAPSHOT_DEADLINE if deadline is None else deadline
+        started = time.monotonic()
+        timestamp = time.time()
+
+        by_type = {'spot': [], 'futures': []}
+        for symbol in symbols:
+            by_type[self.market_type(symbol)].append(symbol)
+
+        prices = await self.wait_all({
+            f"{ex_name}_{ex_type}": self._fetch_venue_tickers(ex_name, ex_type, type_symbols, started)
+            for ex_name, ex_types in self.exchanges.items()
+            for ex_type, type_symbols in by_type.items()
+            if type_symbols and ex_type in ex_types
+        }, deadline, 'snapshot')
+
+        return {
+            'timestamp': timestamp,
+            'symbols': list(symbols),
+            'venues': sorted(prices),
+            'prices': prices
+        }
+
+    @staticmethod
+    def snapshot_prices(snapshot: Dict, symbol: str) -> Dict[str, Dict]:
+        """Котировки одного символа из среза в формате ``get_prices``"""
+        return {
+            venue: quotes[symbol]
+            for venue, quotes in snapshot['prices'].items()
+            if symbol in quotes
+        }
+
     async def create_order(
         self,
         exchange: str,
@@ -116,7 +297,7 @@ class ExchangeManager:
         leverage: Optional[int] = None
     ) -> Optional[Dict]:
         """Создание ордера с поддержкой плеча"""
-        ex_type = 'futures' if ':USDT' in symbol else 'spot'
+        ex_type = self.market_type(symbol, exchange)
         
         try:
             async with self.get_exchange(exchange, ex_type) as ex:
@@ -124,28 +305,39 @@ class ExchangeManager:
                 if leverage and ex_type == 'futures':
                     await ex.set_leverage(leverage, symbol)
                 
-                # Проверка баланса
+                # Проверка баланса по кэшу с резервированием суммы
+                account = (None, exchange, ex_type)
+                reservation = None
                 if side == 'buy':
-                    balance = await ex.fetch_balance()
-                    usdt_balance = balance['total'].get('USDT', 0)
+                    usdt_balance = await self.balances.available(account, 'USDT', ex.fetch_balance)
                     required = amount * (price or 1)
                     if usdt_balance < required:
                         logger.warning(f"Insufficient USDT balance: {usdt_balance} < {required}")
                         return None
+                    reservation = self.balances.reserve(account, 'USDT', required)
                 
                 # Создание ордера
                 params = params or {}
                 if ex_type == 'futures':
                     params['timeInForce'] = 'GTC'
                 
-                return await ex.create_order(
-                    symbol=symbol,
-                    type=order_type,
-                    side=side,
-                    amount=amount,
-                    price=price,
-                    params=params
-                )
+                try:
+                    order = await ex.create_order(
+                        symbol=symbol,
+                        type=order_type,
+                        side=side,
+                        amount=amount,
+                        price=price,
+                        params=params
+                    )
+                except Exception:
+                    if reservation is not None:
+                        self.balances.release(reservation)
+                    raise
+                if reservation is not None:
+                    self.balances.acknowledge(reservation, order.get('id'))
+                self.balances.invalidate(account)
+                return order
         except ccxt.InsufficientFunds as e:
             logger.error(f"Insufficient funds: {e}")
             return None
@@ -157,25 +349,30 @@ class ExchangeManager:
             return None
 
     async def find_arbitrage(self, symbol: str, threshold: float = 0.5) -> Dict[str, Dict]:
-        """Поиск арбитражных возможностей"""
+        """Поиск арбитражных возможностей (все пары бирж сразу, NumPy)"""
         prices = await self.get_prices(symbol)
-        opportunities = {}
-        
-        for ex1, data1 in prices.items():
-            for ex2, data2 in prices.items():
-                if ex1 == ex2:
-                    continue
-                    
-                spread = data1['bid'] - data2['ask']
-                if spread > threshold and data1['volume'] > Config.MIN_ARBITRAGE_VOLUME:
-                    opportunities[f"{ex1}-{ex2}"] = {
-                        'buy_at': ex2,
-                        'sell_at': ex1,
-                        'spread': spread,
-                        'volume': min(data1['volume'], data2['volume'])
-                    }
-        
-        return opportunities
+        venues, _, bids, asks, volumes = build_matrices({
+            'symbols': [symbol],
+            'prices': {venue: {symbol: quote} for venue, quote in prices.items()}
+        })
+        if len(venues) < 2:
+            return {}
+
+        with np.errstate(invalid='ignore'):
+            spreads = bids[:, None, 0] - asks[None, :, 0]
+            np.fill_diagonal(spreads, np.nan)
+            mask = (spreads > threshold) & (volumes[:, None, 0] > Config.MIN_ARBITRAGE_VOLUME)
+        pair_volume = np.fmin(volumes[:, None, 0], volumes[None, :, 0])
+
+        return {
+            f"{venues[i]}-{venues[j]}": {
+                'buy_at': venues[j],
+                'sell_at': venues[i],
+                'spread': float(spreads[i, j]),
+                'volume': float(pair_volume[i, j])
+            }
+            for i, j in zip(*np.nonzero(mask))
+        }
 
     async def copy_trade(
         self,
@@ -223,15 +420,15 @@ class ExchangeManager:
                         results.append(order)
                         
             except Exception as e:
+                self._report_error(source_ex, e)
                 logger.error(f"Copy trade error: {e}")
                 
         return results
 
     async def get_balance(self, exchange: str, ex_type: str = 'spot') -> float:
-        """Получение баланса USDT"""
+        """Доступный баланс USDT (из кэша балансов)"""
         async with self.get_exchange(exchange, ex_type) as ex:
-            balance = await ex.fetch_balance()
-            return balance['total'].get('USDT', 0)
+            return await self.balances.available((None, exchange, ex_type), 'USDT', ex.fetch_balance)
 
     async def get_market_data(self, symbol: str, timeframe: str = '1h', limit: int = 100) -> Dict:
         """Сбор рыночных данных для анализа"""
@@ -246,6 +443,7 @@ class ExchangeManager:
                         'spread': (ohlcv[-1][2] - ohlcv[-1][3]) / ohlcv[-1][2] * 100
                     }
                 except Exception as e:
+                    self._report_error(ex, e)
                     logger.error(f"Error getting data from {ex_name}: {e}")
         return data
 
@@ -279,14 +477,33 @@ class ExchangeManager:
                         )
                         results.append(order)
             except Exception as e:
+                self._report_error(ex, e)
                 logger.error(f"Position closing error: {e}")
         return results
 
+    def rate_limit_stats(self) -> Dict[str, Dict]:
+        """Глубина очередей и расход лимитов по биржам"""
+        return scheduler_stats()
+
+    def coalescing_stats(self) -> Dict[str, int]:
+        """Сколько запросов сэкономлено объединением одинаковых вызовов"""
+        return self.flight.stats()
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Попадания и промахи кэша рыночных данных"""
+        return self.cache.stats()
+
+    async def refresh_markets(self) -> int:
+        """Фоновое обновление кэша рынков"""
+        return await self.markets_cache.refresh(self)
+
+    async def maintain(self):
+        """Периодическое обслуживание соединений"""
+        await self.pool.maintain()
+        await self.user_clients.evict_idle()
+        await self.balances.refresh_stale()
+
     async def close_all(self):
-        """Закрытие всех соединений"""
-        for exchange in list(self.active_connections):
-            try:
-                await exchange.close()
-                self.active_connections.discard(exchange)
-            except Exception as e:
-                logger.error(f"Error closing exchange: {e}")
\ No newline at end of file
+        """Закрытие всех соединений (только при остановке бота)"""
+        await self.pool.close_all()
+        await self.user_clients.close_all()
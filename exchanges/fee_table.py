@@ -0,0 +1,173 @@
+import logging
+import math
+import ccxt
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+
+def _step(precision, mode: int) -> Optional[float]:
+    """Шаг округления из ``market['precision']`` с учётом режима точности биржи"""
+    if precision is None:
+        return None
+    if mode == ccxt.TICK_SIZE:
+        return float(precision)
+    if mode == ccxt.DECIMAL_PLACES:
+        return 10.0 ** -precision
+    return None  # значащие цифры не задают постоянного шага
+
+
+def _withdraw_fee(currency: Dict) -> Optional[float]:
+    fee = currency.get('fee')
+    if fee is not None:
+        return float(fee)
+    fees = [n['fee'] for n in (currency.get('networks') or {}).values() if n.get('fee') is not None]
+    return float(min(fees)) if fees else None
+
+
+class FeeTable:
+    """Предрасчитанные комиссии, шаги лота и цены и стоимость вывода.
+
+    Таблица строится по метаданным рынков (markets и currencies клиентов
+    менеджера) на каждую биржу и тип рынка — ``binance_spot``,
+    ``okx_futures`` — и перестраивается, когда клиент получает новые рынки.
+    Матрицы комиссий для векторного расчёта спредов кэшируются по набору
+    бирж и символов, так что в горячем пути остаётся одна операция
+    сложения массивов.
+    """
+
+    def __init__(self, exchange_manager, default_taker: float = Config.COMMISSION / 2,
+                 reference_size: float = Config.FEE_REFERENCE_SIZE,
+                 include_transfer: bool = Config.INCLUDE_TRANSFER_COST):
+        self.exchange_manager = exchange_manager
+        self.default_taker = default_taker
+        self.reference_size = reference_size
+        self.include_transfer = include_transfer
+        self._venues: Dict[str, Tuple[int, Dict[str, Dict], Dict[str, float]]] = {}
+        self._matrices: Dict[Tuple, Tuple[Tuple, np.ndarray, np.ndarray]] = {}
+
+    def _build(self, client) -> Tuple[Dict[str, Dict], Dict[str, float]]:
+        mode = client.precisionMode
+        trading = client.fees.get('trading', {}) if client.fees else {}
+        markets = {}
+        for symbol, market in client.markets.items():
+            precision = market.get('precision') or {}
+            limits = market.get('limits') or {}
+            taker = market.get('taker', trading.get('taker'))
+            maker = market.get('maker', trading.get('maker'))
+            markets[symbol] = {
+                'base': market.get('base'),
+                'taker': taker * 100 if taker is not None else self.default_taker,
+                'maker': maker * 100 if maker is not None else self.default_taker,
+                'amount_step': _step(precision.get('amount'), mode),
+                'price_step': _step(precision.get('price'), mode),
+                'min_amount': (limits.get('amount') or {}).get('min'),
+                'min_cost': (limits.get('cost') or {}).get('min')
+            }
+        withdraw = {
+            code: fee for code, fee in
+            ((code, _withdraw_fee(currency)) for code, currency in (client.currencies or {}).items())
+            if fee is not None
+        }
+        return markets, withdraw
+
+    def venue(self, venue: str) -> Tuple[Dict[str, Dict], Dict[str, float]]:
+        """Таблица биржи: (параметры по символам, комиссии вывода по валютам)"""
+        ex_name, ex_type = venue.rsplit('_', 1)
+        client = self.exchange_manager.exchanges.get(ex_name, {}).get(ex_type)
+        if client is None or not client.markets:
+            return {}, {}
+        cached = self._venues.get(venue)
+        if cached is None or cached[0] != id(client.markets):
+            try:
+                markets, withdraw = self._build(client)
+            except Exception as e:
+                logger.error(f"Cannot build fee table for {venue}: {e}")
+                markets, withdraw = {}, {}
+            cached = (id(client.markets), markets, withdraw if ex_type == 'spot' else {})
+            self._venues[venue] = cached
+        return cached[1], cached[2]
+
+    def market(self, venue: str, symbol: str) -> Dict:
+        return self.venue(venue)[0].get(symbol, {})
+
+    def taker(self, venue: str, symbol: str) -> float:
+        """Комиссия тейкера в %"""
+        return self.market(venue, symbol).get('taker', self.default_taker)
+
+    def _versions(self, venues: List[str]) -> Tuple:
+        for venue in venues:
+            self.venue(venue)
+        return tuple(self._venues.get(venue, (None,))[0] for venue in venues)
+
+    def _tables(self, venues: List[str], symbols: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        key = (tuple(venues), tuple(symbols))
+        versions = self._versions(venues)
+        cached = self._matrices.get(key)
+        if cached is None or cached[0] != versions:
+            taker = np.full((len(venues), len(symbols)), self.default_taker)
+            withdraw = np.zeros((len(venues), len(symbols)))
+            for i, venue in enumerate(venues):
+                markets, fees = self.venue(venue)
+                for j, symbol in enumerate(symbols):
+                    market = markets.get(symbol)
+                    if market:
+                        taker[i, j] = market['taker']
+                        withdraw[i, j] = fees.get(market['base'], 0.0)
+            if len(self._matrices) > 64:
+                self._matrices.clear()
+            cached = (versions, taker, withdraw)
+            self._matrices[key] = cached
+        return cached[1], cached[2]
+
+    def taker_matrix(self, venues: List[str], symbols: List[str]) -> np.ndarray:
+        """Комиссии тейкера в % (биржа × символ)"""
+        return self._tables(venues, symbols)[0]
+
+    def spread_costs(self, venues: List[str], symbols: List[str],
+                     asks: Optional[np.ndarray] = None) -> np.ndarray:
+        """Издержки в % для ``compute_spreads``: ``[sell, buy, symbol]``.
+
+        Комиссии тейкера обеих ног плюс (если включено) вывод базовой
+        валюты с биржи покупки, отнесённый к сделке ``reference_size`` USDT.
+        """
+        taker, withdraw = self._tables(venues, symbols)
+        costs = taker[:, None, :] + taker[None, :, :]
+        if self.include_transfer and asks is not None:
+            with np.errstate(invalid='ignore'):
+                transfer = np.nan_to_num(withdraw * asks / self.reference_size * 100)
+            costs = costs + transfer[None, :, :]
+        return costs
+
+    def pair_cost(self, buy_venue: str, sell_venue: str, symbol: str, ask: Optional[float] = None) -> float:
+        """Издержки одной пары бирж в % (как ``spread_costs`` для одного элемента)"""
+        cost = self.taker(buy_venue, symbol) + self.taker(sell_venue, symbol)
+        if self.include_transfer and ask:
+            base = self.market(buy_venue, symbol).get('base')
+            cost += self.venue(buy_venue)[1].get(base, 0.0) * ask / self.reference_size * 100
+        return cost
+
+    def round_amount(self, symbol: str, amount: float, *venues: str, price: Optional[float] = None) -> float:
+        """Объём, кратный шагу лота всех бирж; 0, если ниже минимумов"""
+        markets = [self.market(venue, symbol) for venue in venues]
+        steps = [m['amount_step'] for m in markets if m.get('amount_step')]
+        if steps:
+            step = max(steps)
+            amount = math.floor(amount / step + 1e-9) * step
+        for market in markets:
+            if market.get('min_amount') and amount < market['min_amount']:
+                return 0.0
+            if price and market.get('min_cost') and amount * price < market['min_cost']:
+                return 0.0
+        return amount
+
+    def round_price(self, venue: str, symbol: str, price: float, side: str) -> float:
+        """Цена лимитного ордера на сетке тиков (покупка — вниз, продажа — вверх)"""
+        step = self.market(venue, symbol).get('price_step')
+        if not step:
+            return price
+        ticks = price / step
+        ticks = math.floor(ticks + 1e-9) if side == 'buy' else math.ceil(ticks - 1e-9)
+        return ticks * step
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+# Вид данных для кэшируемых методов ccxt
+METHOD_KINDS = {
+    'fetch_ticker': 'ticker',
+    'fetch_tickers': 'ticker',
+    'fetch_order_book': 'order_book',
+    'fetch_ohlcv': 'ohlcv',
+    'fetch_funding_rate': 'funding',
+    'fetch_funding_rates': 'funding'
+}
+
+
+class TTLCache:
+    """LRU-кэш рыночных данных со сроком жизни по виду данных.
+
+    Запись младше TTL отдаётся из кэша. Запись старше TTL, но не старше
+    ``TTL * (1 + stale_factor)``, тоже отдаётся сразу, а в фоне
+    запускается её обновление (stale-while-revalidate). Остальное
+    загружается заново. При превышении ``max_entries`` вытесняются
+    давно не использовавшиеся записи.
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None,
+                 max_entries: int = Config.CACHE_MAX_ENTRIES,
+                 stale_factor: float = Config.CACHE_STALE_FACTOR):
+        self.ttls = ttls or Config.CACHE_TTL
+        self.max_entries = max_entries
+        self.stale_factor = stale_factor
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, list]" = OrderedDict()
+        self._refreshing = set()
+
+    def _store(self, key: Hashable, value) -> None:
+        self._data[key] = [time.monotonic(), value]
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def _refresh(self, key: Hashable, loader: Callable[[], Awaitable]) -> None:
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                self._store(key, await loader())
+            except Exception as e:
+                logger.warning(f"Background cache refresh failed: {e}")
+            finally:
+                self._refreshing.discard(key)
+
+        self._refreshing.add(key)
+        asyncio.ensure_future(refresh())
+
+    async def get_timed(self, kind: str, key: Hashable, loader: Callable[[], Awaitable]) -> Tuple[object, float]:
+        """Значение и момент его загрузки (``time.monotonic``).
+
+        Для записей из кэша, в том числе устаревших, возвращается время
+        исходной загрузки, а не время обращения.
+        """
+        ttl = self.ttls.get(kind, 0)
+        entry = self._data.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age <= ttl:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return entry[1], entry[0]
+            if age <= ttl * (1 + self.stale_factor):
+                self.stale_hits += 1
+                self._data.move_to_end(key)
+                self._refresh(key, loader)
+                return entry[1], entry[0]
+
+        self.misses += 1
+        value = await loader()
+        self._store(key, value)
+        return value, self._data[key][0]
+
+    async def get(self, kind: str, key: Hashable, loader: Callable[[], Awaitable]):
+        value, _ = await self.get_timed(kind, key, loader)
+        return value
+
+    def invalidate(self, kind: Optional[str] = None) -> None:
+        if kind is None:
+            self._data.clear()
+        else:
+            for key in [k for k in self._data if METHOD_KINDS.get(k[1]) == kind]:
+                del self._data[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._data)
+        }
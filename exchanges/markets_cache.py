@@ -0,0 +1,145 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import ccxt
+from typing import Dict, Optional
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+# Меняется при изменении формата файла
+MARKETS_CACHE_VERSION = 1
+
+# Разобранные файлы кэша, общие для всех ExchangeManager процесса
+_loaded: Dict[str, Dict] = {}
+
+
+class MarketsCache:
+    """Версионированный файловый кэш метаданных рынков.
+
+    Хранит markets и currencies (символы, точность, лимиты, параметры
+    контрактов) всех клиентов менеджера, чтобы при старте не вызывать
+    ``load_markets`` у каждой биржи. Файл с другой версией формата или
+    другой версией ccxt игнорируется.
+    """
+
+    def __init__(self, path: str = Config.MARKETS_CACHE_PATH,
+                 max_age: float = Config.MARKETS_CACHE_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+
+    def load(self) -> Dict:
+        if self.path in _loaded:
+            return _loaded[self.path]
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Markets cache {self.path} is unreadable: {e}")
+            return {}
+        if data.get('version') != MARKETS_CACHE_VERSION or data.get('ccxt') != ccxt.__version__:
+            logger.info(f"Markets cache {self.path} is outdated, ignoring")
+            return {}
+        _loaded[self.path] = data
+        return data
+
+    def save(self, venues: Dict[str, Dict]) -> None:
+        data = {
+            'version': MARKETS_CACHE_VERSION,
+            'ccxt': ccxt.__version__,
+            'updated': time.time(),
+            'venues': venues
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+        _loaded[self.path] = data
+
+    def is_stale(self) -> bool:
+        updated = self.load().get('updated')
+        return updated is None or time.time() - updated > self.max_age
+
+    def apply(self, exchange_manager) -> int:
+        """Установка рынков из кэша в клиенты менеджера"""
+        venues = self.load().get('venues', {})
+        applied = 0
+        for ex_name, ex_types in exchange_manager.exchanges.items():
+            for ex_type, client in ex_types.items():
+                cached = venues.get(f"{ex_name}_{ex_type}")
+                if not cached or client.markets:
+                    continue
+                try:
+                    client.set_markets(cached['markets'], cached.get('currencies'))
+                    applied += 1
+                except Exception as e:
+                    logger.warning(f"Cannot apply cached markets for {ex_name} ({ex_type}): {e}")
+        return applied
+
+    async def refresh(self, exchange_manager) -> int:
+        """Перезагрузка рынков со всех бирж и запись кэша"""
+        async def reload(ex_name: str, ex_type: str):
+            async with exchange_manager.get_exchange(ex_name, ex_type) as ex:
+                await ex.load_markets(True)
+                return {'markets': ex.markets, 'currencies': ex.currencies}
+
+        keys = [
+            (ex_name, ex_type)
+            for ex_name, ex_types in exchange_manager.exchanges.items()
+            for ex_type in ex_types
+        ]
+        results = await asyncio.gather(*(reload(*key) for key in keys), return_exceptions=True)
+
+        venues = dict(self.load().get('venues', {}))
+        refreshed = 0
+        for (ex_name, ex_type), result in zip(keys, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error loading markets for {ex_name} ({ex_type}): {result}")
+                continue
+            venues[f"{ex_name}_{ex_type}"] = result
+            refreshed += 1
+        if refreshed:
+            await asyncio.get_running_loop().run_in_executor(None, self.save, venues)
+            logger.info(f"Markets cache updated for {refreshed} venues")
+        return refreshed
+
+
+async def benchmark_first_quote(symbol: str = 'BTC/USDT', path: Optional[str] = None) -> Dict[str, float]:
+    """Время до первой котировки по всем биржам с кэшем рынков и без него"""
+    from exchanges.exchange_manager import ExchangeManager
+
+    cache = MarketsCache(path or Config.MARKETS_CACHE_PATH)
+    # Пауза, чтобы общие лимиты запросов успели восстановиться между замерами
+    refill = max(capacity / rate for rate, capacity in Config.RATE_LIMITS.values())
+
+    async def first_quote(use_cache: bool) -> float:
+        manager = ExchangeManager(use_markets_cache=False)
+        started = time.monotonic()
+        if use_cache:
+            _loaded.pop(cache.path, None)  # время разбора файла входит в замер
+            cache.apply(manager)
+        await manager.get_prices(symbol, deadline=60)
+        elapsed = time.monotonic() - started
+        await manager.close_all()
+        await asyncio.sleep(refill)
+        return elapsed
+
+    if cache.is_stale():
+        manager = ExchangeManager(use_markets_cache=False)
+        await cache.refresh(manager)
+        await manager.close_all()
+        await asyncio.sleep(refill)
+
+    return {
+        'without_cache': await first_quote(False),
+        'with_cache': await first_quote(True)
+    }
+
+
+if __name__ == "__main__":
+    for name, seconds in asyncio.run(benchmark_first_quote()).items():
+        print(f"{name}: {seconds:.2f}s")
@@ -0,0 +1,222 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Dict, Optional, Tuple
+from config.settings import Config
+from exchanges.coalescing import SingleFlight, freeze
+from exchanges.market_cache import METHOD_KINDS, TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты запросов: чем меньше, тем раньше
+PRIORITY_ORDER = 0
+PRIORITY_ACCOUNT = 1
+PRIORITY_MARKET_DATA = 2
+
+ORDER_METHODS = {'create_order', 'cancel_order', 'cancel_all_orders', 'edit_order', 'set_leverage'}
+ACCOUNT_METHODS = {'fetch_balance', 'fetch_positions', 'fetch_order', 'fetch_orders',
+                   'fetch_open_orders', 'fetch_my_trades'}
+
+
+def method_priority(method: str) -> int:
+    if method in ORDER_METHODS:
+        return PRIORITY_ORDER
+    if method in ACCOUNT_METHODS:
+        return PRIORITY_ACCOUNT
+    return PRIORITY_MARKET_DATA
+
+
+class TokenBucket:
+    """Ведро токенов: ``rate`` единиц веса в секунду, не больше ``capacity``"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, weight: float) -> float:
+        """Сколько ждать, пока в ведре наберётся ``weight`` токенов"""
+        self._refill()
+        weight = min(weight, self.capacity)
+        if self.tokens >= weight:
+            return 0.0
+        return (weight - self.tokens) / self.rate
+
+    def consume(self, weight: float) -> None:
+        self._refill()
+        self.tokens -= min(weight, self.capacity)
+
+
+class RequestScheduler:
+    """Общая для процесса очередь запросов к одной бирже.
+
+    Каждый запрос ждёт токены по весу эндпоинта; ордера обслуживаются
+    раньше запросов баланса, а те — раньше рыночных данных.
+    """
+
+    def __init__(self, venue: str, rate: float, capacity: float):
+        self.venue = venue
+        self.bucket = TokenBucket(rate, capacity)
+        self.served = 0
+        self._heap = []
+        self._seq = itertools.count()
+        self._loop = None
+        self._wakeup = None
+        self._worker = None
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._heap = []
+            self._wakeup = asyncio.Event()
+            self._worker = None
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+
+    async def acquire(self, method: str, priority: Optional[int] = None) -> None:
+        """Ожидание очереди и токенов для вызова ``method``"""
+        self._ensure_worker()
+        weight = Config.ENDPOINT_WEIGHTS.get(method, 1)
+        priority = method_priority(method) if priority is None else priority
+        future = self._loop.create_future()
+        heapq.heappush(self._heap, (priority, next(self._seq), weight, future))
+        self._wakeup.set()
+        await future
+
+    async def _run(self) -> None:
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            priority, seq, weight, future = self._heap[0]
+            if future.done():
+                heapq.heappop(self._heap)
+                continue
+
+            wait = self.bucket.wait_time(weight)
+            if wait > 0:
+                # Просыпаемся раньше, если пришёл запрос с более высоким приоритетом
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            self.bucket.consume(weight)
+            self.served += 1
+            future.set_result(None)
+
+    def queue_depth(self) -> Dict[int, int]:
+        """Число ожидающих запросов по приоритетам"""
+        depth = {PRIORITY_ORDER: 0, PRIORITY_ACCOUNT: 0, PRIORITY_MARKET_DATA: 0}
+        for priority, _, _, future in self._heap:
+            if not future.done():
+                depth[priority] = depth.get(priority, 0) + 1
+        return depth
+
+    def stats(self) -> Dict:
+        return {
+            'queued': sum(self.queue_depth().values()),
+            'by_priority': self.queue_depth(),
+            'served': self.served,
+            'tokens': round(self.bucket.tokens, 2)
+        }
+
+
+_schedulers: Dict[Tuple[str, str], RequestScheduler] = {}
+
+
+def get_scheduler(exchange: str, ex_type: str = 'spot') -> RequestScheduler:
+    """Планировщик биржи и типа рынка, общий для всех ExchangeManager в процессе.
+
+    Спотовый и фьючерсный API бирж лимитируются раздельно, поэтому у
+    каждого типа рынка своё ведро. Лимит берётся из ``RATE_LIMITS`` по
+    ключу ``'<биржа>_<тип>'``, затем по бирже.
+    """
+    key = (exchange, ex_type)
+    if key not in _schedulers:
+        venue = f"{exchange}_{ex_type}"
+        rate, capacity = Config.RATE_LIMITS.get(
+            venue, Config.RATE_LIMITS.get(exchange, Config.RATE_LIMITS['default'])
+        )
+        _schedulers[key] = RequestScheduler(venue, rate, capacity)
+    return _schedulers[key]
+
+
+def scheduler_stats() -> Dict[str, Dict]:
+    return {scheduler.venue: scheduler.stats() for scheduler in _schedulers.values()}
+
+
+class ManagedClient:
+    """Обёртка клиента ccxt: REST-вызовы проходят через общий планировщик.
+
+    Рыночные данные сначала ищутся в ``cache``, а одинаковые одновременные
+    запросы объединяются через ``flight`` (если переданы) и не расходуют
+    лимит повторно.
+    """
+
+    _SCHEDULED_PREFIXES = ('fetch_', 'create_', 'cancel_', 'edit_', 'set_', 'load_markets')
+    COALESCED_METHODS = {'fetch_ticker', 'fetch_tickers', 'fetch_order_book', 'fetch_ohlcv',
+                         'fetch_trades', 'fetch_funding_rate', 'fetch_funding_rates',
+                         'fetch_time', 'load_markets'}
+
+    def __init__(self, client, exchange: str, ex_type: str = 'spot', flight: Optional[SingleFlight] = None,
+                 cache: Optional[TTLCache] = None):
+        object.__setattr__(self, '_client', client)
+        object.__setattr__(self, '_scheduler', get_scheduler(exchange, ex_type))
+        object.__setattr__(self, '_flight', flight)
+        object.__setattr__(self, '_cache', cache)
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        if not callable(attr) or not name.startswith(self._SCHEDULED_PREFIXES):
+            return attr
+
+        async def call(*args, **kwargs):
+            await self._scheduler.acquire(name)
+            return await attr(*args, **kwargs)
+
+        if self._flight is None or name not in self.COALESCED_METHODS:
+            return call
+
+        async def coalesced(*args, **kwargs):
+            key = (id(self._client), name, freeze(args), freeze(kwargs))
+            load = lambda: self._flight.do(key, lambda: call(*args, **kwargs))
+            if self._cache is not None and name in METHOD_KINDS:
+                return await self._cache.get(METHOD_KINDS[name], key, load)
+            return await load()
+        return coalesced
+
+    async def fetch_timed(self, name: str, *args, **kwargs) -> Tuple[object, float]:
+        """Вызов метода рыночных данных и момент получения ответа.
+
+        Для ответа из ``cache`` возвращается время исходного запроса, так
+        что устаревшие данные не выглядят свежими.
+        """
+        if self._cache is not None and self._flight is not None and name in METHOD_KINDS:
+            attr = getattr(self._client, name)
+
+            async def call():
+                await self._scheduler.acquire(name)
+                return await attr(*args, **kwargs)
+
+            key = (id(self._client), name, freeze(args), freeze(kwargs))
+            return await self._cache.get_timed(METHOD_KINDS[name], key, lambda: self._flight.do(key, call))
+        value = await getattr(self, name)(*args, **kwargs)
+        return value, time.monotonic()
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(self._client, name, value)
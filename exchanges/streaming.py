@@ -0,0 +1,289 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+
+class LiveMarketCache:
+    """Живой кэш тикеров и вершины стакана по бирже и символу.
+
+    Биржа обозначается так же, как в ``ExchangeManager.get_prices``:
+    ``binance_spot``, ``okx_futures`` и т.д.
+    """
+
+    def __init__(self, max_age: float = Config.STREAM_MAX_AGE):
+        self.max_age = max_age
+        self._tickers: Dict[Tuple[str, str], Tuple[float, Dict]] = {}
+        self._books: Dict[Tuple[str, str], Tuple[float, Dict]] = {}
+        self._listeners: List[Callable[[Dict, float], None]] = []
+
+    def subscribe(self, listener: Callable[[Dict, float], None]) -> None:
+        """Вызов ``listener(frame, received_at)`` на каждый применённый кадр"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[Dict, float], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def apply(self, frame: Dict) -> None:
+        """Применение кадра потока к кэшу"""
+        key = (frame['venue'], frame['symbol'])
+        received_at = time.monotonic()
+        if frame['kind'] == 'ticker':
+            self._tickers[key] = (received_at, frame['data'])
+        elif frame['kind'] == 'order_book':
+            self._books[key] = (received_at, frame['data'])
+        else:
+            return
+        for listener in self._listeners:
+            try:
+                listener(frame, received_at)
+            except Exception as e:
+                logger.error(f"Market listener error for {frame['symbol']} on {frame['venue']}: {e}")
+
+    def _fresh(self, store: Dict, venue: str, symbol: str) -> Optional[Tuple[float, Dict]]:
+        entry = store.get((venue, symbol))
+        if entry and time.monotonic() - entry[0] <= self.max_age:
+            return entry
+        return None
+
+    def get_ticker(self, venue: str, symbol: str) -> Optional[Dict]:
+        entry = self._fresh(self._tickers, venue, symbol)
+        return entry[1] if entry else None
+
+    def get_order_book(self, venue: str, symbol: str) -> Optional[Dict]:
+        entry = self._fresh(self._books, venue, symbol)
+        return entry[1] if entry else None
+
+    def get_prices(self, symbol: str) -> Dict[str, Dict]:
+        """Свежие котировки символа в формате ``ExchangeManager.get_prices``"""
+        now = time.monotonic()
+        prices = {}
+        for (venue, sym), (received_at, ticker) in self._tickers.items():
+            if sym != symbol or now - received_at > self.max_age:
+                continue
+            bid, ask = ticker.get('bid'), ticker.get('ask')
+            book = self.get_order_book(venue, symbol)
+            if book and book['bids'] and book['asks']:
+                bid, ask = book['bids'][0][0], book['asks'][0][0]
+            prices[venue] = {
+                'bid': bid,
+                'ask': ask,
+                'last': ticker.get('last'),
+                'volume': ticker.get('baseVolume'),
+                'type': venue.rsplit('_', 1)[1],
+                'received_at': received_at,
+                'latency': now - received_at
+            }
+        return prices
+
+
+class CcxtProSource:
+    """Потоковые данные одной биржи через websocket ccxt.pro"""
+
+    def __init__(self, exchange: str, ex_type: str, options: Optional[Dict] = None):
+        import ccxt.pro as ccxtpro
+        self.venue = f"{exchange}_{ex_type}"
+        self.client = getattr(ccxtpro, exchange)({'options': options or {}})
+
+    async def frames(self, symbols: List[str]):
+        """Поток кадров тикеров и стаканов по подписанным символам"""
+        queue = asyncio.Queue()
+
+        async def pump(kind: str, symbol: str):
+            try:
+                while True:
+                    if kind == 'ticker':
+                        data = await self.client.watch_ticker(symbol)
+                    else:
+                        book = await self.client.watch_order_book(symbol, Config.ORDER_BOOK_DEPTH)
+                        data = {
+                            'bids': book['bids'][:Config.ORDER_BOOK_DEPTH],
+                            'asks': book['asks'][:Config.ORDER_BOOK_DEPTH],
+                            'timestamp': book.get('timestamp')
+                        }
+                    await queue.put({'venue': self.venue, 'symbol': symbol, 'kind': kind, 'data': data})
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await queue.put(e)
+
+        await self.client.load_markets()
+        symbols = [s for s in symbols if s in self.client.markets]
+        tasks = [
+            asyncio.ensure_future(pump(kind, symbol))
+            for symbol in symbols
+            for kind in ('ticker', 'order_book')
+        ]
+        try:
+            while True:
+                item = await queue.get()
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def close(self):
+        await self.client.close()
+
+
+class ReplaySource:
+    """Источник кадров с локального replay-сервера (замена бирж в тестах)"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self._session = None
+
+    async def frames(self, symbols: List[str]):
+        import aiohttp
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        async with self._session.ws_connect(self.url) as ws:
+            await ws.send_json({'op': 'subscribe', 'symbols': symbols})
+            async for msg in ws:
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    yield json.loads(msg.data)
+                elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                    break
+        raise ConnectionError(f"Replay stream {self.url} closed")
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class ReplayServer:
+    """Локальный websocket-сервер, отдающий записанные кадры.
+
+    Кадры читаются из JSONL-файла, записанного ``MarketFeed(record_path=...)``;
+    между кадрами выдерживаются исходные интервалы, делённые на ``speed``
+    (``speed=0`` — без задержек).
+    """
+
+    def __init__(self, path: str, host: str = '127.0.0.1', port: int = 0, speed: float = 0):
+        self.path = path
+        self.host = host
+        self.port = port
+        self.speed = speed
+        self._runner = None
+
+    def _load(self, symbols: List[str]) -> List[Dict]:
+        with open(self.path, encoding='utf-8') as f:
+            frames = [json.loads(line) for line in f if line.strip()]
+        return [frame for frame in frames if not symbols or frame['symbol'] in symbols]
+
+    async def _handle(self, request):
+        from aiohttp import web
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        request_msg = await ws.receive_json()
+        frames = self._load(request_msg.get('symbols') or [])
+
+        prev_ts = None
+        for frame in frames:
+            ts = frame.get('ts')
+            if self.speed and prev_ts is not None and ts is not None:
+                await asyncio.sleep(max(0.0, (ts - prev_ts) / 1000 / self.speed))
+            prev_ts = ts
+            await ws.send_json(frame)
+        await ws.close()
+        return ws
+
+    async def start(self) -> str:
+        """Запуск сервера; возвращает websocket URL"""
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get('/', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        return f"ws://{host}:{port}/"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+class MarketFeed:
+    """Потоковое наполнение ``LiveMarketCache`` с переподключением.
+
+    При обрыве источник переподключается с экспоненциальной задержкой и
+    заново подписывается на все символы.
+    """
+
+    def __init__(self, cache: LiveMarketCache, sources: List, record_path: Optional[str] = None,
+                 market_type: Optional[Callable[[str], str]] = None):
+        self.cache = cache
+        self.sources = sources
+        self.market_type = market_type or (lambda symbol: 'futures' if ':' in symbol else 'spot')
+        self.record_path = record_path
+        self.reconnects = 0
+        self._tasks = []
+        self._record = None
+
+    @classmethod
+    def for_exchanges(cls, exchange_manager, **kwargs) -> 'MarketFeed':
+        """Фид по всем биржам менеджера через ccxt.pro"""
+        sources = [
+            CcxtProSource(ex_name, ex_type, {'defaultType': client.options.get('defaultType')}
+                          if ex_type == 'futures' else {})
+            for ex_name, ex_types in exchange_manager.exchanges.items()
+            for ex_type, client in ex_types.items()
+        ]
+        kwargs.setdefault('market_type', exchange_manager.market_type)
+        return cls(exchange_manager.live, sources, **kwargs)
+
+    async def _run(self, source, symbols: List[str]):
+        delay = Config.STREAM_RECONNECT_DELAY
+        while True:
+            try:
+                async for frame in source.frames(symbols):
+                    frame.setdefault('ts', int(time.time() * 1000))
+                    self.cache.apply(frame)
+                    if self._record:
+                        self._record.write(json.dumps(frame) + '\n')
+                    delay = Config.STREAM_RECONNECT_DELAY
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Market stream {getattr(source, 'venue', source.__class__.__name__)} "
+                               f"disconnected: {e}; reconnecting in {delay:.1f}s")
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, Config.STREAM_RECONNECT_MAX_DELAY)
+
+    async def start(self, symbols: Optional[List[str]] = None):
+        symbols = symbols or Config.TRADING_PAIRS
+        if self.record_path:
+            self._record = open(self.record_path, 'a', encoding='utf-8')
+        for source in self.sources:
+            venue_type = getattr(source, 'venue', '').rsplit('_', 1)[-1]
+            source_symbols = symbols
+            if venue_type in ('spot', 'futures'):
+                source_symbols = [s for s in symbols if self.market_type(s) == venue_type]
+            self._tasks.append(asyncio.ensure_future(self._run(source, source_symbols)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for source in self.sources:
+            try:
+                await source.close()
+            except Exception as e:
+                logger.error(f"Error closing market stream: {e}")
+        if self._record:
+            self._record.close()
+            self._record = None
@@ -0,0 +1,161 @@
+import asyncio
+import contextlib
+import logging
+import time
+import ccxt.async_support as ccxt_async
+from typing import Dict, List, Optional, Tuple
+from config.settings import Config
+from database.db_manager import db
+from exchanges.balance_cache import Loader
+from exchanges.rate_limiter import ManagedClient
+
+logger = logging.getLogger(__name__)
+
+UserKey = Tuple[int, str, str]
+
+
+class UserClientPool:
+    """Пул авторизованных клиентов по (пользователь, биржа, тип рынка).
+
+    Клиент создаётся при первом обращении с уже загруженными рынками
+    (берутся у публичного клиента менеджера, если он их загрузил),
+    переиспользуется между вызовами и закрывается после простоя.
+    Создание защищено блокировкой на ключ, так что параллельные запросы
+    разных пользователей не мешают друг другу.
+    """
+
+    def __init__(self, exchange_manager, idle_timeout: float = Config.USER_CLIENT_IDLE_TIMEOUT):
+        self.exchange_manager = exchange_manager
+        self.idle_timeout = idle_timeout
+        self._clients: Dict[UserKey, ManagedClient] = {}
+        self._last_used: Dict[UserKey, float] = {}
+        self._in_use: Dict[UserKey, int] = {}
+        self._locks: Dict[UserKey, asyncio.Lock] = {}
+        # id клиента -> [ключ, клиент, число незавершённых запросов] для сброшенных занятых клиентов
+        self._retired: Dict[int, List] = {}
+
+    async def _create(self, user_id: int, exchange: str, ex_type: str) -> ManagedClient:
+        api_keys = await db.get_user_api_keys(user_id)
+        if exchange not in api_keys:
+            raise ValueError(f"API keys for {exchange} not configured")
+
+        public = self.exchange_manager.exchanges.get(exchange, {}).get(ex_type)
+        options = {}
+        if public is not None and ex_type == 'futures':
+            options['defaultType'] = public.options.get('defaultType')
+
+        config = {
+            'apiKey': api_keys[exchange]['key'],
+            'secret': api_keys[exchange]['secret'],
+            'enableRateLimit': False,
+            'options': options
+        }
+        if api_keys[exchange].get('password'):
+            config['password'] = api_keys[exchange]['password']
+        client = getattr(ccxt_async, exchange)(config)
+
+        try:
+            if public is not None and public.markets:
+                client.set_markets(public.markets, public.currencies)
+            else:
+                await client.load_markets()
+        except Exception:
+            await client.close()
+            raise
+        return ManagedClient(client, exchange, ex_type)
+
+    async def get(self, user_id: int, exchange: str, ex_type: str = 'spot') -> ManagedClient:
+        """Авторизованный клиент пользователя (создаётся при первом вызове)"""
+        key = (user_id, exchange, ex_type)
+        if key not in self._clients:
+            lock = self._locks.setdefault(key, asyncio.Lock())
+            async with lock:
+                if key not in self._clients:
+                    self._clients[key] = await self._create(user_id, exchange, ex_type)
+                    self._in_use.setdefault(key, 0)
+        self._last_used[key] = time.monotonic()
+        return self._clients[key]
+
+    @contextlib.asynccontextmanager
+    async def client(self, user_id: int, exchange: str, ex_type: str = 'spot'):
+        """Клиент пользователя, защищённый от вытеснения на время работы"""
+        key = (user_id, exchange, ex_type)
+        client = await self.get(user_id, exchange, ex_type)
+        self._in_use[key] = self._in_use.get(key, 0) + 1
+        try:
+            yield client
+        finally:
+            await self._release(key, client)
+
+    async def _release(self, key: UserKey, client: ManagedClient) -> None:
+        if self._clients.get(key) is client:
+            self._in_use[key] = max(self._in_use.get(key, 0) - 1, 0)
+            self._last_used[key] = time.monotonic()
+            return
+        # Клиент сброшен через invalidate, пока был занят: закрывается последним освобождением
+        retired = self._retired.get(id(client))
+        if retired is None:
+            return
+        retired[2] -= 1
+        if retired[2] <= 0:
+            del self._retired[id(client)]
+            await self._close_client(key, client)
+
+    def balance_loader(self, user_id: int, exchange: str, ex_type: str = 'spot') -> Loader:
+        """Загрузчик баланса для ``BalanceCache``: клиент берётся из пула при
+        каждом вызове, а не хранится в кэше"""
+        async def load():
+            async with self.client(user_id, exchange, ex_type) as ex:
+                return await ex.fetch_balance()
+        return load
+
+    def _detach(self, key: UserKey) -> Optional[ManagedClient]:
+        """Убирает клиент из пула; следующий запрос создаст новый"""
+        self.exchange_manager.balances.forget(key)
+        client = self._clients.pop(key, None)
+        self._last_used.pop(key, None)
+        self._in_use.pop(key, None)
+        self._locks.pop(key, None)
+        return client
+
+    async def _close_client(self, key: UserKey, client: ManagedClient) -> None:
+        try:
+            await client.close()
+        except Exception as e:
+            logger.error(f"Error closing client {key[1]} ({key[2]}) of user {key[0]}: {e}")
+
+    async def _close(self, key: UserKey) -> None:
+        client = self._detach(key)
+        if client is not None:
+            await self._close_client(key, client)
+
+    async def invalidate(self, user_id: int) -> None:
+        """Сброс клиентов пользователя (например, после смены ключей).
+
+        Занятые клиенты убираются из пула сразу, а закрываются после
+        завершения последнего запроса через них.
+        """
+        for key in [k for k in self._clients if k[0] == user_id]:
+            in_use = self._in_use.get(key, 0)
+            if in_use:
+                client = self._detach(key)
+                self._retired[id(client)] = [key, client, in_use]
+            else:
+                await self._close(key)
+
+    async def evict_idle(self) -> int:
+        now = time.monotonic()
+        idle = [
+            key for key in self._clients
+            if not self._in_use.get(key) and now - self._last_used.get(key, now) >= self.idle_timeout
+        ]
+        for key in idle:
+            await self._close(key)
+        return len(idle)
+
+    async def close_all(self) -> None:
+        for key in list(self._clients):
+            await self._close(key)
+        retired, self._retired = self._retired, {}
+        for key, client, _ in retired.values():
+            await self._close_client(key, client)
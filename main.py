@@ -6,11 +6,23 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from config.settings import Config
 from database.db_manager import Database
 from exchanges.exchange_manager import ExchangeManager
-from tasks.monitoring import monitor_markets
+from exchanges.streaming import MarketFeed
+from strategies.event_detector import EventArbitrageDetector
+from strategies.funding import FundingRateScanner
+from strategies.auto_strategies import AutoStrategies
+from strategies.opportunity_registry import OpportunityRegistry
+from strategies.trading import TradingStrategies
+from tasks.monitoring import TradingModule, monitor_markets
 from tasks.backups import backup_database
+from tasks.scheduler import MarketScheduler
+from tasks.bus import open_bus
+from tasks.sharding import ShardedMonitor
+from tasks.worker import WorkerSubscriber
+from utils.notifications import notify_users
 from bot_handlers.handlers import router
 from aiogram.fsm.storage.memory import MemoryStorage
 from trading.position_manager import PositionManager
+from trading.trading_engine import TradingEngine
 # Настройка цикла событий для Windows
 if platform.system() == "Windows":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
@@ -28,16 +40,101 @@ dp = Dispatcher(storage=MemoryStorage())
 dp.include_router(router)
 exchange_manager = ExchangeManager()
 position_manager = PositionManager(exchange_manager)
+funding_scanner = FundingRateScanner(exchange_manager)
+TradingStrategies.use_funding_scanner(funding_scanner)
+opportunity_registry = OpportunityRegistry()
+market_feed = MarketFeed.for_exchanges(exchange_manager) if Config.STREAMING_ENABLED else None
+event_detector = EventArbitrageDetector(exchange_manager.live, fees=exchange_manager.fees) if market_feed else None
+auto_strategies = AutoStrategies(exchange_manager)
+trading_engine = TradingEngine(exchange_manager, opportunity_registry)
 scheduler = AsyncIOScheduler()
+market_scheduler = MarketScheduler()
 db = Database()
 
+async def on_stream_opportunity(opportunity):
+    """Арбитраж, найденный по потоку котировок"""
+    logger.info(
+        f"Stream arbitrage {opportunity['symbol']}: {opportunity['buy_exchange']} -> "
+        f"{opportunity['sell_exchange']} {opportunity['profit']:.2f}% "
+        f"({opportunity['latency'] * 1000:.2f} ms after quote)"
+    )
+    opportunity_registry.observe(opportunity)
+    if opportunity_registry.should_notify(opportunity):
+        await notify_users(opportunity)
+
+async def on_worker_opportunity(opportunity):
+    """Возможность от шарда или внешнего воркера мониторинга.
+
+    Шарды и воркеры только анализируют рынок, поэтому исполнение для VIP,
+    отбор уведомлений и рассылка — здесь, как в ``MonitoringPipeline``.
+    """
+    opportunity_registry.observe(opportunity)
+    await TradingModule.execute_for_vip(opportunity, exchange_manager, opportunity_registry)
+    if opportunity_registry.should_notify(opportunity):
+        await notify_users(opportunity)
+
+async def flush_opportunities():
+    """Закрытие и запись циклов жизни, когда ``monitor_markets`` не запущен"""
+    opportunity_registry.expire()
+    await opportunity_registry.flush()
+
+worker_subscriber = WorkerSubscriber(open_bus(), on_worker_opportunity) if Config.BUS_URL else None
+sharded_monitor = (
+    ShardedMonitor(on_worker_opportunity) if Config.MONITOR_PROCESSES and not Config.BUS_URL else None
+)
+
+async def log_market_jobs():
+    logger.info(f"Market jobs: {market_scheduler.stats()}")
+
+async def log_detector_stats():
+    logger.info(f"Event detector: {event_detector.stats()}")
+
+async def log_shard_stats():
+    logger.info(f"Monitoring shards: {sharded_monitor.stats()}")
+
+async def log_worker_stats():
+    logger.info(f"Monitoring workers: {worker_subscriber.stats()}")
+
 async def on_startup():
     """Функция инициализации при запуске бота"""
     try:
-        # Настройка периодических задач
-        scheduler.add_job(monitor_markets, 'interval', minutes=1, args=[exchange_manager])
+        # Настройка периодических задач: рыночные — в MarketScheduler, редкие — в APScheduler
+        if worker_subscriber:
+            # Мониторинг на внешних воркерах, бот читает их возможности из шины
+            worker_subscriber.start()
+            market_scheduler.add_job(auto_strategies.check_strategies, Config.MONITOR_INTERVAL)
+            market_scheduler.add_job(worker_subscriber.maintain, Config.BUS_HEARTBEAT_INTERVAL)
+            market_scheduler.add_job(flush_opportunities, Config.MONITOR_INTERVAL)
+            scheduler.add_job(log_worker_stats, 'interval', seconds=Config.CLIENT_HEALTH_INTERVAL)
+        elif sharded_monitor:
+            # Аналитика в процессах-шардах, в процессе бота — только стратегии и рассылка
+            sharded_monitor.start()
+            market_scheduler.add_job(auto_strategies.check_strategies, Config.MONITOR_INTERVAL)
+            market_scheduler.add_job(sharded_monitor.maintain, Config.CLIENT_HEALTH_INTERVAL)
+            market_scheduler.add_job(flush_opportunities, Config.MONITOR_INTERVAL)
+            scheduler.add_job(log_shard_stats, 'interval', seconds=Config.CLIENT_HEALTH_INTERVAL)
+        else:
+            market_scheduler.add_job(
+                monitor_markets, Config.MONITOR_INTERVAL, overlap=Config.MONITOR_OVERLAP,
+                jitter=Config.MONITOR_JITTER, adaptive=Config.MONITOR_ADAPTIVE,
+                min_interval=Config.MONITOR_MIN_INTERVAL, max_interval=Config.MONITOR_MAX_INTERVAL,
+                args=(exchange_manager, funding_scanner, opportunity_registry)
+            )
+        if Config.AUTO_TRADE_ENABLED:
+            market_scheduler.add_job(trading_engine.auto_trade_all, Config.AUTO_TRADE_INTERVAL)
+        market_scheduler.add_job(exchange_manager.maintain, Config.CLIENT_HEALTH_INTERVAL)
+        scheduler.add_job(log_market_jobs, 'interval', seconds=Config.CLIENT_HEALTH_INTERVAL)
         scheduler.add_job(backup_database, 'interval', hours=6)
+        scheduler.add_job(exchange_manager.refresh_markets, 'interval', hours=Config.MARKETS_REFRESH_INTERVAL)
+        if exchange_manager.markets_cache.is_stale():
+            asyncio.ensure_future(exchange_manager.refresh_markets())
         scheduler.start()
+        market_scheduler.start()
+        funding_scanner.start()
+        if market_feed:
+            event_detector.start(on_stream_opportunity)
+            scheduler.add_job(log_detector_stats, 'interval', seconds=Config.CLIENT_HEALTH_INTERVAL)
+            await market_feed.start(Config.TRADING_PAIRS)
         
         # Уведомление администраторов
         for admin_id in Config.ADMIN_IDS:
@@ -57,6 +154,17 @@ async def on_startup():
 async def on_shutdown():
     """Функция завершения работы"""
     try:
+        if market_feed:
+            await market_feed.stop()
+            await event_detector.stop()
+        if sharded_monitor:
+            await sharded_monitor.stop()
+        if worker_subscriber:
+            await worker_subscriber.stop()
+            worker_subscriber.bus.close()
+        await market_scheduler.stop()
+        await funding_scanner.stop()
+        await opportunity_registry.flush(close_open=True)
         await exchange_manager.close_all()
         await bot.get_session.close()
         scheduler.shutdown()
@@ -1,7 +1,8 @@
 import logging
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from config.settings import Config
 from exchanges.exchange_manager import ExchangeManager
+from strategies.spread_matrix import rank_opportunities
 
 logger = logging.getLogger(__name__)
 
@@ -9,13 +10,34 @@ class ArbitrageEngine:
     def __init__(self, exchange_manager: ExchangeManager):
          self.exchange_manager = exchange_manager
          
-    async def find_opportunities(self, symbol: str) -> Optional[Dict]:
+    @staticmethod
+    def _consistent_snapshot(prices: Dict[str, Dict]) -> Dict[str, Dict]:
+        """Котировки, полученные не раньше чем за MAX_QUOTE_SKEW до самой свежей.
+
+        Опорой служит самая свежая котировка, поэтому одна устаревшая
+        (из кэша или потока) отбрасывается сама, а не вытесняет свежие.
+        Котировки без ``received_at`` не фильтруются.
+        """
+        times = [v['received_at'] for v in prices.values() if v.get('received_at') is not None]
+        if not times:
+            return prices
+        newest = max(times)
+        return {
+            k: v for k, v in prices.items()
+            if v.get('received_at') is None or newest - v['received_at'] <= Config.MAX_QUOTE_SKEW
+        }
+
+    async def find_opportunities(self, symbol: str, prices: Optional[Dict[str, Dict]] = None) -> Optional[Dict]:
         try:
-            prices = await self.exchange_manager.get_prices(symbol)
+            if prices is None:
+                prices = await self.exchange_manager.get_prices(symbol)
+            else:
+                prices = {**prices, **self.exchange_manager.live.get_prices(symbol)}
             if len(prices) < 2:
                 return None
                 
-            prices = {k: v for k, v in prices.items() if v['volume'] > 0}
+            prices = {k: v for k, v in prices.items() if (v.get('volume') or 0) > 0}
+            prices = self._consistent_snapshot(prices)
             if len(prices) < 2:
                 return None
                 
@@ -23,7 +45,9 @@ class ArbitrageEngine:
             best_ask = min(prices.items(), key=lambda x: x[1]['ask'])
             
             spread = (best_bid[1]['bid'] - best_ask[1]['ask']) / best_ask[1]['ask'] * 100
-            profit = spread - Config.COMMISSION
+            profit = spread - self.exchange_manager.fees.pair_cost(
+                best_ask[0], best_bid[0], symbol, best_ask[1]['ask']
+            )
             
             if profit >= Config.MIN_PROFIT:
                 return {
@@ -33,9 +57,22 @@ class ArbitrageEngine:
                     'buy_price': best_ask[1]['ask'],
                     'sell_price': best_bid[1]['bid'],
                     'profit': profit,
-                    'volume': min(best_ask[1]['volume'], best_bid[1]['volume'])
+                    'volume': min(best_ask[1]['volume'], best_bid[1]['volume']),
+                    'latency': max(best_ask[1].get('latency', 0), best_bid[1].get('latency', 0))
                 }
             return None
         except Exception as e:
             logger.error(f"Arbitrage search error for {symbol}: {e}")
             return None
+
+    def rank_opportunities(self, snapshot: Dict) -> List[Dict]:
+        """Возможности по всему срезу за один векторный проход, по убыванию прибыли"""
+        try:
+            prices = {venue: dict(quotes) for venue, quotes in snapshot['prices'].items()}
+            for symbol in snapshot['symbols']:
+                for venue, quote in self.exchange_manager.live.get_prices(symbol).items():
+                    prices.setdefault(venue, {})[symbol] = quote
+            return rank_opportunities({**snapshot, 'prices': prices}, fees=self.exchange_manager.fees)
+        except Exception as e:
+            logger.error(f"Arbitrage ranking error: {e}")
+            return []
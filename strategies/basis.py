@@ -0,0 +1,154 @@
+import logging
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+
+def map_instruments(spot_markets: Dict[str, Dict], perp_markets: Dict[str, Dict]) -> Dict[str, str]:
+    """Соответствие спотовых символов линейным бессрочным контрактам биржи.
+
+    Пара определяется по метаданным рынка (base, quote, settle), а не по
+    написанию символа.
+    """
+    perps = {
+        (market['base'], market['quote']): symbol
+        for symbol, market in perp_markets.items()
+        if market.get('swap') and market.get('linear') and market.get('settle') == market.get('quote')
+        and market.get('active') is not False
+    }
+    return {
+        symbol: perps[(market['base'], market['quote'])]
+        for symbol, market in spot_markets.items()
+        if market.get('spot') and market.get('active') is not False
+        and (market['base'], market['quote']) in perps
+    }
+
+
+class BasisEngine:
+    """Базис спот–перпетуал по всем биржам и парам из общего среза цен.
+
+    Считается cash-and-carry: покупка спота по ask на одной бирже и продажа
+    перпетуала по bid на той же или другой. К базису добавляется ожидаемый
+    фандинг за ``horizon`` часов по ставке биржи контракта (положительная
+    ставка платится шортам). Комиссии ног берутся из ``FeeTable``
+    менеджера. Результат в формате ``ArbitrageEngine``.
+    """
+
+    def __init__(self, exchange_manager, funding_scanner=None, horizon: float = Config.BASIS_HORIZON):
+        self.exchange_manager = exchange_manager
+        self.funding_scanner = funding_scanner
+        self.horizon = horizon
+        self._instruments: Dict[str, Tuple[int, int, Dict[str, str]]] = {}
+
+    def instruments(self) -> Dict[str, Dict[str, str]]:
+        """Спот → перпетуал по биржам; пересчитывается при смене рынков клиентов"""
+        mapping = {}
+        for ex_name, ex_types in self.exchange_manager.exchanges.items():
+            spot, futures = ex_types.get('spot'), ex_types.get('futures')
+            if spot is None or futures is None or not spot.markets or not futures.markets:
+                continue
+            cached = self._instruments.get(ex_name)
+            if cached is None or cached[0] != id(spot.markets) or cached[1] != id(futures.markets):
+                cached = (id(spot.markets), id(futures.markets), map_instruments(spot.markets, futures.markets))
+                self._instruments[ex_name] = cached
+            mapping[ex_name] = cached[2]
+        return mapping
+
+    def snapshot_symbols(self, symbols: List[str]) -> List[str]:
+        """Символы для общего среза: исходные плюс их пары в другом рынке"""
+        result = list(symbols)
+        wanted = set(symbols)
+        for mapping in self.instruments().values():
+            for spot_symbol, perp_symbol in mapping.items():
+                if spot_symbol in wanted and perp_symbol not in result:
+                    result.append(perp_symbol)
+                elif perp_symbol in wanted and spot_symbol not in result:
+                    result.append(spot_symbol)
+        return result
+
+    def _funding(self, ex_name: str, perp_symbol: str) -> float:
+        """Ожидаемый фандинг в % за горизонт (для шорта контракта)"""
+        if self.funding_scanner is None:
+            return 0.0
+        rate = self.funding_scanner.rates.get(ex_name, {}).get(perp_symbol)
+        if not rate:
+            return 0.0
+        return rate['rate'] * self.horizon / rate['interval'] * 100
+
+    def rank_opportunities(self, snapshot: Dict, min_profit: float = Config.MIN_PROFIT,
+                           commission=Config.COMMISSION, top: Optional[int] = None) -> List[Dict]:
+        """Все возможности базиса среза, по убыванию прибыли с учётом фандинга"""
+        try:
+            instruments = self.instruments()
+            exchanges = sorted(instruments)
+            pairs = sorted({
+                symbol for mapping in instruments.values()
+                for symbol in mapping if symbol in snapshot['symbols']
+            })
+            if not exchanges or not pairs:
+                return []
+
+            shape = (len(exchanges), len(pairs))
+            spot_ask, spot_volume = np.full(shape, np.nan), np.full(shape, np.nan)
+            perp_bid, perp_volume = np.full(shape, np.nan), np.full(shape, np.nan)
+            funding = np.zeros(shape)
+            perp_symbols: Dict[Tuple[int, int], str] = {}
+            for i, ex_name in enumerate(exchanges):
+                spot_quotes = snapshot['prices'].get(f"{ex_name}_spot", {})
+                perp_quotes = snapshot['prices'].get(f"{ex_name}_futures", {})
+                for j, symbol in enumerate(pairs):
+                    quote = spot_quotes.get(symbol)
+                    if quote:
+                        spot_ask[i, j], spot_volume[i, j] = quote['ask'] or np.nan, quote['volume'] or np.nan
+                    perp_symbol = instruments[ex_name].get(symbol)
+                    quote = perp_quotes.get(perp_symbol) if perp_symbol else None
+                    if quote:
+                        perp_bid[i, j], perp_volume[i, j] = quote['bid'] or np.nan, quote['volume'] or np.nan
+                        funding[i, j] = self._funding(ex_name, perp_symbol)
+                        perp_symbols[(i, j)] = perp_symbol
+
+            fees = getattr(self.exchange_manager, 'fees', None)
+            if fees is not None:
+                spot_fee = fees.taker_matrix([f"{e}_spot" for e in exchanges], pairs)
+                perp_fee = np.array([
+                    [fees.taker(f"{e}_futures", perp_symbols[(i, j)]) if (i, j) in perp_symbols
+                     else fees.default_taker for j in range(len(pairs))]
+                    for i, e in enumerate(exchanges)
+                ]).reshape(shape)
+                commission = perp_fee[:, None, :] + spot_fee[None, :, :]
+
+            # [биржа перпетуала, биржа спота, пара]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                basis = (perp_bid[:, None, :] - spot_ask[None, :, :]) / spot_ask[None, :, :] * 100
+                carry = basis - commission + funding[:, None, :]
+                mask = (carry >= min_profit) & (perp_volume[:, None, :] > 0) & (spot_volume[None, :, :] > 0)
+
+            perp_idx, spot_idx, pair_idx = np.nonzero(mask)
+            profits = carry[perp_idx, spot_idx, pair_idx]
+            order = np.argsort(-profits, kind='stable')
+            if top is not None:
+                order = order[:top]
+
+            opportunities = []
+            for k in order:
+                p, s, j = perp_idx[k], spot_idx[k], pair_idx[k]
+                opportunities.append({
+                    'symbol': pairs[j],
+                    'type': 'basis',
+                    'buy_exchange': f"{exchanges[s]}_spot",
+                    'sell_exchange': f"{exchanges[p]}_futures",
+                    'buy_symbol': pairs[j],
+                    'sell_symbol': perp_symbols[(p, j)],
+                    'buy_price': float(spot_ask[s, j]),
+                    'sell_price': float(perp_bid[p, j]),
+                    'basis': float(basis[p, s, j]),
+                    'funding': float(funding[p, j]),
+                    'profit': float(profits[k]),
+                    'volume': float(min(spot_volume[s, j], perp_volume[p, j]))
+                })
+            return opportunities
+        except Exception as e:
+            logger.error(f"Basis ranking error: {e}")
+            return []
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import numpy as np
+from typing import Callable, Dict, List, Optional
+from config.settings import Config
+from analysis.liquidity import LiquidityAnalyzer
+
+logger = logging.getLogger(__name__)
+
+
+def _cumulative(levels: List) -> (np.ndarray, np.ndarray):
+    """Накопленные объём и стоимость по уровням стакана (с нулём в начале)"""
+    book = np.asarray(levels, dtype=float)[:, :2]
+    qty = np.concatenate(([0.0], np.cumsum(book[:, 1])))
+    notional = np.concatenate(([0.0], np.cumsum(book[:, 0] * book[:, 1])))
+    return qty, notional
+
+
+def walk_books(asks: List, bids: List, commission: float = Config.COMMISSION,
+               min_profit: float = Config.MIN_PROFIT,
+               round_amount: Optional[Callable[[float, float], float]] = None) -> Optional[Dict]:
+    """Максимальный объём, при котором прибыль по VWAP не ниже ``min_profit``.
+
+    ``asks`` — стакан биржи покупки, ``bids`` — биржи продажи (уровни
+    ``[price, amount]``). Стоимость покупки и выручка от продажи кусочно-
+    линейны по объёму, поэтому прибыль считается сразу во всех точках
+    смены уровня, а граница внутри последнего уровня находится точно.
+    ``round_amount(amount, price)`` приводит объём к шагу лота бирж.
+    """
+    if not asks or not bids:
+        return None
+    ask_qty, ask_notional = _cumulative(asks)
+    bid_qty, bid_notional = _cumulative(bids)
+    max_qty = min(ask_qty[-1], bid_qty[-1])
+    if max_qty <= 0:
+        return None
+
+    points = np.union1d(ask_qty[1:], bid_qty[1:])
+    points = points[points <= max_qty]
+    cost = np.interp(points, ask_qty, ask_notional)
+    proceeds = np.interp(points, bid_qty, bid_notional)
+    margin = (min_profit + commission) / 100
+    ok = proceeds - cost >= margin * cost
+    if not ok[0]:
+        return None
+
+    k = len(ok) - 1 if ok.all() else int(np.argmin(ok)) - 1
+    amount = float(points[k])
+    if k + 1 < len(points):
+        # Внутри следующего отрезка цены постоянны: решаем линейное условие
+        step = points[k + 1] - points[k]
+        ask_price = (cost[k + 1] - cost[k]) / step
+        bid_price = (proceeds[k + 1] - proceeds[k]) / step
+        denominator = ask_price * (1 + margin) - bid_price
+        if denominator > 0:
+            amount += max(0.0, float((proceeds[k] - cost[k] * (1 + margin)) / denominator))
+
+    if round_amount is not None:
+        amount = round_amount(amount, float(asks[0][0]))
+        if amount <= 0:
+            return None
+
+    buy_cost = float(np.interp(amount, ask_qty, ask_notional))
+    sell_proceeds = float(np.interp(amount, bid_qty, bid_notional))
+    return {
+        'amount': amount,
+        'buy_vwap': buy_cost / amount,
+        'sell_vwap': sell_proceeds / amount,
+        'profit': (sell_proceeds - buy_cost) / buy_cost * 100 - commission,
+        'profit_usdt': sell_proceeds - buy_cost * (1 + commission / 100)
+    }
+
+
+class DepthArbitrageEngine:
+    """Проверка исполнимости арбитража по глубине стаканов обеих бирж"""
+
+    def __init__(self, liquidity_analyzer: LiquidityAnalyzer):
+        self.liquidity_analyzer = liquidity_analyzer
+
+    async def evaluate(self, opportunity: Dict) -> Optional[Dict]:
+        """Дополняет возможность исполнимым объёмом и прибылью по VWAP"""
+        try:
+            symbol = opportunity['symbol']
+            buy_exchange, buy_type = opportunity['buy_exchange'].rsplit('_', 1)
+            sell_exchange, sell_type = opportunity['sell_exchange'].rsplit('_', 1)
+            buy_book, sell_book = await asyncio.gather(
+                self.liquidity_analyzer.get_order_book(symbol, buy_exchange, buy_type),
+                self.liquidity_analyzer.get_order_book(symbol, sell_exchange, sell_type)
+            )
+            fees = self.liquidity_analyzer.exchange_manager.fees
+            venues = (opportunity['buy_exchange'], opportunity['sell_exchange'])
+            result = walk_books(
+                buy_book['asks'], sell_book['bids'],
+                commission=fees.pair_cost(*venues, symbol, opportunity.get('buy_price')),
+                round_amount=lambda amount, price: fees.round_amount(symbol, amount, *venues, price=price)
+            )
+            if result is None:
+                return None
+            return {
+                **opportunity,
+                'executable_amount': result['amount'],
+                'buy_vwap': result['buy_vwap'],
+                'sell_vwap': result['sell_vwap'],
+                'depth_profit': result['profit'],
+                'profit_usdt': result['profit_usdt']
+            }
+        except Exception as e:
+            logger.error(f"Depth evaluation error for {opportunity.get('symbol')}: {e}")
+            return None
@@ -0,0 +1,284 @@
+import asyncio
+import contextlib
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+
+class IndexedHeap:
+    """Двоичная куча (минимум сверху) с индексом позиций по ключу.
+
+    Вставка, изменение приоритета и удаление ключа — O(log n), вершина и
+    второй элемент — O(1).
+    """
+
+    def __init__(self):
+        self._heap: List[List] = []  # [приоритет, ключ]
+        self._pos: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._pos
+
+    def _swap(self, i: int, j: int) -> None:
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._pos[heap[i][1]] = i
+        self._pos[heap[j][1]] = j
+
+    def _sift_up(self, i: int) -> None:
+        heap = self._heap
+        while i > 0:
+            parent = (i - 1) // 2
+            if heap[i][0] >= heap[parent][0]:
+                break
+            self._swap(i, parent)
+            i = parent
+
+    def _sift_down(self, i: int) -> None:
+        heap = self._heap
+        n = len(heap)
+        while True:
+            smallest = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < n and heap[child][0] < heap[smallest][0]:
+                    smallest = child
+            if smallest == i:
+                return
+            self._swap(i, smallest)
+            i = smallest
+
+    def push(self, key: Hashable, priority: float) -> None:
+        """Добавление ключа или изменение его приоритета"""
+        i = self._pos.get(key)
+        if i is None:
+            self._heap.append([priority, key])
+            self._pos[key] = len(self._heap) - 1
+            self._sift_up(len(self._heap) - 1)
+            return
+        old = self._heap[i][0]
+        self._heap[i][0] = priority
+        if priority < old:
+            self._sift_up(i)
+        elif priority > old:
+            self._sift_down(i)
+
+    def remove(self, key: Hashable) -> None:
+        i = self._pos.pop(key, None)
+        if i is None:
+            return
+        last = self._heap.pop()
+        if i < len(self._heap):
+            self._heap[i] = last
+            self._pos[last[1]] = i
+            self._sift_up(i)
+            self._sift_down(self._pos[last[1]])
+
+    def top_two(self) -> List[Tuple[Hashable, float]]:
+        """Вершина и следующий за ней элемент (если есть)"""
+        heap = self._heap
+        if not heap:
+            return []
+        result = [(heap[0][1], heap[0][0])]
+        children = [heap[c] for c in (1, 2) if c < len(heap)]
+        if children:
+            second = min(children, key=lambda item: item[0])
+            result.append((second[1], second[0]))
+        return result
+
+
+class EventArbitrageDetector:
+    """Поиск межбиржевого арбитража по каждому изменению котировки.
+
+    Для каждого символа держит кучу максимальных bid и минимальных ask по
+    биржам; кадр ``LiveMarketCache`` обновляет их за O(log n) и сразу
+    проверяет лучшую пару бирж. Событие возникает при пересечении порога
+    (повторно — только после того, как спред опустился ниже него).
+    Задержка от получения котировки до сигнала копится в ``stats``.
+    """
+
+    def __init__(self, cache, min_profit: float = Config.MIN_PROFIT,
+                 commission=Config.COMMISSION, max_events: int = 1000, latency_window: int = 10000,
+                 fees=None):
+        self.cache = cache
+        self.min_profit = min_profit
+        self.commission = commission
+        self.fees = fees
+        self.events: asyncio.Queue = asyncio.Queue(maxsize=max_events)
+        self.updates = 0
+        self.signals = 0
+        self.dropped = 0
+        self._bids: Dict[str, IndexedHeap] = {}
+        self._asks: Dict[str, IndexedHeap] = {}
+        self._quotes: Dict[Tuple[str, str], Dict] = {}
+        self._active: Dict[Tuple[str, str, str], float] = {}
+        self._latencies = deque(maxlen=latency_window)
+        self._task: Optional[asyncio.Task] = None
+
+    def attach(self) -> None:
+        self.cache.subscribe(self.on_frame)
+
+    @staticmethod
+    def _top(frame: Dict) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+        data = frame['data']
+        if frame['kind'] == 'order_book':
+            bid = data['bids'][0][0] if data.get('bids') else None
+            ask = data['asks'][0][0] if data.get('asks') else None
+            return bid, ask, None
+        return data.get('bid'), data.get('ask'), data.get('baseVolume')
+
+    def on_frame(self, frame: Dict, received_at: float) -> None:
+        """Обработчик кадра потока; ``received_at`` — время его получения"""
+        venue, symbol = frame['venue'], frame['symbol']
+        bid, ask, volume = self._top(frame)
+        quote = self._quotes.setdefault((venue, symbol), {'volume': None})
+        quote['received_at'] = received_at
+        if volume is not None:
+            quote['volume'] = volume
+
+        bids = self._bids.setdefault(symbol, IndexedHeap())
+        asks = self._asks.setdefault(symbol, IndexedHeap())
+        if bid:
+            bids.push(venue, -bid)
+        else:
+            bids.remove(venue)
+        if ask:
+            asks.push(venue, ask)
+        else:
+            asks.remove(venue)
+        self.updates += 1
+        self._check(symbol, received_at)
+
+    def _drop_stale(self, heap: IndexedHeap, symbol: str, now: float) -> None:
+        while len(heap):
+            venue = heap.top_two()[0][0]
+            if now - self._quotes[(venue, symbol)]['received_at'] <= self.cache.max_age:
+                return
+            heap.remove(venue)
+
+    def _check(self, symbol: str, received_at: float) -> None:
+        now = time.monotonic()
+        bids, asks = self._bids[symbol], self._asks[symbol]
+        self._drop_stale(bids, symbol, now)
+        self._drop_stale(asks, symbol, now)
+        top_bids, top_asks = bids.top_two(), asks.top_two()
+        if not top_bids or not top_asks:
+            return
+
+        # Лучшая пара разных бирж: вершины куч или вершина одной и второй элемент другой
+        candidates = [
+            (sell, -neg_bid, buy, ask)
+            for sell, neg_bid in top_bids for buy, ask in top_asks
+            if sell != buy
+        ]
+        if not candidates:
+            return
+        sell, bid, buy, ask = max(candidates, key=lambda c: (c[1] - c[3]) / c[3])
+        commission = self.commission if self.fees is None else self.fees.pair_cost(buy, sell, symbol, ask)
+        profit = (bid - ask) / ask * 100 - commission
+
+        for key in [k for k in self._active if k[0] == symbol and k != (symbol, buy, sell)]:
+            del self._active[key]  # лучшая пара сменилась — прежнее пересечение закончилось
+        key = (symbol, buy, sell)
+        if profit < self.min_profit:
+            self._active.pop(key, None)
+            return
+        if key in self._active:
+            return
+        self._active[key] = profit
+
+        latency = now - received_at
+        self._latencies.append(latency)
+        self.signals += 1
+        volumes = [self._quotes[(v, symbol)]['volume'] for v in (buy, sell)]
+        opportunity = {
+            'symbol': symbol,
+            'buy_exchange': buy,
+            'sell_exchange': sell,
+            'buy_price': ask,
+            'sell_price': bid,
+            'profit': profit,
+            'volume': min(volumes) if None not in volumes else None,
+            'latency': latency,
+            'detected_at': time.time()
+        }
+        if self.events.full():
+            self.events.get_nowait()
+            self.dropped += 1
+        self.events.put_nowait(opportunity)
+
+    def stats(self) -> Dict[str, float]:
+        """Число обновлений и сигналов и задержка котировка → сигнал, мс"""
+        latencies = sorted(self._latencies)
+        result = {'updates': self.updates, 'signals': self.signals, 'dropped': self.dropped}
+        if latencies:
+            result.update({
+                'latency_p50_ms': latencies[len(latencies) // 2] * 1000,
+                'latency_p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+                'latency_max_ms': latencies[-1] * 1000
+            })
+        return result
+
+    async def _run(self, handler: Callable[[Dict], Awaitable]) -> None:
+        while True:
+            opportunity = await self.events.get()
+            try:
+                await handler(opportunity)
+            except Exception as e:
+                logger.error(f"Opportunity handler error for {opportunity['symbol']}: {e}")
+
+    def start(self, handler: Callable[[Dict], Awaitable]) -> None:
+        """Подписка на кэш и обработка событий ``handler``"""
+        self.attach()
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run(handler))
+
+    async def stop(self) -> None:
+        self.cache.unsubscribe(self.on_frame)
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+def benchmark(n_venues: int = 8, n_symbols: int = 50, frames: int = 100000, seed: int = 0) -> Dict[str, float]:
+    """Время обработки кадра (мкс) и задержка котировка → сигнал детектора
+    против ожидания следующего минутного цикла мониторинга"""
+    import random
+    from exchanges.streaming import LiveMarketCache
+
+    async def run():
+        rng = random.Random(seed)
+        cache = LiveMarketCache()
+        detector = EventArbitrageDetector(cache)
+        detector.attach()
+        mids = [rng.uniform(1, 1000) for _ in range(n_symbols)]
+        started = time.perf_counter()
+        for _ in range(frames):
+            j = rng.randrange(n_symbols)
+            mid = mids[j] * (1 + rng.gauss(0, 0.003))
+            cache.apply({
+                'venue': f"venue{rng.randrange(n_venues)}_spot", 'symbol': f"S{j}/USDT", 'kind': 'ticker',
+                'data': {'bid': mid * 0.9999, 'ask': mid * 1.0001, 'baseVolume': 1000.0}
+            })
+        per_frame = (time.perf_counter() - started) / frames * 1e6
+        stats = detector.stats()
+        stats['frame_us'] = per_frame
+        stats['tick_latency_avg_ms'] = 60 / 2 * 1000  # в среднем полцикла до следующего тика
+        return stats
+
+    return asyncio.run(run())
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(f"{result['updates']} updates, {result['signals']} signals, {result['frame_us']:.1f} us/frame, "
+          f"quote-to-signal p50 {result.get('latency_p50_ms', 0):.3f} ms, "
+          f"p99 {result.get('latency_p99_ms', 0):.3f} ms (minute tick: ~{result['tick_latency_avg_ms']:.0f} ms)")
@@ -0,0 +1,197 @@
+import asyncio
+import contextlib
+import logging
+import re
+import time
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from config.settings import Config
+from database.db_manager import db
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FUNDING_INTERVAL = 8  # часов, если биржа не сообщает интервал
+
+
+def _interval_hours(rate: Dict) -> float:
+    interval = rate.get('interval')
+    match = re.fullmatch(r'(\d+)h', interval) if isinstance(interval, str) else None
+    return float(match.group(1)) if match else DEFAULT_FUNDING_INTERVAL
+
+
+def build_funding_matrices(rates: Dict[str, Dict[str, Dict]]) -> Tuple[List[str], List[str], np.ndarray, np.ndarray]:
+    """Матрицы ставки за период и годовой ставки в % (биржа × символ).
+
+    Отсутствующие ставки заполняются NaN.
+    """
+    venues = sorted(rates)
+    symbols = sorted({symbol for venue_rates in rates.values() for symbol in venue_rates})
+    empty = {'rate': None, 'interval': DEFAULT_FUNDING_INTERVAL}
+    rows = [[rates[venue].get(symbol, empty) for symbol in symbols] for venue in venues]
+    shape = (len(venues), len(symbols))
+    period = np.array([[r['rate'] for r in row] for row in rows], dtype=float).reshape(shape)
+    intervals = np.array([[r['interval'] for r in row] for row in rows], dtype=float).reshape(shape)
+    annual = period * (24 / intervals) * 365 * 100
+    return venues, symbols, period, annual
+
+
+def rank_funding(rates: Dict[str, Dict[str, Dict]], min_carry: float = Config.FUNDING_MIN_CARRY,
+                 top: Optional[int] = None) -> List[Dict]:
+    """Межбиржевые разницы фандинга, по убыванию годового carry.
+
+    Short открывается там, где ставка выше (получаем фандинг), long — где
+    ниже. ``carry`` — разница годовых ставок в %.
+    """
+    venues, symbols, period, annual = build_funding_matrices(rates)
+    if len(venues) < 2 or not symbols:
+        return []
+
+    carry = annual[:, None, :] - annual[None, :, :]  # [short, long, symbol]
+    diagonal = np.arange(len(venues))
+    carry[diagonal, diagonal, :] = np.nan
+    with np.errstate(invalid='ignore'):
+        short_idx, long_idx, sym_idx = np.nonzero(carry >= min_carry)
+    values = carry[short_idx, long_idx, sym_idx]
+    order = np.argsort(-values, kind='stable')
+    if top is not None:
+        order = order[:top]
+
+    opportunities = []
+    for k in order:
+        s, l, j = short_idx[k], long_idx[k], sym_idx[k]
+        next_times = [
+            t for t in (rates[venues[s]][symbols[j]]['next_funding'],
+                        rates[venues[l]][symbols[j]]['next_funding']) if t
+        ]
+        opportunities.append({
+            'symbol': symbols[j],
+            'short_exchange': venues[s],
+            'long_exchange': venues[l],
+            'short_rate': float(period[s, j]),
+            'long_rate': float(period[l, j]),
+            'carry': float(values[k]),
+            'next_funding': min(next_times) if next_times else None
+        })
+    return opportunities
+
+
+class FundingRateScanner:
+    """Сканер фандинга по всем фьючерсным биржам менеджера.
+
+    Ставки запрашиваются параллельно, история пишется в таблицу
+    ``funding_rates`` (одна строка на биржу, символ и время начисления),
+    а ранжированный список обновляется незадолго до ближайшего начисления.
+    """
+
+    def __init__(self, exchange_manager, min_carry: float = Config.FUNDING_MIN_CARRY):
+        self.exchange_manager = exchange_manager
+        self.min_carry = min_carry
+        self.rates: Dict[str, Dict[str, Dict]] = {}
+        self.opportunities: List[Dict] = []
+        self.updated: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _fetch_venue(self, ex_name: str) -> Dict[str, Dict]:
+        async with self.exchange_manager.get_exchange(ex_name, 'futures') as ex:
+            if not ex.has.get('fetchFundingRates'):
+                return {}
+            raw = await ex.fetch_funding_rates()
+        return {
+            symbol: {
+                'rate': rate['fundingRate'],
+                'interval': _interval_hours(rate),
+                'next_funding': rate.get('nextFundingTimestamp') or rate.get('fundingTimestamp')
+            }
+            for symbol, rate in raw.items()
+            if rate.get('fundingRate') is not None
+        }
+
+    async def fetch_rates(self) -> Dict[str, Dict[str, Dict]]:
+        venues = [name for name, types in self.exchange_manager.exchanges.items() if 'futures' in types]
+        return await self.exchange_manager.wait_all(
+            {name: self._fetch_venue(name) for name in venues},
+            Config.SNAPSHOT_DEADLINE, "funding rates"
+        )
+
+    async def store(self, rates: Dict[str, Dict[str, Dict]]) -> None:
+        rows = [
+            (venue, symbol, int(rate['next_funding'] // 1000), rate['rate'])
+            for venue, venue_rates in rates.items()
+            for symbol, rate in venue_rates.items()
+            if rate['next_funding']
+        ]
+        if rows:
+            await db.execute_many(
+                "INSERT OR REPLACE INTO funding_rates (exchange, symbol, funding_time, rate) VALUES (?, ?, ?, ?)",
+                rows
+            )
+        await db.execute(
+            "DELETE FROM funding_rates WHERE funding_time < ?",
+            (int(time.time()) - Config.FUNDING_HISTORY_DAYS * 86400,)
+        )
+
+    async def history(self, symbol: str, exchange: Optional[str] = None) -> List[Tuple]:
+        """История ставок: (биржа, время начисления, ставка)"""
+        if exchange:
+            return await db.fetch(
+                "SELECT exchange, funding_time, rate FROM funding_rates "
+                "WHERE symbol = ? AND exchange = ? ORDER BY funding_time",
+                (symbol, exchange)
+            )
+        return await db.fetch(
+            "SELECT exchange, funding_time, rate FROM funding_rates WHERE symbol = ? ORDER BY funding_time",
+            (symbol,)
+        )
+
+    async def scan(self) -> List[Dict]:
+        rates = await self.fetch_rates()
+        if not rates:
+            return self.opportunities
+        self.rates = rates
+        self.opportunities = rank_funding(rates, self.min_carry)
+        self.updated = time.time()
+        try:
+            await self.store(rates)
+        except Exception as e:
+            logger.error(f"Error storing funding history: {e}")
+        return self.opportunities
+
+    async def latest(self) -> List[Dict]:
+        """Последнее ранжирование; биржи опрашиваются, только если фоновый
+        цикл не запущен, а ранжирования нет или оно старше ``FUNDING_REFRESH_INTERVAL``"""
+        running = self._task is not None and not self._task.done()
+        if not running and (self.updated is None or time.time() - self.updated > Config.FUNDING_REFRESH_INTERVAL):
+            return await self.scan()
+        return self.opportunities
+
+    def next_refresh_delay(self, now: Optional[float] = None) -> float:
+        """Пауза до следующего обновления: перед ближайшим начислением
+        и сразу после него, но не реже ``FUNDING_REFRESH_INTERVAL``"""
+        now = time.time() if now is None else now
+        lead = Config.FUNDING_REFRESH_LEAD
+        targets = [now + Config.FUNDING_REFRESH_INTERVAL]
+        for venue_rates in self.rates.values():
+            for rate in venue_rates.values():
+                if rate['next_funding']:
+                    funding = rate['next_funding'] / 1000
+                    targets.extend((funding - lead, funding + 5))
+        return max(min(t for t in targets if t > now + 1) - now, 1.0)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.scan()
+            except Exception as e:
+                logger.error(f"Funding scan error: {e}")
+            await asyncio.sleep(self.next_refresh_delay())
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
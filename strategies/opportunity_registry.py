@@ -0,0 +1,165 @@
+import logging
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from config.settings import Config
+from database.db_manager import db
+
+logger = logging.getLogger(__name__)
+
+# (символ, биржа покупки, биржа продажи)
+OpportunityKey = Tuple[str, str, str]
+
+
+def opportunity_key(opportunity: Dict) -> OpportunityKey:
+    return opportunity['symbol'], opportunity['buy_exchange'], opportunity['sell_exchange']
+
+
+class OpportunityRegistry:
+    """Жизненный цикл арбитражных возможностей.
+
+    Возможность с тем же ключом считается той же, пока её видят чаще, чем
+    раз в ``expiry`` секунд: обновляются время последнего наблюдения, пик
+    прибыли и скорость её снижения после пика. Уведомление отправляется
+    один раз за цикл жизни (повторно — только если прибыль выросла на
+    ``renotify_step`` п.п.). Закрытые циклы пишутся в таблицу
+    ``opportunity_lifecycles``; реестр с ``persist=False`` (в шардах и
+    воркерах, чьи возможности учитывает реестр бота) их только отбрасывает.
+    """
+
+    def __init__(self, expiry: float = Config.OPPORTUNITY_EXPIRY,
+                 renotify_step: float = Config.OPPORTUNITY_RENOTIFY_STEP,
+                 persist: bool = True):
+        self.expiry = expiry
+        self.renotify_step = renotify_step
+        self.persist = persist
+        self.suppressed = 0
+        self._open: Dict[OpportunityKey, Dict] = {}
+        self._acting: Dict[OpportunityKey, Set[int]] = {}
+        self._closed: List[Dict] = []
+
+    def observe(self, opportunity: Dict, now: Optional[float] = None) -> Dict:
+        """Учёт наблюдения возможности; возвращает запись её цикла жизни"""
+        now = time.time() if now is None else now
+        key = opportunity_key(opportunity)
+        record = self._open.get(key)
+        if record is not None and now - record['last_seen'] > self.expiry:
+            self._close(key)
+            record = None
+        profit = opportunity['profit']
+        if record is None:
+            record = {
+                'symbol': key[0],
+                'buy_exchange': key[1],
+                'sell_exchange': key[2],
+                'type': opportunity.get('type', 'spread'),
+                'first_seen': now,
+                'last_seen': now,
+                'peak_profit': profit,
+                'peak_at': now,
+                'last_profit': profit,
+                'observations': 0,
+                'notified_profit': None
+            }
+            self._open[key] = record
+        record['last_seen'] = now
+        record['last_profit'] = profit
+        record['observations'] += 1
+        if profit > record['peak_profit']:
+            record['peak_profit'], record['peak_at'] = profit, now
+        return record
+
+    @staticmethod
+    def decay_rate(record: Dict) -> float:
+        """Снижение прибыли после пика, п.п. в секунду"""
+        elapsed = record['last_seen'] - record['peak_at']
+        return (record['peak_profit'] - record['last_profit']) / elapsed if elapsed > 0 else 0.0
+
+    def should_notify(self, opportunity: Dict, now: Optional[float] = None) -> bool:
+        """True для новой возможности или заметно выросшей; отмечает уведомление"""
+        key = opportunity_key(opportunity)
+        record = self._open.get(key)
+        if record is None or (now or time.time()) - record['last_seen'] > self.expiry:
+            record = self.observe(opportunity, now)
+        notified = record['notified_profit']
+        if notified is not None and opportunity['profit'] < notified + self.renotify_step:
+            self.suppressed += 1
+            return False
+        record['notified_profit'] = opportunity['profit']
+        return True
+
+    def is_acting(self, opportunity: Dict, user_id: Optional[int] = None) -> bool:
+        """Исполняется ли возможность (для ``user_id`` или для кого-либо)"""
+        users = self._acting.get(opportunity_key(opportunity), set())
+        return bool(users) if user_id is None else user_id in users
+
+    def claim(self, opportunity: Dict, user_id: int) -> bool:
+        """Отметка «исполняется для пользователя»; False, если уже исполняется.
+
+        Захват общий для всех путей исполнения (конвейер мониторинга,
+        возможности шардов и воркеров, автоторговля), поэтому одна
+        возможность не исполняется для пользователя дважды.
+        """
+        users = self._acting.setdefault(opportunity_key(opportunity), set())
+        if user_id in users:
+            return False
+        users.add(user_id)
+        return True
+
+    def release(self, opportunity: Dict, user_id: int) -> None:
+        key = opportunity_key(opportunity)
+        users = self._acting.get(key)
+        if users is not None:
+            users.discard(user_id)
+            if not users:
+                del self._acting[key]
+
+    def _close(self, key: OpportunityKey) -> None:
+        record = self._open.pop(key)
+        record['decay_rate'] = self.decay_rate(record)
+        self._closed.append(record)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Закрытие возможностей, не виденных дольше ``expiry``"""
+        now = time.time() if now is None else now
+        stale = [key for key, record in self._open.items() if now - record['last_seen'] > self.expiry]
+        for key in stale:
+            self._close(key)
+        return len(stale)
+
+    async def flush(self, close_open: bool = False) -> int:
+        """Запись закрытых циклов в БД (при остановке — и открытых)"""
+        if close_open:
+            for key in list(self._open):
+                self._close(key)
+        closed, self._closed = self._closed, []
+        if not closed or not self.persist:
+            return 0
+        try:
+            await db.execute_many(
+                '''INSERT INTO opportunity_lifecycles
+                (symbol, buy_exchange, sell_exchange, type, first_seen, last_seen,
+                 peak_profit, peak_at, last_profit, decay_rate, observations, notified)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                [
+                    (r['symbol'], r['buy_exchange'], r['sell_exchange'], r['type'], r['first_seen'],
+                     r['last_seen'], r['peak_profit'], r['peak_at'], r['last_profit'], r['decay_rate'],
+                     r['observations'], r['notified_profit'] is not None)
+                    for r in closed
+                ]
+            )
+        except Exception as e:
+            logger.error(f"Error storing opportunity lifecycles: {e}")
+            self._closed = closed + self._closed
+            return 0
+        return len(closed)
+
+    def active(self) -> List[Dict]:
+        return list(self._open.values())
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'open': len(self._open),
+            'acting': sum(len(users) for users in self._acting.values()),
+            'pending_writes': len(self._closed),
+            'suppressed': self.suppressed
+        }
@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import time
+from collections import deque
+import ccxt
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+
+class PairStatistics:
+    """Скользящие моменты лог-цен вселенной символов за окно ``window`` баров.
+
+    Хранятся суммы x, x·xᵀ по окну и те же суммы для пар (x[t-1], Δx[t]),
+    поэтому новый бар обновляет все пары за O(N²) без пересчёта окна.
+    Для устойчивости цены центрируются по первому бару, а суммы
+    периодически пересчитываются с нуля.
+    """
+
+    def __init__(self, closes: np.ndarray, window: int):
+        self.window = window
+        self.ref = np.log(closes[0])
+        self.rows = deque((np.log(row) - self.ref for row in closes[-window:]), maxlen=window)
+        self._since_rebuild = 0
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        x = np.array(self.rows)
+        lag, diff = x[:-1], np.diff(x, axis=0)
+        self.sx, self.sxx = x.sum(axis=0), x.T @ x
+        self.sl, self.sll = lag.sum(axis=0), lag.T @ lag
+        self.sd, self.sdl = diff.sum(axis=0), diff.T @ lag
+        self._since_rebuild = 0
+
+    def push(self, close: np.ndarray) -> None:
+        """Добавление бара и вытеснение самого старого"""
+        new = np.log(close) - self.ref
+        oldest, second, last = self.rows[0], self.rows[1], self.rows[-1]
+        self.sx += new - oldest
+        self.sxx += np.outer(new, new) - np.outer(oldest, oldest)
+        diff_new, diff_old = new - last, second - oldest
+        self.sl += last - oldest
+        self.sll += np.outer(last, last) - np.outer(oldest, oldest)
+        self.sd += diff_new - diff_old
+        self.sdl += np.outer(diff_new, last) - np.outer(diff_old, oldest)
+        self.rows.append(new)
+
+        self._since_rebuild += 1
+        if self._since_rebuild >= self.window:
+            self._rebuild()
+
+    def compute(self) -> Dict[str, np.ndarray]:
+        """Бета, корреляция, z-score спреда и период полураспада для всех пар.
+
+        Матрицы ``[i, j]`` описывают спред ``log(p_i) - beta * log(p_j)``.
+        """
+        n = self.window
+        mean = self.sx / n
+        cov = self.sxx / n - np.outer(mean, mean)
+        var = np.diag(cov)
+        m = n - 1
+        cov_ll = self.sll / m - np.outer(self.sl / m, self.sl / m)
+        cov_dl = self.sdl / m - np.outer(self.sd / m, self.sl / m)
+        dl = np.diag(cov_dl)
+        ll = np.diag(cov_ll)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            beta = cov / var[None, :]
+            corr = cov / np.sqrt(np.outer(var, var))
+            residual = var[:, None] - cov * beta
+            last = self.rows[-1] - mean
+            z = (last[:, None] - beta * last[None, :]) / np.sqrt(residual)
+
+            # Регрессия Δs[t] на s[t-1]: lambda < 0 — спред возвращается к среднему
+            num = dl[:, None] - beta * (cov_dl + cov_dl.T) + beta ** 2 * dl[None, :]
+            den = ll[:, None] - 2 * beta * cov_ll + beta ** 2 * ll[None, :]
+            lam = num / den
+            half_life = np.where(lam < 0, -np.log(2) / lam, np.inf)
+
+        np.fill_diagonal(z, np.nan)
+        return {'beta': beta, 'correlation': corr, 'z_score': z, 'half_life': half_life}
+
+
+class PairScreener:
+    """Скринер статистического арбитража по всем парам вселенной.
+
+    Закрытые бары всех символов выравниваются по времени в одну матрицу;
+    дальше на каждом новом баре моменты обновляются инкрементально, а
+    результаты кэшируются до следующего бара.
+    """
+
+    def __init__(self, exchange_manager, symbols: Optional[List[str]] = None,
+                 exchange: str = 'binance', timeframe: str = Config.PAIR_TIMEFRAME,
+                 window: int = Config.OHLCV_LIMIT - 1):
+        self.exchange_manager = exchange_manager
+        self.symbols = symbols or [s for s in Config.TRADING_PAIRS if ':' not in s]
+        self.exchange = exchange
+        self.timeframe = timeframe
+        self.window = window
+        self.bar_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        self.universe: List[str] = []
+        self.last_bar: Optional[int] = None
+        self.stats: Optional[PairStatistics] = None
+        self._results: Optional[Dict[str, np.ndarray]] = None
+
+    async def _fetch_closes(self, limit: int) -> Dict[str, Dict[int, float]]:
+        async def fetch(symbol: str) -> Dict[int, float]:
+            async with self.exchange_manager.get_exchange(self.exchange, 'spot') as ex:
+                ohlcv = await ex.fetch_ohlcv(symbol, timeframe=self.timeframe, limit=limit)
+            now = time.time() * 1000
+            return {bar[0]: bar[4] for bar in ohlcv if bar[0] + self.bar_ms <= now and bar[4] is not None and bar[4] > 0}
+
+        results = await asyncio.gather(*(fetch(s) for s in self.symbols), return_exceptions=True)
+        closes = {}
+        for symbol, result in zip(self.symbols, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Pair screener: no candles for {symbol}: {result}")
+            elif result:
+                closes[symbol] = result
+        return closes
+
+    async def load(self) -> None:
+        """Полная загрузка окна по всей вселенной"""
+        closes = await self._fetch_closes(Config.OHLCV_LIMIT)
+        symbols = [s for s in self.symbols if len(closes.get(s, ())) >= self.window]
+        if len(symbols) < 2:
+            self.stats = None
+            return
+        common = sorted(set.intersection(*(set(closes[s]) for s in symbols)))[-self.window:]
+        if len(common) < self.window:
+            logger.warning(f"Pair screener: only {len(common)} aligned bars, need {self.window}")
+            self.stats = None
+            return
+        matrix = np.array([[closes[s][ts] for s in symbols] for ts in common], dtype=float)
+        self.universe = symbols
+        self.last_bar = common[-1]
+        self.stats = PairStatistics(matrix, self.window)
+        self._results = None
+
+    async def update(self) -> bool:
+        """Догрузка новых баров; True, если данные изменились"""
+        if self.stats is None:
+            await self.load()
+            return self.stats is not None
+
+        closes = await self._fetch_closes(Config.OHLCV_LIMIT)
+        new_bars = sorted(ts for ts in closes.get(self.universe[0], {}) if ts > self.last_bar)
+        if not new_bars:
+            return False
+        expected = range(self.last_bar + self.bar_ms, new_bars[-1] + 1, self.bar_ms)
+        if len(new_bars) != len(expected) or any(
+            ts not in closes.get(s, {}) for s in self.universe for ts in new_bars
+        ):
+            await self.load()  # пропуск баров или символ без данных — перестраиваем окно
+            return self.stats is not None
+
+        for ts in new_bars:
+            self.stats.push(np.array([closes[s][ts] for s in self.universe], dtype=float))
+        self.last_bar = new_bars[-1]
+        self._results = None
+        return True
+
+    def results(self) -> Optional[Dict[str, np.ndarray]]:
+        if self.stats is None:
+            return None
+        if self._results is None:
+            self._results = self.stats.compute()
+        return self._results
+
+    def screen(self, z_entry: float = Config.PAIR_Z_ENTRY,
+               min_correlation: float = Config.PAIR_MIN_CORRELATION,
+               max_half_life: float = Config.PAIR_MAX_HALF_LIFE) -> List[Dict]:
+        """Пары с отклонением спреда больше ``z_entry``, по убыванию |z|"""
+        results = self.results()
+        if results is None:
+            return []
+        z, corr, half_life, beta = (results[k] for k in ('z_score', 'correlation', 'half_life', 'beta'))
+        with np.errstate(invalid='ignore'):
+            mask = (np.abs(z) >= z_entry) & (corr >= min_correlation) & (half_life <= max_half_life)
+        first, second = np.nonzero(mask)
+        order = np.argsort(-np.abs(z[first, second]), kind='stable')
+        return [
+            {
+                'pair1': self.universe[i],
+                'pair2': self.universe[j],
+                'hedge_ratio': float(beta[i, j]),
+                'z_score': float(z[i, j]),
+                'half_life': float(half_life[i, j]),
+                'correlation': float(corr[i, j])
+            }
+            for i, j in ((first[k], second[k]) for k in order)
+        ]
+
+    async def scan(self) -> List[Dict]:
+        await self.update()
+        return self.screen()
+
+
+def _brute_force(closes: np.ndarray, i: int, j: int) -> Tuple[float, float, float]:
+    """Бета, z-score и полураспад одной пары напрямую (для проверки)"""
+    x = np.log(closes)
+    a, b = x[:, i], x[:, j]
+    beta = np.cov(a, b, bias=True)[0, 1] / np.var(b)
+    spread = a - beta * b
+    z = (spread[-1] - spread.mean()) / spread.std()
+    lag, diff = spread[:-1], np.diff(spread)
+    lam = np.cov(diff, lag, bias=True)[0, 1] / np.var(lag)
+    half_life = -np.log(2) / lam if lam < 0 else np.inf
+    return beta, z, half_life
+
+
+def benchmark(n_symbols: int = 200, window: int = 100, bars: int = 20, seed: int = 0) -> Dict[str, float]:
+    """Время на бар (мс): инкрементальное обновление моментов против
+    пересчёта окна и отдельно расчёт метрик всех пар"""
+    rng = np.random.default_rng(seed)
+    walk = np.exp(np.cumsum(rng.normal(0, 0.01, (window + bars, n_symbols)), axis=0)) * 100
+
+    stats = PairStatistics(walk[:window], window)
+    started = time.perf_counter()
+    for t in range(window, window + bars):
+        stats.push(walk[t])
+    incremental = (time.perf_counter() - started) / bars * 1000
+
+    started = time.perf_counter()
+    for t in range(window, window + bars):
+        PairStatistics(walk[t - window + 1:t + 1], window)
+    full = (time.perf_counter() - started) / bars * 1000
+
+    started = time.perf_counter()
+    for _ in range(bars):
+        result = stats.compute()
+    compute = (time.perf_counter() - started) / bars * 1000
+
+    beta, z, _ = _brute_force(walk[bars:], 0, 1)
+    assert np.isclose(beta, result['beta'][0, 1]) and np.isclose(z, result['z_score'][0, 1])
+    return {'incremental': incremental, 'full': full, 'compute': compute}
+
+
+if __name__ == "__main__":
+    for n in (30, 200, 500):
+        result = benchmark(n)
+        print(f"{n} symbols ({n * (n - 1)} pairs): update {result['incremental']:.2f} ms/bar "
+              f"(full window {result['full']:.2f} ms), metrics {result['compute']:.2f} ms")
@@ -1,88 +1,65 @@
 import logging
 from typing import Dict, List, Optional
 from config.settings import Config
+from strategies.funding import FundingRateScanner
+from strategies.pair_screener import PairScreener
+from strategies.triangular import TriangularArbitrageEngine
 
 logger = logging.getLogger(__name__)
 
 class TradingStrategies:
+    # Движки циклического арбитража по биржам: граф строится один раз,
+    # дальше обновляются только веса рёбер
+    _triangular_engines: Dict[str, TriangularArbitrageEngine] = {}
+
     @staticmethod
-    async def triangular_arbitrage(symbols: List[str]) -> Optional[Dict]:
+    async def triangular_arbitrage(exchange_manager, exchange: str = 'binance',
+                                   max_legs: int = 4) -> Optional[List[Dict]]:
         try:
-            if len(symbols) != 3:
-                return None
-                
-            prices = {}
-            for symbol in symbols:
-                symbol_prices = await exchange_manager.get_prices(symbol)
-                if not symbol_prices or 'binance_spot' not in symbol_prices:
-                    return None
-                prices[symbol] = symbol_prices['binance_spot']['ask']
-            
-            rate1 = prices[symbols[0]]
-            rate2 = prices[symbols[1]]
-            rate3 = prices[symbols[2]]
-            
-            effective_rate = rate1 * rate2 / rate3
-            profit = (effective_rate - 1) * 100 - Config.COMMISSION * 3
-            
-            if profit >= Config.MIN_PROFIT:
-                return {
-                    'symbols': symbols,
-                    'profit': profit,
-                    'path': f"{symbols[0]} -> {symbols[1]} -> {symbols[2]}"
-                }
-            return None
+            engine = TradingStrategies._triangular_engines.get(exchange)
+            if engine is None or engine.exchange_manager is not exchange_manager:
+                engine = TriangularArbitrageEngine(exchange_manager, exchange)
+                TradingStrategies._triangular_engines[exchange] = engine
+            cycles = await engine.scan(max_legs)
+            return cycles if cycles else None
         except Exception as e:
             logger.error(f"Triangular arbitrage error: {e}")
             return None
         
+    # Общий сканер ставок финансирования: ранжирование обновляет его
+    # фоновый цикл, стратегия только читает последний результат
+    _funding_scanner: Optional[FundingRateScanner] = None
+
     @staticmethod
-    async def funding_rate_arbitrage() -> Optional[Dict]:
+    def use_funding_scanner(scanner: FundingRateScanner) -> None:
+        TradingStrategies._funding_scanner = scanner
+
+    @staticmethod
+    async def funding_rate_arbitrage(exchange_manager,
+                                     funding_scanner: Optional[FundingRateScanner] = None) -> Optional[List[Dict]]:
         try:
-            async with exchange_manager.get_exchange('binance', 'futures') as binance_futures:
-                rates = await binance_futures.fetch_funding_rates()
-                
-                opportunities = []
-                for symbol, rate in rates.items():
-                    if abs(rate['fundingRate']) > 0.0005:
-                        opportunities.append({
-                            'symbol': symbol,
-                            'rate': rate['fundingRate'],
-                            'nextFunding': rate['nextFundingTime']
-                        })
-                
-                return opportunities if opportunities else None
+            scanner = funding_scanner or TradingStrategies._funding_scanner
+            if scanner is None or scanner.exchange_manager is not exchange_manager:
+                scanner = FundingRateScanner(exchange_manager)
+                TradingStrategies._funding_scanner = scanner
+            opportunities = await scanner.latest()
+            return opportunities if opportunities else None
         except Exception as e:
             logger.error(f"Funding rate arbitrage error: {e}")
             return None
         
+    # Скринеры пар по биржам: окно цен обновляется инкрементально между вызовами
+    _pair_screeners: Dict[str, PairScreener] = {}
+
     @staticmethod
-    async def statistical_arbitrage(pair1: str, pair2: str) -> Optional[Dict]:
+    async def statistical_arbitrage(exchange_manager, exchange: str = 'binance') -> Optional[List[Dict]]:
         try:
-            async with exchange_manager.get_exchange('binance', 'spot') as exchange:
-                ohlcv1 = await exchange.fetch_ohlcv(pair1, timeframe='1h', limit=100)
-                ohlcv2 = await exchange.fetch_ohlcv(pair2, timeframe='1h', limit=100)
-                
-                closes1 = np.array([x[4] for x in ohlcv1])
-                closes2 = np.array([x[4] for x in ohlcv2])
-                
-                ratio = closes1 / closes2
-                mean = np.mean(ratio)
-                std = np.std(ratio)
-                
-                current_ratio = ratio[-1]
-                z_score = (current_ratio - mean) / std
-                
-                if abs(z_score) > 2.0:
-                    return {
-                        'pair1': pair1,
-                        'pair2': pair2,
-                        'z_score': z_score,
-                        'current_ratio': current_ratio,
-                        'mean_ratio': mean,
-                        'std_dev': std
-                    }
-                return None
+            screener = TradingStrategies._pair_screeners.get(exchange)
+            if screener is None or screener.exchange_manager is not exchange_manager:
+                screener = PairScreener(exchange_manager, exchange=exchange)
+                TradingStrategies._pair_screeners[exchange] = screener
+            pairs = await screener.scan()
+            return pairs if pairs else None
         except Exception as e:
             logger.error(f"Statistical arbitrage error: {e}")
-            return None
\ No newline at end of file
+            return None
@@ -0,0 +1,205 @@
+import logging
+import math
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+
+class CurrencyGraph:
+    """Граф валют одной биржи для поиска циклического арбитража.
+
+    Рынок BASE/QUOTE даёт два ребра: QUOTE → BASE (покупка по ask) и
+    BASE → QUOTE (продажа по bid). Вес ребра — ``-log`` курса с учётом
+    комиссии, так что цикл прибылен, когда сумма весов отрицательна.
+    Тикеры обновляют веса рёбер на месте, а поиск можно ограничить
+    циклами через изменившиеся рынки.
+    """
+
+    def __init__(self):
+        self.adj: Dict[str, Set[str]] = {}
+        self.radj: Dict[str, Set[str]] = {}
+        self.weights: Dict[Tuple[str, str], float] = {}
+        self.edge_symbols: Dict[Tuple[str, str], str] = {}
+        self.pairs: Dict[str, Tuple[str, str]] = {}
+        self.fees: Dict[str, float] = {}
+
+    @classmethod
+    def from_markets(cls, markets: Dict[str, Dict],
+                     taker: Optional[Callable[[str], float]] = None) -> 'CurrencyGraph':
+        """Граф по активным спотовым рынкам ccxt.
+
+        ``taker`` — комиссия тейкера рынка в % (например, из ``FeeTable``);
+        без него берётся ``taker`` рынка или ``Config.COMMISSION``.
+        """
+        graph = cls()
+        for symbol, market in markets.items():
+            if not market.get('spot') or market.get('active') is False:
+                continue
+            if taker is not None:
+                fee = taker(symbol)
+            else:
+                fee = market['taker'] * 100 if market.get('taker') is not None else Config.COMMISSION
+            graph.add_market(symbol, market['base'], market['quote'], fee)
+        return graph
+
+    def add_market(self, symbol: str, base: str, quote: str, fee: float) -> None:
+        self.pairs[symbol] = (base, quote)
+        self.fees[symbol] = fee
+        for u, v in ((quote, base), (base, quote)):
+            self.adj.setdefault(u, set()).add(v)
+            self.radj.setdefault(v, set()).add(u)
+            self.edge_symbols[(u, v)] = symbol
+
+    def update_ticker(self, symbol: str, bid: Optional[float], ask: Optional[float]) -> bool:
+        """Обновление весов двух рёбер рынка; False, если рынок неизвестен"""
+        pair = self.pairs.get(symbol)
+        if pair is None:
+            return False
+        base, quote = pair
+        keep = 1 - self.fees[symbol] / 100
+        if ask:
+            self.weights[(quote, base)] = -math.log(keep / ask)
+        else:
+            self.weights.pop((quote, base), None)
+        if bid:
+            self.weights[(base, quote)] = -math.log(bid * keep)
+        else:
+            self.weights.pop((base, quote), None)
+        return True
+
+    def apply_tickers(self, tickers: Dict[str, Dict]) -> Set[str]:
+        """Применение тикеров ``fetch_tickers``; возвращает изменившиеся рынки"""
+        changed = set()
+        for symbol, ticker in tickers.items():
+            old = (self.weights.get(self._edge(symbol, 0)), self.weights.get(self._edge(symbol, 1)))
+            if self.update_ticker(symbol, ticker.get('bid'), ticker.get('ask')):
+                new = (self.weights.get(self._edge(symbol, 0)), self.weights.get(self._edge(symbol, 1)))
+                if new != old:
+                    changed.add(symbol)
+        return changed
+
+    def _edge(self, symbol: str, direction: int) -> Tuple[str, str]:
+        base, quote = self.pairs.get(symbol, (None, None))
+        return (quote, base) if direction == 0 else (base, quote)
+
+    def _cycles_through(self, u: str, v: str, max_legs: int) -> Iterable[Tuple[str, ...]]:
+        """Циклы, начинающиеся ребром u → v"""
+        weights = self.weights
+        for w in self.adj.get(v, ()):
+            if w == u or (v, w) not in weights:
+                continue
+            if u in self.adj.get(w, ()) and (w, u) in weights:
+                yield (u, v, w)
+            if max_legs >= 4:
+                for x in self.adj.get(w, ()) & self.radj.get(u, set()):
+                    if x != v and (w, x) in weights and (x, u) in weights:
+                        yield (u, v, w, x)
+
+    @staticmethod
+    def _canonical(cycle: Tuple[str, ...]) -> Tuple[str, ...]:
+        start = cycle.index(min(cycle))
+        return cycle[start:] + cycle[:start]
+
+    def _describe(self, cycle: Tuple[str, ...]) -> Dict:
+        legs = list(zip(cycle, cycle[1:] + cycle[:1]))
+        total = sum(self.weights[leg] for leg in legs)
+        symbols = [self.edge_symbols[leg] for leg in legs]
+        return {
+            'currencies': list(cycle),
+            'symbols': symbols,
+            'sides': ['buy' if self.pairs[s][1] == leg[0] else 'sell' for s, leg in zip(symbols, legs)],
+            'profit': (math.exp(-total) - 1) * 100,
+            'path': ' -> '.join(cycle + cycle[:1])
+        }
+
+    def find_cycles(self, changed: Optional[Iterable[str]] = None, max_legs: int = 4,
+                    min_profit: float = Config.MIN_PROFIT) -> List[Dict]:
+        """Прибыльные циклы из 3 и ``max_legs`` ног, по убыванию прибыли.
+
+        Если передан ``changed``, проверяются только циклы через эти рынки.
+        """
+        if changed is None:
+            starts = [(u, v) for (u, v) in self.weights]
+        else:
+            starts = [
+                edge for symbol in changed if symbol in self.pairs
+                for edge in (self._edge(symbol, 0), self._edge(symbol, 1))
+                if edge in self.weights
+            ]
+
+        threshold = -math.log(1 + min_profit / 100)
+        seen = set()
+        found = []
+        for u, v in starts:
+            for cycle in self._cycles_through(u, v, max_legs):
+                if changed is None and u != min(cycle):
+                    continue  # при полном обходе каждый цикл берём один раз
+                key = self._canonical(cycle)
+                if key in seen:
+                    continue
+                seen.add(key)
+                legs = zip(cycle, cycle[1:] + cycle[:1])
+                if sum(self.weights[leg] for leg in legs) <= threshold:
+                    found.append(self._describe(key))
+        return sorted(found, key=lambda x: -x['profit'])
+
+
+class TriangularArbitrageEngine:
+    """Поиск циклического арбитража на бирже по каждому срезу тикеров.
+
+    Движок хранит текущий набор прибыльных циклов: после первого полного
+    обхода пересчитываются только циклы через изменившиеся рынки, а
+    остальные циклы набора остаются с прежней прибылью. Комиссии рынков
+    берутся из ``exchange_manager.fees``.
+    """
+
+    def __init__(self, exchange_manager, exchange: str = 'binance'):
+        self.exchange_manager = exchange_manager
+        self.exchange = exchange
+        self.graph: Optional[CurrencyGraph] = None
+        self.live: Dict[Tuple[str, ...], Dict] = {}
+
+    def _build_graph(self, markets: Dict[str, Dict]) -> CurrencyGraph:
+        fees = getattr(self.exchange_manager, 'fees', None)
+        if fees is None:
+            return CurrencyGraph.from_markets(markets)
+        venue = f"{self.exchange}_spot"
+        return CurrencyGraph.from_markets(markets, lambda symbol: fees.taker(venue, symbol))
+
+    def _merge(self, cycles: List[Dict], changed: Optional[Set[str]]) -> None:
+        """Обновление набора: циклы через ``changed`` заменяются найденными"""
+        if changed is None:
+            self.live = {}
+        else:
+            self.live = {
+                key: cycle for key, cycle in self.live.items()
+                if changed.isdisjoint(cycle['symbols'])
+            }
+        for cycle in cycles:
+            cycle['exchange'] = self.exchange
+            self.live[tuple(cycle['currencies'])] = cycle
+
+    async def scan(self, max_legs: int = 4) -> List[Dict]:
+        """Текущие прибыльные циклы биржи по убыванию прибыли"""
+        try:
+            async with self.exchange_manager.get_exchange(self.exchange, 'spot') as ex:
+                full = self.graph is None
+                if full:
+                    await ex.load_markets()
+                    self.graph = self._build_graph(ex.markets)
+                tickers = await ex.fetch_tickers()
+
+            updated = self.graph.apply_tickers(tickers)
+            changed = None if full else updated
+            started = time.perf_counter()
+            cycles = self.graph.find_cycles(changed, max_legs)
+            self._merge(cycles, changed)
+            logger.debug(f"Cycle search on {self.exchange}: {len(updated)} markets changed, "
+                         f"{len(cycles)} cycles re-evaluated, {len(self.live)} live "
+                         f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+            return sorted(self.live.values(), key=lambda x: -x['profit'])
+        except Exception as e:
+            logger.error(f"Triangular arbitrage scan error on {self.exchange}: {e}")
+            return []
@@ -0,0 +1,143 @@
+import abc
+import json
+import logging
+import sqlite3
+import time
+from typing import Dict, List, Tuple, Type
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+
+class MessageBus(abc.ABC):
+    """Шина между воркерами мониторинга и ботом.
+
+    Два примитива: упорядоченные топики сообщений (``publish``/``fetch`` по
+    возрастающему id) и присутствие участников (``heartbeat``/``members``).
+    Реализации регистрируются в ``BUS_BACKENDS`` по схеме URL.
+    """
+
+    @abc.abstractmethod
+    async def publish(self, topic: str, message: Dict) -> int:
+        ...
+
+    @abc.abstractmethod
+    async def fetch(self, topic: str, after: int = 0, limit: int = 500) -> List[Tuple[int, Dict]]:
+        """Сообщения топика с id больше ``after``"""
+
+    @abc.abstractmethod
+    async def last_id(self, topic: str) -> int:
+        ...
+
+    @abc.abstractmethod
+    async def heartbeat(self, member: str, info: Dict) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def members(self, timeout: float = Config.BUS_HEARTBEAT_TIMEOUT) -> Dict[str, Dict]:
+        """Участники, присылавшие heartbeat не позже ``timeout`` секунд назад"""
+
+    @abc.abstractmethod
+    async def leave(self, member: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def prune(self, max_age: float = Config.BUS_RETENTION) -> int:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteBus(MessageBus):
+    """Локальная реализация шины в файле SQLite.
+
+    Подходит для нескольких процессов на одной машине и для тестов;
+    между машинами нужен сетевой брокер с тем же интерфейсом.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        with self.conn:
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS bus_messages (
+                message_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                topic TEXT,
+                payload TEXT,
+                created REAL
+            );
+
+            CREATE INDEX IF NOT EXISTS bus_messages_topic ON bus_messages (topic, message_id);
+
+            CREATE TABLE IF NOT EXISTS bus_members (
+                member TEXT PRIMARY KEY,
+                seen REAL,
+                info TEXT
+            );
+            ''')
+
+    async def publish(self, topic: str, message: Dict) -> int:
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO bus_messages (topic, payload, created) VALUES (?, ?, ?)",
+                (topic, json.dumps(message, default=float), time.time())
+            )
+        return cursor.lastrowid
+
+    async def fetch(self, topic: str, after: int = 0, limit: int = 500) -> List[Tuple[int, Dict]]:
+        rows = self.conn.execute(
+            "SELECT message_id, payload FROM bus_messages WHERE topic = ? AND message_id > ? "
+            "ORDER BY message_id LIMIT ?",
+            (topic, after, limit)
+        ).fetchall()
+        return [(message_id, json.loads(payload)) for message_id, payload in rows]
+
+    async def last_id(self, topic: str) -> int:
+        row = self.conn.execute(
+            "SELECT MAX(message_id) FROM bus_messages WHERE topic = ?", (topic,)
+        ).fetchone()
+        return row[0] or 0
+
+    async def heartbeat(self, member: str, info: Dict) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO bus_members (member, seen, info) VALUES (?, ?, ?)",
+                (member, time.time(), json.dumps(info, default=float))
+            )
+
+    async def members(self, timeout: float = Config.BUS_HEARTBEAT_TIMEOUT) -> Dict[str, Dict]:
+        rows = self.conn.execute(
+            "SELECT member, seen, info FROM bus_members WHERE seen >= ?", (time.time() - timeout,)
+        ).fetchall()
+        return {member: {**json.loads(info), 'seen': seen} for member, seen, info in rows}
+
+    async def leave(self, member: str) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM bus_members WHERE member = ?", (member,))
+
+    async def prune(self, max_age: float = Config.BUS_RETENTION) -> int:
+        with self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM bus_messages WHERE created < ?", (time.time() - max_age,)
+            )
+        return cursor.rowcount
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+BUS_BACKENDS: Dict[str, Type[MessageBus]] = {
+    'sqlite': SQLiteBus
+}
+
+
+def open_bus(url: str = Config.BUS_URL) -> MessageBus:
+    """Шина по URL вида ``<схема>://<адрес>``, например ``sqlite:///bus.db``"""
+    scheme, sep, address = url.partition('://')
+    if not sep or scheme not in BUS_BACKENDS:
+        raise ValueError(f"Unsupported message bus URL: {url!r}")
+    if scheme == 'sqlite':
+        address = address[1:] if address.startswith('/') else address
+    return BUS_BACKENDS[scheme](address)
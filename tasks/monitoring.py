@@ -1,22 +1,28 @@
 import logging
-from datetime import datetime
-from typing import Dict
+from typing import Dict, Optional
 from config.settings import Config
 from database.db_manager import db
 from exchanges.exchange_manager import ExchangeManager
-from strategies.arbitrage import ArbitrageEngine
-from analysis.risk_manager import RiskManager
-from analysis.liquidity import LiquidityAnalyzer
-from strategies.auto_strategies import AutoStrategies
-from utils.notifications import notify_users
+from strategies.opportunity_registry import OpportunityRegistry
+from tasks.pipeline import VIP_TRADERS_QUERY, MonitoringPipeline, execute_for_users
+from trading.arbitrage_executor import ArbitrageExecutor
 
 logger = logging.getLogger(__name__)
-exchange_manager = ExchangeManager()
-auto_strategies = AutoStrategies(exchange_manager)
+_pipelines: Dict[int, MonitoringPipeline] = {}
+_executors: Dict[int, ArbitrageExecutor] = {}
 
 class TradingModule:
     @staticmethod
-    async def execute_arbitrage(user_id: int, opportunity: Dict, exchange_manager: ExchangeManager) -> bool:
+    def executor(exchange_manager: ExchangeManager) -> ArbitrageExecutor:
+        """Исполнитель арбитража менеджера (один на менеджер)"""
+        executor = _executors.get(id(exchange_manager))
+        if executor is None or executor.exchange_manager is not exchange_manager:
+            executor = ArbitrageExecutor(exchange_manager)
+            _executors[id(exchange_manager)] = executor
+        return executor
+
+    @staticmethod
+    async def execute_arbitrage(user_id: int, opportunity: Dict, exchange_manager: ExchangeManager) -> Dict:
         """
         Execute arbitrage trade for a user
         Args:
@@ -24,85 +30,86 @@ class TradingModule:
             opportunity: Arbitrage opportunity details
             exchange_manager: Exchange manager instance
         Returns:
-            bool: True if trade was successful
+            Dict: ``ArbitrageExecutor.execute`` result; ``status`` is ``skipped``
+            below the minimum order size and ``error`` if execution raised
         """
-        # Implement your arbitrage execution logic here
         try:
-            # Example implementation:
-            # order = await exchange_manager.create_order(...)
-            # return order is not None
-            return True  # Placeholder
+            amount = min(
+                opportunity.get('executable_amount', float('inf')),
+                Config.MAX_ORDER_SIZE / opportunity['buy_price']
+            )
+            if amount * opportunity['buy_price'] < Config.MIN_ORDER_SIZE:
+                return {'status': 'skipped'}
+            executor = TradingModule.executor(exchange_manager)
+            result = await executor.execute(user_id, opportunity, amount)
+            await executor.record(user_id, result)
+            return result
         except Exception as e:
             logger.error(f"Arbitrage execution failed for user {user_id}: {e}")
-            return False
+            return {'status': 'error', 'message': str(e)}
+
+    @staticmethod
+    async def execute_for_vip(opportunity: Dict, exchange_manager: ExchangeManager,
+                              registry: OpportunityRegistry) -> None:
+        """Исполнение возможности для VIP-пользователей вне конвейера.
+
+        Для возможностей от шардов и воркеров шины: как стадия ``execute``
+        конвейера, возможность захватывается в ``registry`` для каждого
+        пользователя на время исполнения, чтобы её не исполнили повторно.
+        """
+        if opportunity.get('type') == 'basis':
+            return
+        vip_users = [user_id for (user_id,) in await db.fetch(VIP_TRADERS_QUERY)]
+        if vip_users:
+            await execute_for_users(
+                TradingModule.execute_arbitrage, vip_users, opportunity, exchange_manager, registry
+            )
 
-async def monitor_markets(exchange_manager: ExchangeManager) -> None:
+async def monitor_markets(exchange_manager: ExchangeManager, funding_scanner=None,
+                          registry: Optional[OpportunityRegistry] = None) -> None:
     """
     Main market monitoring function that:
     - Checks liquidity for trading pairs
     - Finds arbitrage opportunities
+    - Finds spot-perpetual basis opportunities
     - Validates risks
     - Executes trades for VIP users
+    - Notifies users once per opportunity lifecycle (see ``OpportunityRegistry``)
     - Checks active strategies
+
+    Стадии выполняются конвейером ``MonitoringPipeline``, который живёт
+    между циклами вместе с клиентами ``exchange_manager``.
     """
-    exchange_manager = ExchangeManager()
-    liquidity_analyzer = LiquidityAnalyzer(exchange_manager)
-    risk_manager = RiskManager(exchange_manager)
-    arbitrage_engine = ArbitrageEngine(exchange_manager)
-    auto_strategies = AutoStrategies(exchange_manager)
-    
+    pipeline = _pipelines.get(id(exchange_manager))
+    if pipeline is None or pipeline.exchange_manager is not exchange_manager:
+        pipeline = MonitoringPipeline(
+            exchange_manager, funding_scanner, registry, executor=TradingModule.execute_arbitrage
+        )
+        _pipelines[id(exchange_manager)] = pipeline
+
     try:
         logger.info("Starting market monitoring cycle")
-        
-        for symbol in Config.TRADING_PAIRS:
-            try:
-                # 1. Check liquidity
-                liquidity = await liquidity_analyzer.get_liquidity_score(symbol)
-                if liquidity < Config.MIN_LIQUIDITY:  # Add MIN_LIQUIDITY to your Config
-                    logger.debug(f"Skipping {symbol} due to low liquidity: {liquidity}")
-                    continue
-                    
-                # 2. Find arbitrage opportunities
-                opportunity = await arbitrage_engine.find_opportunities(symbol)
-                if not opportunity:
-                    logger.debug(f"No arbitrage opportunities found for {symbol}")
-                    continue
-                    
-                # 3. Validate opportunity risks
-                if not await risk_manager.validate_opportunity(opportunity):
-                    logger.debug(f"Arbitrage opportunity for {symbol} failed risk validation")
-                    continue
-                    
-                # 4. Execute for VIP users
-                vip_users = await db.fetch(
-                    "SELECT user_id FROM users WHERE vip_until > datetime('now') AND api_keys != '{}'"
-                )
-                
-                for (user_id,) in vip_users:
-                    success = await TradingModule.execute_arbitrage(
-                        user_id, opportunity, exchange_manager
-                    )
-                    if success:
-                        logger.info(f"Successfully executed arbitrage for user {user_id} on {symbol}")
-                    else:
-                        logger.warning(f"Failed to execute arbitrage for user {user_id} on {symbol}")
-                
-                # 5. Notify users about opportunity
-                await notify_users(opportunity)
-                
-            except Exception as e:
-                logger.error(f"Monitoring error for {symbol}: {e}", exc_info=True)
-        
-        # 6. Check active strategies
-        await auto_strategies.check_strategies()
-        
+        metrics = await pipeline.run_cycle()
+        cycle = metrics['cycle']
+        logger.info(f"Market monitoring cycle completed in {cycle['seconds']:.2f}s: "
+                    f"{cycle['opportunities']} arbitrage, {cycle['basis']} basis")
+        for name in ('snapshot', *MonitoringPipeline.STAGES):
+            stage = metrics[name]
+            logger.info(f"Stage {name}: {stage['processed']} in, {stage['passed']} out, "
+                        f"{stage['errors']} errors, {stage['throughput']:.1f}/s, "
+                        f"p95 {stage.get('p95_ms', 0):.1f} ms")
     except Exception as e:
         logger.error(f"Market monitoring failed: {e}", exc_info=True)
         raise
-    finally:
-        await exchange_manager.close_all()
-        logger.info("Market monitoring cycle completed")
 
 if __name__ == "__main__":
     import asyncio
-    asyncio.run(monitor_markets())
+
+    async def main():
+        exchange_manager = ExchangeManager()
+        try:
+            await monitor_markets(exchange_manager)
+        finally:
+            await exchange_manager.close_all()
+
+    asyncio.run(main())
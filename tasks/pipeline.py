@@ -0,0 +1,269 @@
+import asyncio
+import contextlib
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+from config.settings import Config
+from database.db_manager import db
+from analysis.liquidity import LiquidityAnalyzer
+from analysis.risk_manager import RiskManager
+from strategies.arbitrage import ArbitrageEngine
+from strategies.auto_strategies import AutoStrategies
+from strategies.basis import BasisEngine
+from strategies.depth_arbitrage import DepthArbitrageEngine
+from strategies.opportunity_registry import OpportunityRegistry
+from strategies.spread_matrix import best_per_symbol
+from utils.notifications import notify_users
+
+logger = logging.getLogger(__name__)
+
+Stage = Callable[[Dict], Awaitable[Optional[Dict]]]
+Executor = Callable[[int, Dict, object], Awaitable[Dict]]
+
+# VIP-пользователи с ключами API: для них возможности исполняются автоматически
+VIP_TRADERS_QUERY = "SELECT user_id FROM users WHERE vip_until > datetime('now') AND api_keys != '{}'"
+
+
+async def execute_for_users(executor: Executor, user_ids: List[int], opportunity: Dict,
+                            exchange_manager, registry: OpportunityRegistry) -> Dict[int, object]:
+    """Параллельное исполнение возможности для пользователей с журналом исходов.
+
+    Возможность захватывается в ``registry`` для каждого пользователя;
+    пользователи, для которых она уже исполняется, пропускаются.
+    """
+    symbol = opportunity['symbol']
+    user_ids = [user_id for user_id in user_ids if registry.claim(opportunity, user_id)]
+    try:
+        results = await asyncio.gather(*(
+            executor(user_id, opportunity, exchange_manager) for user_id in user_ids
+        ), return_exceptions=True)
+    finally:
+        for user_id in user_ids:
+            registry.release(opportunity, user_id)
+    for user_id, result in zip(user_ids, results):
+        status = result.get('status') if isinstance(result, dict) else 'error'
+        if status in ('filled', 'partial', 'hedged'):
+            logger.info(f"Successfully executed arbitrage for user {user_id} on {symbol}: {status}")
+        elif status == 'unwound':
+            logger.warning(f"Arbitrage for user {user_id} on {symbol} was unwound, no net position")
+        elif status == 'exposed':
+            logger.error(f"Arbitrage for user {user_id} on {symbol} left an open position")
+        elif status != 'skipped':
+            logger.warning(f"Failed to execute arbitrage for user {user_id} on {symbol}: {status}")
+    return dict(zip(user_ids, results))
+
+
+class StageMetrics:
+    """Счётчики и задержки одной стадии за цикл"""
+
+    def __init__(self, window: int = 1000):
+        self.processed = 0
+        self.passed = 0
+        self.errors = 0
+        self.busy = 0.0
+        self._latencies = deque(maxlen=window)
+
+    def record(self, elapsed: float, passed: bool) -> None:
+        self.processed += 1
+        self.passed += passed
+        self.busy += elapsed
+        self._latencies.append(elapsed)
+
+    def summary(self, cycle_time: float) -> Dict[str, float]:
+        latencies = sorted(self._latencies)
+        result = {
+            'processed': self.processed,
+            'passed': self.passed,
+            'errors': self.errors,
+            'throughput': self.processed / cycle_time if cycle_time > 0 else 0.0
+        }
+        if latencies:
+            result.update({
+                'avg_ms': sum(latencies) / len(latencies) * 1000,
+                'p95_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+                'max_ms': latencies[-1] * 1000
+            })
+        return result
+
+
+class MonitoringPipeline:
+    """Конвейер цикла мониторинга.
+
+    Срез цен ранжируется один раз, затем возможности проходят стадии
+    liquidity → depth → risk → execute → notify, соединённые ограниченными
+    очередями. У каждой стадии свой пул воркеров (``PIPELINE_WORKERS``), а
+    обращения к одной бирже из всех стадий ограничены
+    ``PIPELINE_VENUE_CONCURRENCY``. Метрики стадий за последний цикл —
+    в ``metrics``. ``executor(user_id, opportunity, exchange_manager)``
+    исполняет возможность для VIP-пользователя, ``notifier`` получает
+    возможности, прошедшие все стадии (по умолчанию — рассылка в Telegram),
+    один раз за цикл жизни; с ``notify_once=False`` — каждую, а отбор
+    уведомлений остаётся получателю (шарды и воркеры шины).
+    """
+
+    STAGES = ('liquidity', 'depth', 'risk', 'execute', 'notify')
+
+    def __init__(self, exchange_manager, funding_scanner=None,
+                 registry: Optional[OpportunityRegistry] = None,
+                 executor: Optional[Executor] = None,
+                 notifier: Callable[[Dict], Awaitable] = notify_users,
+                 check_strategies: bool = True,
+                 notify_once: bool = True,
+                 workers: Optional[Dict[str, int]] = None,
+                 venue_concurrency: int = Config.PIPELINE_VENUE_CONCURRENCY,
+                 queue_size: int = Config.PIPELINE_QUEUE_SIZE):
+        self.exchange_manager = exchange_manager
+        self.registry = registry or OpportunityRegistry()
+        self.executor = executor
+        self.notifier = notifier
+        self.check_strategies = check_strategies
+        self.notify_once = notify_once
+        self.workers = {**Config.PIPELINE_WORKERS, **(workers or {})}
+        self.venue_concurrency = venue_concurrency
+        self.queue_size = queue_size
+        self.liquidity_analyzer = LiquidityAnalyzer(exchange_manager)
+        self.risk_manager = RiskManager(exchange_manager)
+        self.arbitrage_engine = ArbitrageEngine(exchange_manager)
+        self.basis_engine = BasisEngine(exchange_manager, funding_scanner)
+        self.depth_engine = DepthArbitrageEngine(self.liquidity_analyzer)
+        self.auto_strategies = AutoStrategies(exchange_manager)
+        self.metrics: Dict[str, Dict] = {}
+        self._venue_limits: Dict[str, asyncio.Semaphore] = {}
+        self._vip_users: List[int] = []
+
+    @contextlib.asynccontextmanager
+    async def _venues(self, *venues: str):
+        """Слоты бирж (в фиксированном порядке, чтобы не было взаимных блокировок)"""
+        names = sorted({venue.rsplit('_', 1)[0] for venue in venues})
+        limits = [
+            self._venue_limits.setdefault(name, asyncio.Semaphore(self.venue_concurrency))
+            for name in names
+        ]
+        async with contextlib.AsyncExitStack() as stack:
+            for limit in limits:
+                await stack.enter_async_context(limit)
+            yield
+
+    async def _liquidity(self, opportunity: Dict) -> Optional[Dict]:
+        symbol = opportunity['symbol']
+        legs = (
+            (opportunity.get('buy_symbol', symbol), opportunity['buy_exchange']),
+            (opportunity.get('sell_symbol', symbol), opportunity['sell_exchange'])
+        )
+        async with self._venues(*(venue for _, venue in legs)):
+            scores = await asyncio.gather(*(
+                self.liquidity_analyzer.get_liquidity_score(leg_symbol, *venue.rsplit('_', 1))
+                for leg_symbol, venue in legs
+            ))
+        if min(scores) < Config.MIN_LIQUIDITY:
+            logger.debug(f"Skipping {symbol} due to low liquidity: {min(scores)}")
+            return None
+        return opportunity
+
+    async def _depth(self, opportunity: Dict) -> Optional[Dict]:
+        if opportunity.get('type') == 'basis':
+            return opportunity  # ноги в разных символах, глубина проверяется при исполнении
+        async with self._venues(opportunity['buy_exchange'], opportunity['sell_exchange']):
+            result = await self.depth_engine.evaluate(opportunity)
+        if result is None:
+            logger.debug(f"Arbitrage opportunity for {opportunity['symbol']} is not executable at book depth")
+        return result
+
+    async def _risk(self, opportunity: Dict) -> Optional[Dict]:
+        async with self._venues('binance_spot'):  # волатильность считается по свечам binance
+            valid = await self.risk_manager.validate_opportunity(opportunity)
+        if not valid:
+            logger.debug(f"Arbitrage opportunity for {opportunity['symbol']} failed risk validation")
+            return None
+        return opportunity
+
+    async def _execute(self, opportunity: Dict) -> Optional[Dict]:
+        if opportunity.get('type') == 'basis':
+            return opportunity  # базис не исполняется автоматически
+        if self.executor is None or not self._vip_users:
+            return opportunity
+        async with self._venues(opportunity['buy_exchange'], opportunity['sell_exchange']):
+            await execute_for_users(self.executor, self._vip_users, opportunity, self.exchange_manager, self.registry)
+        return opportunity
+
+    async def _notify(self, opportunity: Dict) -> Optional[Dict]:
+        if self.notify_once and not self.registry.should_notify(opportunity):
+            return None
+        if opportunity.get('type') == 'basis':
+            logger.info(f"Basis {opportunity['symbol']}: {opportunity['buy_exchange']} -> "
+                        f"{opportunity['sell_exchange']} {opportunity['basis']:.2f}% "
+                        f"+ funding {opportunity['funding']:.2f}%")
+        await self.notifier(opportunity)
+        return opportunity
+
+    async def _run_stage(self, name: str, func: Stage, inbox: asyncio.Queue,
+                         outbox: Optional[asyncio.Queue], downstream_workers: int,
+                         metrics: StageMetrics) -> None:
+        async def worker():
+            while True:
+                item = await inbox.get()
+                if item is None:
+                    return
+                started = time.monotonic()
+                try:
+                    result = await func(item)
+                except Exception as e:
+                    metrics.errors += 1
+                    logger.error(f"Monitoring stage {name} failed for {item.get('symbol')}: {e}", exc_info=True)
+                    result = None
+                metrics.record(time.monotonic() - started, result is not None)
+                if result is not None and outbox is not None:
+                    await outbox.put(result)
+
+        await asyncio.gather(*(worker() for _ in range(self.workers[name])))
+        if outbox is not None:
+            for _ in range(downstream_workers):
+                await outbox.put(None)
+
+    async def run_cycle(self, symbols: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Один цикл мониторинга; возвращает метрики стадий"""
+        symbols = symbols or Config.TRADING_PAIRS
+        cycle_started = time.monotonic()
+        metrics = {name: StageMetrics() for name in ('snapshot', *self.STAGES)}
+
+        started = time.monotonic()
+        snapshot, vip_users = await asyncio.gather(
+            self.exchange_manager.get_snapshot(self.basis_engine.snapshot_symbols(symbols)),
+            db.fetch(VIP_TRADERS_QUERY)
+        )
+        self._vip_users = [user_id for (user_id,) in vip_users]
+        opportunities = list(best_per_symbol(self.arbitrage_engine.rank_opportunities(snapshot)).values())
+        basis = list(best_per_symbol(self.basis_engine.rank_opportunities(snapshot)).values())
+        for opportunity in (*opportunities, *basis):
+            self.registry.observe(opportunity)
+        metrics['snapshot'].record(time.monotonic() - started, True)
+
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.STAGES]
+        funcs = [self._liquidity, self._depth, self._risk, self._execute, self._notify]
+        stages = [
+            asyncio.ensure_future(self._run_stage(
+                name, func, queues[i], queues[i + 1] if i + 1 < len(queues) else None,
+                self.workers[self.STAGES[i + 1]] if i + 1 < len(queues) else 0, metrics[name]
+            ))
+            for i, (name, func) in enumerate(zip(self.STAGES, funcs))
+        ]
+        try:
+            for opportunity in (*opportunities, *basis):
+                await queues[0].put(opportunity)
+            for _ in range(self.workers[self.STAGES[0]]):
+                await queues[0].put(None)
+            await asyncio.gather(*stages)
+        finally:
+            for task in stages:
+                task.cancel()
+
+        if self.check_strategies:
+            await self.auto_strategies.check_strategies()
+        self.registry.expire()
+        await self.registry.flush()
+
+        cycle_time = time.monotonic() - cycle_started
+        self.metrics = {name: m.summary(cycle_time) for name, m in metrics.items()}
+        self.metrics['cycle'] = {'seconds': cycle_time, 'opportunities': len(opportunities), 'basis': len(basis)}
+        return self.metrics
@@ -0,0 +1,207 @@
+import asyncio
+import contextlib
+import logging
+import random
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+OVERLAP_POLICIES = ('skip', 'queue', 'coalesce')
+
+
+class JobMetrics:
+    """Запуски, пропуски, опоздание и длительность задачи"""
+
+    def __init__(self, window: int = 1000):
+        self.runs = 0
+        self.errors = 0
+        self.skipped = 0
+        self.coalesced = 0
+        self.duration_ewma: Optional[float] = None
+        self._lags = deque(maxlen=window)
+        self._durations = deque(maxlen=window)
+
+    def record(self, lag: float, duration: float, ok: bool, alpha: float = 0.2) -> None:
+        self.runs += 1
+        self.errors += not ok
+        self._lags.append(lag)
+        self._durations.append(duration)
+        self.duration_ewma = duration if self.duration_ewma is None else (
+            alpha * duration + (1 - alpha) * self.duration_ewma
+        )
+
+    def summary(self) -> Dict[str, float]:
+        result = {'runs': self.runs, 'errors': self.errors, 'skipped': self.skipped, 'coalesced': self.coalesced}
+        if self._durations:
+            lags, durations = sorted(self._lags), sorted(self._durations)
+            result.update({
+                'lag_avg_ms': sum(lags) / len(lags) * 1000,
+                'lag_max_ms': lags[-1] * 1000,
+                'duration_avg_ms': sum(durations) / len(durations) * 1000,
+                'duration_p95_ms': durations[min(len(durations) - 1, int(len(durations) * 0.95))] * 1000,
+                'duration_max_ms': durations[-1] * 1000
+            })
+        return result
+
+
+class ScheduledJob:
+    """Задача планировщика и её состояние"""
+
+    def __init__(self, name: str, func: Callable[..., Awaitable], interval: float, overlap: str,
+                 jitter: float, adaptive: bool, min_interval: float, max_interval: float,
+                 max_pending: int, run_immediately: bool, args: Tuple, kwargs: Dict):
+        if overlap not in OVERLAP_POLICIES:
+            raise ValueError(f"Unknown overlap policy {overlap!r}, expected one of {OVERLAP_POLICIES}")
+        if interval <= 0:
+            raise ValueError("Job interval must be positive")
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.overlap = overlap
+        self.jitter = jitter
+        self.adaptive = adaptive
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_pending = max_pending
+        self.run_immediately = run_immediately
+        self.args = args
+        self.kwargs = kwargs
+        self.metrics = JobMetrics()
+        self.busy = False
+        self.pending: Optional[asyncio.Queue] = None
+        self.tasks: Tuple[asyncio.Task, ...] = ()
+
+
+class MarketScheduler:
+    """Планировщик периодических задач рынка на asyncio.
+
+    Моменты запуска считаются от начального момента как ``start + k *
+    interval`` по монотонным часам цикла событий, поэтому время выполнения
+    задачи не сдвигает расписание. Если запуск наступил, пока предыдущий
+    ещё идёт, действует политика ``overlap``:
+
+    - ``skip`` — запуск пропускается;
+    - ``queue`` — запуски встают в очередь (не больше ``max_pending``);
+    - ``coalesce`` — все пропущенные запуски сливаются в один, который
+      выполнится сразу после текущего.
+
+    ``jitter`` добавляет к каждому запуску случайную задержку до стольких
+    секунд, не смещая расписание. Адаптивная задача подстраивает интервал
+    под сглаженную длительность своих запусков (× ``SCHEDULER_ADAPTIVE_HEADROOM``)
+    в пределах ``min_interval``…``max_interval``. Для каждой задачи копятся
+    опоздание старта, длительность и число пропусков (``stats``).
+    """
+
+    def __init__(self, headroom: float = Config.SCHEDULER_ADAPTIVE_HEADROOM):
+        self.headroom = headroom
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self._running = False
+
+    def add_job(self, func: Callable[..., Awaitable], interval: float, name: Optional[str] = None,
+                overlap: str = 'skip', jitter: float = 0.0, adaptive: bool = False,
+                min_interval: Optional[float] = None, max_interval: Optional[float] = None,
+                max_pending: int = 1, run_immediately: bool = False,
+                args: Tuple = (), kwargs: Optional[Dict] = None) -> ScheduledJob:
+        name = name or getattr(func, '__qualname__', repr(func))
+        if name in self.jobs:
+            raise ValueError(f"Job {name} is already scheduled")
+        job = ScheduledJob(
+            name, func, interval, overlap, jitter, adaptive,
+            min_interval if min_interval is not None else interval,
+            max_interval if max_interval is not None else interval * 10,
+            max_pending, run_immediately, tuple(args), kwargs or {}
+        )
+        self.jobs[name] = job
+        if self._running:
+            self._launch(job)
+        return job
+
+    def _launch(self, job: ScheduledJob) -> None:
+        job.pending = asyncio.Queue()
+        job.tasks = (asyncio.ensure_future(self._tick(job)), asyncio.ensure_future(self._work(job)))
+
+    def _next_interval(self, job: ScheduledJob) -> float:
+        if not job.adaptive or job.metrics.duration_ewma is None:
+            return job.interval
+        return min(job.max_interval, max(job.min_interval, job.metrics.duration_ewma * self.headroom))
+
+    def _fire(self, job: ScheduledJob, scheduled: float) -> None:
+        """Постановка запуска с учётом политики перекрытия"""
+        queued = job.pending.qsize()
+        if job.overlap == 'skip':
+            if job.busy or queued:
+                job.metrics.skipped += 1
+                return
+        elif job.overlap == 'coalesce':
+            if queued:
+                job.metrics.coalesced += 1
+                return
+        elif queued >= job.max_pending:
+            job.metrics.skipped += 1
+            return
+        job.pending.put_nowait(scheduled)
+
+    async def _tick(self, job: ScheduledJob) -> None:
+        loop = asyncio.get_running_loop()
+        anchor = loop.time()
+        step = 0 if job.run_immediately else 1
+        while True:
+            due = anchor + step * job.interval
+            scheduled = due + (random.uniform(0, job.jitter) if job.jitter else 0.0)
+            await asyncio.sleep(max(0.0, scheduled - loop.time()))
+            missed = int((loop.time() - due) // job.interval)
+            if missed > 0:
+                # Цикл событий простоял дольше интервала: прошедшие моменты не наверстываются
+                job.metrics.skipped += missed
+                step += missed
+                due += missed * job.interval
+                scheduled += missed * job.interval
+            self._fire(job, scheduled)
+            step += 1
+            interval = self._next_interval(job)
+            if interval != job.interval:
+                logger.debug(f"Job {job.name} interval {job.interval:.3f}s -> {interval:.3f}s")
+                job.interval, anchor, step = interval, due, 1
+
+    async def _work(self, job: ScheduledJob) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = await job.pending.get()
+            job.busy = True
+            started = loop.time()
+            ok = True
+            try:
+                await job.func(*job.args, **job.kwargs)
+            except Exception as e:
+                ok = False
+                logger.error(f"Scheduled job {job.name} failed: {e}", exc_info=True)
+            finally:
+                job.busy = False
+            job.metrics.record(max(0.0, started - scheduled), loop.time() - started, ok)
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        for job in self.jobs.values():
+            self._launch(job)
+
+    def stats(self) -> Dict[str, Dict]:
+        return {
+            name: {**job.metrics.summary(), 'interval': job.interval, 'running': job.busy}
+            for name, job in self.jobs.items()
+        }
+
+    async def stop(self) -> None:
+        self._running = False
+        tasks = [task for job in self.jobs.values() for task in job.tasks]
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        for job in self.jobs.values():
+            job.tasks = ()
+            job.busy = False
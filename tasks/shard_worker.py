@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import sys
+import threading
+from typing import Callable, Dict, List, Optional
+from exchanges.exchange_manager import ExchangeManager
+from strategies.opportunity_registry import OpportunityRegistry
+from tasks.pipeline import MonitoringPipeline
+
+logger = logging.getLogger(__name__)
+
+# Процесс шарда запускается как ``python -m tasks.shard_worker`` и не
+# импортирует модули уровня бота: сообщения уходят родителю строками JSON
+# в stdout, закрытие stdin — сигнал остановки.
+
+
+async def run_shard(shard: int, symbols: List[str], interval: float,
+                    emit: Callable[[Dict], None], stop: asyncio.Event,
+                    exchange_manager: Optional[ExchangeManager] = None) -> None:
+    """Циклы мониторинга символов шарда до установки ``stop``.
+
+    Шард только анализирует и публикует каждую прошедшую конвейер
+    возможность; исполнение, отбор уведомлений, рассылка и запись циклов
+    жизни остаются в процессе бота.
+    """
+    manager = exchange_manager or ExchangeManager()
+
+    async def publish(opportunity: Dict) -> None:
+        emit({'kind': 'opportunity', 'shard': shard, 'payload': opportunity})
+
+    pipeline = MonitoringPipeline(
+        manager, registry=OpportunityRegistry(persist=False), notifier=publish,
+        check_strategies=False, notify_once=False
+    )
+    loop = asyncio.get_running_loop()
+    next_run = loop.time()
+    try:
+        while not stop.is_set():
+            try:
+                emit({'kind': 'metrics', 'shard': shard, 'payload': await pipeline.run_cycle(symbols)})
+            except Exception as e:
+                logger.error(f"Monitoring shard {shard} cycle failed: {e}", exc_info=True)
+                emit({'kind': 'error', 'shard': shard, 'payload': str(e)})
+            next_run = max(next_run + interval, loop.time())
+            try:
+                await asyncio.wait_for(stop.wait(), next_run - loop.time())
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        if exchange_manager is None:
+            await manager.close_all()
+
+
+def _emit(message: Dict) -> None:
+    sys.stdout.write(json.dumps(message, default=float) + '\n')
+    sys.stdout.flush()
+
+
+async def _main(shard: int, symbols: List[str], interval: float) -> None:
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+
+    def watch_stdin():
+        for _ in sys.stdin:
+            pass
+        loop.call_soon_threadsafe(stop.set)
+
+    threading.Thread(target=watch_stdin, name=f"shard-{shard}-stdin", daemon=True).start()
+    await run_shard(shard, symbols, interval, _emit, stop)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Процесс шарда мониторинга рынков")
+    parser.add_argument('--shard', type=int, required=True)
+    parser.add_argument('--interval', type=float, required=True)
+    parser.add_argument('symbols', nargs='+')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        format=f'%(asctime)s - shard {args.shard} - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    if platform.system() == "Windows":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    try:
+        asyncio.run(_main(args.shard, args.symbols, args.interval))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,194 @@
+import asyncio
+import bisect
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class HashRing:
+    """Кольцо консистентного хеширования.
+
+    Каждый узел занимает ``replicas`` точек кольца; ключ принадлежит
+    первому узлу по часовой стрелке от своего хеша. При добавлении или
+    удалении узла переезжает только ~1/N ключей.
+    """
+
+    def __init__(self, nodes: Iterable[Hashable] = (), replicas: int = Config.SHARD_REPLICAS):
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: List[Hashable] = []
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], 'big')
+
+    @property
+    def nodes(self) -> List[Hashable]:
+        return sorted(set(self._owners), key=str)
+
+    def add(self, node: Hashable) -> None:
+        if node in self._owners:
+            return
+        for i in range(self.replicas):
+            point = self._hash(f"{node}#{i}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove(self, node: Hashable) -> None:
+        kept = [(point, owner) for point, owner in zip(self._points, self._owners) if owner != node]
+        self._points = [point for point, _ in kept]
+        self._owners = [owner for _, owner in kept]
+
+    def node_for(self, key: str) -> Optional[Hashable]:
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[index]
+
+    def assign(self, keys: Iterable[str]) -> Dict[Hashable, List[str]]:
+        """Ключи по узлам (узлы без ключей не попадают в результат)"""
+        result: Dict[Hashable, List[str]] = {}
+        for key in keys:
+            node = self.node_for(key)
+            if node is not None:
+                result.setdefault(node, []).append(key)
+        return result
+
+
+class ShardedMonitor:
+    """Мониторинг рынков в пуле процессов.
+
+    Символы делятся между ``processes`` шардами по кольцу консистентного
+    хеширования. Каждый шард — отдельный процесс ``tasks.shard_worker`` со
+    своим ``ExchangeManager`` и ``MonitoringPipeline``, который только
+    анализирует рынок: прошедшие конвейер возможности и метрики циклов
+    приходят строками JSON через stdout процесса и передаются ``handler``
+    в цикле событий бота. Исполнение и рассылка остаются в процессе бота.
+    """
+
+    def __init__(self, handler: Callable[[Dict], Awaitable], symbols: Optional[List[str]] = None,
+                 processes: int = Config.MONITOR_PROCESSES, interval: float = Config.MONITOR_INTERVAL):
+        self.handler = handler
+        self.symbols = list(symbols or Config.TRADING_PAIRS)
+        self.interval = interval
+        self.ring = HashRing(range(processes))
+        self.metrics: Dict[int, Dict] = {}
+        self.received = 0
+        self.restarts = 0
+        self._workers: Dict[int, subprocess.Popen] = {}
+        self._inbox: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def assignments(self) -> Dict[int, List[str]]:
+        return self.ring.assign(self.symbols)
+
+    def _command(self, shard: int, symbols: List[str]) -> List[str]:
+        return [sys.executable, '-m', 'tasks.shard_worker',
+                '--shard', str(shard), '--interval', str(self.interval), *symbols]
+
+    def _read(self, shard: int, process: subprocess.Popen, loop: asyncio.AbstractEventLoop) -> None:
+        """Поток чтения stdout шарда"""
+        for line in process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                logger.debug(f"Monitoring shard {shard} output: {line.rstrip()}")
+                continue
+            loop.call_soon_threadsafe(self._inbox.put_nowait, message)
+
+    def _spawn(self, shard: int, symbols: List[str]) -> None:
+        process = subprocess.Popen(
+            self._command(shard, symbols), cwd=_ROOT,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1
+        )
+        self._workers[shard] = process
+        threading.Thread(
+            target=self._read, args=(shard, process, asyncio.get_running_loop()),
+            name=f"monitor-shard-{shard}", daemon=True
+        ).start()
+        logger.info(f"Monitoring shard {shard} started (pid {process.pid}, {len(symbols)} symbols)")
+
+    def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._stopping = False
+        self._inbox = asyncio.Queue()
+        for shard, symbols in self.assignments().items():
+            self._spawn(shard, symbols)
+        self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            message = await self._inbox.get()
+            kind, shard, payload = message['kind'], message['shard'], message['payload']
+            if kind == 'opportunity':
+                self.received += 1
+                try:
+                    await self.handler(payload)
+                except Exception as e:
+                    logger.error(f"Shard opportunity handler error for {payload['symbol']}: {e}")
+            elif kind == 'metrics':
+                self.metrics[shard] = payload
+            else:
+                logger.error(f"Monitoring shard {shard} reported: {payload}")
+
+    async def maintain(self) -> None:
+        """Перезапуск завершившихся процессов шардов"""
+        if self._stopping or self._task is None:
+            return
+        assignments = self.assignments()
+        for shard, process in list(self._workers.items()):
+            if process.poll() is None:
+                continue
+            logger.warning(f"Monitoring shard {shard} exited with code {process.returncode}, restarting")
+            self.restarts += 1
+            self._spawn(shard, assignments.get(shard, []))
+
+    def stats(self) -> Dict:
+        assignments = self.assignments()
+        return {
+            'shards': {
+                shard: {
+                    'alive': process.poll() is None,
+                    'symbols': len(assignments.get(shard, [])),
+                    'cycle': self.metrics.get(shard, {}).get('cycle')
+                }
+                for shard, process in self._workers.items()
+            },
+            'received': self.received,
+            'restarts': self.restarts
+        }
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        self._stopping = True
+        loop = asyncio.get_running_loop()
+        for process in self._workers.values():
+            with contextlib.suppress(OSError):
+                process.stdin.close()
+        for shard, process in self._workers.items():
+            try:
+                await loop.run_in_executor(None, process.wait, timeout)
+            except subprocess.TimeoutExpired:
+                logger.warning(f"Monitoring shard {shard} did not stop in {timeout}s, terminating")
+                process.terminate()
+        self._workers.clear()
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
@@ -0,0 +1,207 @@
+import asyncio
+import contextlib
+import logging
+import os
+import socket
+from typing import Awaitable, Callable, Dict, List, Optional
+from config.settings import Config
+from exchanges.exchange_manager import ExchangeManager
+from strategies.opportunity_registry import OpportunityRegistry
+from tasks.bus import MessageBus
+from tasks.pipeline import MonitoringPipeline
+from tasks.sharding import HashRing
+
+logger = logging.getLogger(__name__)
+
+OPPORTUNITIES_TOPIC = 'opportunities'
+METRICS_TOPIC = 'metrics'
+
+
+class MonitoringWorker:
+    """Воркер мониторинга для отдельной машины.
+
+    Выполняет только конвейер анализа (без исполнения и рассылки) и
+    публикует каждую прошедшую его возможность и метрики циклов в шину;
+    исполнение для VIP, отбор уведомлений и запись циклов жизни делает
+    обработчик бота (``TradingModule.execute_for_vip``). Шард
+    пересчитывается перед каждым циклом по кольцу консистентного
+    хеширования из живых участников шины: если heartbeat воркера не
+    приходил дольше ``BUS_HEARTBEAT_TIMEOUT``, его символы переходят к
+    остальным, новый воркер забирает свою долю сам.
+    """
+
+    def __init__(self, bus: MessageBus, worker_id: Optional[str] = None,
+                 symbols: Optional[List[str]] = None, interval: float = Config.MONITOR_INTERVAL,
+                 heartbeat_interval: float = Config.BUS_HEARTBEAT_INTERVAL,
+                 exchange_manager: Optional[ExchangeManager] = None):
+        self.bus = bus
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.symbols = list(symbols or Config.TRADING_PAIRS)
+        self.interval = interval
+        self.heartbeat_interval = heartbeat_interval
+        self.exchange_manager = exchange_manager
+        self.shard: List[str] = []
+        self.cycles = 0
+        self._last_cycle: Optional[Dict] = None
+
+    async def assign(self) -> List[str]:
+        """Символы этого воркера при текущем составе участников"""
+        members = await self.bus.members()
+        ring = HashRing(sorted({*members, self.worker_id}))
+        shard = sorted(ring.assign(self.symbols).get(self.worker_id, []))
+        if shard != self.shard:
+            logger.info(f"Worker {self.worker_id} now covers {len(shard)} of {len(self.symbols)} symbols "
+                        f"({len(ring.nodes)} workers alive)")
+            self.shard = shard
+        return shard
+
+    async def _heartbeat(self) -> None:
+        while True:
+            try:
+                await self.bus.heartbeat(self.worker_id, {
+                    'symbols': len(self.shard),
+                    'cycles': self.cycles,
+                    'cycle': self._last_cycle
+                })
+            except Exception as e:
+                logger.error(f"Worker {self.worker_id} heartbeat failed: {e}")
+            await asyncio.sleep(self.heartbeat_interval)
+
+    async def publish(self, opportunity: Dict) -> None:
+        await self.bus.publish(OPPORTUNITIES_TOPIC, {**opportunity, 'worker': self.worker_id})
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        """Циклы мониторинга до установки ``stop``"""
+        stop = stop or asyncio.Event()
+        exchange_manager = self.exchange_manager or ExchangeManager()
+        # Исполнение, отбор уведомлений и запись циклов жизни — в процессе бота
+        pipeline = MonitoringPipeline(
+            exchange_manager, registry=OpportunityRegistry(persist=False), notifier=self.publish,
+            check_strategies=False, notify_once=False
+        )
+        heartbeat = asyncio.ensure_future(self._heartbeat())
+        loop = asyncio.get_running_loop()
+        next_run = loop.time()
+        try:
+            while not stop.is_set():
+                shard = await self.assign()
+                if shard:
+                    try:
+                        metrics = await pipeline.run_cycle(shard)
+                        self.cycles += 1
+                        self._last_cycle = metrics['cycle']
+                        await self.bus.publish(METRICS_TOPIC, {'worker': self.worker_id, **metrics})
+                    except Exception as e:
+                        logger.error(f"Worker {self.worker_id} cycle failed: {e}", exc_info=True)
+                next_run = max(next_run + self.interval, loop.time())
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(stop.wait(), next_run - loop.time())
+        finally:
+            heartbeat.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await heartbeat
+            await self.bus.leave(self.worker_id)
+            if self.exchange_manager is None:
+                await exchange_manager.close_all()
+
+
+class WorkerSubscriber:
+    """Подписка процесса бота на шину воркеров мониторинга.
+
+    Читает новые возможности из шины и передаёт их ``handler``, хранит
+    последние метрики каждого воркера и отслеживает их появление и
+    пропадание по heartbeat.
+    """
+
+    def __init__(self, bus: MessageBus, handler: Callable[[Dict], Awaitable],
+                 poll_interval: float = Config.BUS_POLL_INTERVAL):
+        self.bus = bus
+        self.handler = handler
+        self.poll_interval = poll_interval
+        self.workers: Dict[str, Dict] = {}
+        self.metrics: Dict[str, Dict] = {}
+        self.received = 0
+        self._cursors: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def _drain(self, topic: str) -> List[Dict]:
+        messages = await self.bus.fetch(topic, self._cursors[topic])
+        if messages:
+            self._cursors[topic] = messages[-1][0]
+        return [message for _, message in messages]
+
+    async def _run(self) -> None:
+        for topic in (OPPORTUNITIES_TOPIC, METRICS_TOPIC):
+            self._cursors[topic] = await self.bus.last_id(topic)
+        while True:
+            try:
+                for opportunity in await self._drain(OPPORTUNITIES_TOPIC):
+                    self.received += 1
+                    try:
+                        await self.handler(opportunity)
+                    except Exception as e:
+                        logger.error(f"Worker opportunity handler error for {opportunity['symbol']}: {e}")
+                for metrics in await self._drain(METRICS_TOPIC):
+                    self.metrics[metrics['worker']] = metrics
+            except Exception as e:
+                logger.error(f"Message bus read failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def maintain(self) -> None:
+        """Проверка состава воркеров и очистка старых сообщений шины"""
+        members = await self.bus.members()
+        for worker_id in members.keys() - self.workers.keys():
+            logger.info(f"Monitoring worker {worker_id} joined")
+        for worker_id in self.workers.keys() - members.keys():
+            logger.warning(f"Monitoring worker {worker_id} lost, its symbols fail over to the others")
+            self.metrics.pop(worker_id, None)
+        if self.workers and not members:
+            logger.error("No monitoring workers alive")
+        self.workers = members
+        await self.bus.prune()
+
+    def stats(self) -> Dict:
+        return {
+            'workers': {
+                worker_id: {'symbols': info.get('symbols'), 'cycles': info.get('cycles'), 'cycle': info.get('cycle')}
+                for worker_id, info in self.workers.items()
+            },
+            'received': self.received
+        }
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+if __name__ == "__main__":
+    import argparse
+    import platform
+    from tasks.bus import open_bus
+
+    parser = argparse.ArgumentParser(description="Воркер мониторинга рынков")
+    parser.add_argument('--id', dest='worker_id', help="Идентификатор воркера (по умолчанию host-pid)")
+    parser.add_argument('--bus', default=Config.BUS_URL, help="URL шины, напр. sqlite:///bus.db")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    if platform.system() == "Windows":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    bus = open_bus(args.bus)
+    try:
+        asyncio.run(MonitoringWorker(bus, args.worker_id).run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        bus.close()
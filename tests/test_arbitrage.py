@@ -0,0 +1,24 @@
+from config.settings import Config
+from strategies.arbitrage import ArbitrageEngine
+
+
+def _quote(received_at):
+    return {'bid': 100.0, 'ask': 100.5, 'volume': 1.0, 'received_at': received_at}
+
+
+def test_stale_quote_does_not_evict_fresh_ones(monkeypatch):
+    monkeypatch.setattr(Config, 'MAX_QUOTE_SKEW', 1.0)
+    prices = {
+        'binance_spot': _quote(100.0),
+        'okx_spot': _quote(103.0),
+        'bybit_spot': _quote(103.1),
+        'kucoin_spot': _quote(103.2)
+    }
+    assert set(ArbitrageEngine._consistent_snapshot(prices)) == {'okx_spot', 'bybit_spot', 'kucoin_spot'}
+
+
+def test_quotes_within_skew_are_kept(monkeypatch):
+    monkeypatch.setattr(Config, 'MAX_QUOTE_SKEW', 1.0)
+    prices = {'binance_spot': _quote(102.3), 'okx_spot': _quote(103.2), 'bybit_spot': {'bid': 1.0, 'ask': 1.1}}
+    assert set(ArbitrageEngine._consistent_snapshot(prices)) == {'binance_spot', 'okx_spot', 'bybit_spot'}
+    assert ArbitrageEngine._consistent_snapshot({}) == {}
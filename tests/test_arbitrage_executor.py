@@ -0,0 +1,168 @@
+import asyncio
+import pytest
+from exchanges.balance_cache import BalanceCache
+from trading import arbitrage_executor
+from trading.arbitrage_executor import ArbitrageExecutor
+from trading.sim_exchange import SimulatedExchange
+
+SYMBOL = 'BTC/USDT'
+OPPORTUNITY = {
+    'symbol': SYMBOL,
+    'buy_exchange': 'binance_spot',
+    'buy_price': 100.0,
+    'sell_exchange': 'okx_spot',
+    'sell_price': 102.0
+}
+
+
+class Manager:
+    """Менеджер без таблицы комиссий: объёмы и цены не округляются"""
+
+
+def _executor(buy_book, sell_book, **buy_options) -> ArbitrageExecutor:
+    buy = SimulatedExchange('binance_spot', **buy_options)
+    buy.set_book(SYMBOL, *buy_book)
+    sell = SimulatedExchange('okx_spot')
+    sell.set_book(SYMBOL, *sell_book)
+    return ArbitrageExecutor(
+        Manager(), clients={'binance_spot': buy, 'okx_spot': sell},
+        slippage=0.1, fill_timeout=0, poll_interval=0
+    )
+
+
+def _execute(executor: ArbitrageExecutor, amount: float = 1.0):
+    return asyncio.run(executor.execute(1, dict(OPPORTUNITY), amount))
+
+
+def test_both_legs_filled():
+    executor = _executor(([[99.0, 5.0]], [[100.0, 5.0]]), ([[102.0, 5.0]], [[103.0, 5.0]]))
+    result = _execute(executor)
+    assert result['status'] == 'filled'
+    assert [leg['filled'] for leg in result['legs']] == [1.0, 1.0]
+    assert result['rebalance'] is None
+    assert set(result['signal_to_ack_ms']) == {'buy', 'sell'}
+    assert executor.stats()['filled'] == 1
+
+
+def test_equal_partial_fills():
+    executor = _executor(([[99.0, 5.0]], [[100.0, 0.4], [105.0, 5.0]]),
+                         ([[102.0, 0.4], [95.0, 5.0]], [[103.0, 5.0]]))
+    result = _execute(executor)
+    assert result['status'] == 'partial'
+    assert [leg['filled'] for leg in result['legs']] == [0.4, 0.4]
+    assert result['rebalance'] is None
+
+
+def test_short_sell_leg_is_hedged():
+    # IOC-продажа берёт 0.4 по лимиту, остаток добирается рыночным хеджем
+    executor = _executor(([[99.0, 5.0]], [[100.0, 5.0]]), ([[102.0, 0.4], [101.0, 5.0]], [[103.0, 5.0]]))
+    result = _execute(executor)
+    assert result['status'] == 'hedged'
+    rebalance = result['rebalance']
+    assert rebalance['imbalance'] == pytest.approx(0.6)
+    assert rebalance['hedged'] == pytest.approx(0.6)
+    assert rebalance['unwound'] == 0
+    assert [(o['role'], o['venue'], o['side']) for o in rebalance['orders']] == [('hedge', 'okx_spot', 'sell')]
+
+
+def test_failed_hedge_is_unwound():
+    # На бирже продажи нет объёма для хеджа: лишняя покупка продаётся обратно
+    executor = _executor(([[99.0, 5.0]], [[100.0, 5.0]]), ([[102.0, 0.4]], [[103.0, 5.0]]))
+    result = _execute(executor)
+    assert result['status'] == 'unwound'
+    rebalance = result['rebalance']
+    assert rebalance['hedged'] == 0
+    assert rebalance['unwound'] == pytest.approx(0.6)
+    assert rebalance['open_exposure'] == pytest.approx(0)
+    assert [(o['role'], o['venue'], o['side']) for o in rebalance['orders']] == [
+        ('hedge', 'okx_spot', 'sell'), ('unwind', 'binance_spot', 'sell')
+    ]
+
+
+def test_unhedged_imbalance_is_exposed():
+    executor = _executor(([], [[100.0, 5.0]]), ([[102.0, 0.4]], [[103.0, 5.0]]))
+    result = _execute(executor)
+    assert result['status'] == 'exposed'
+    assert result['rebalance']['open_exposure'] == pytest.approx(0.6)
+    assert executor.stats()['exposed'] == 1
+
+
+def test_rejected_leg_is_unwound():
+    # Покупка отклонена, хедж на той же бирже тоже: проданное выкупается обратно
+    executor = _executor(([[99.0, 5.0]], [[100.0, 5.0]]), ([[102.0, 5.0]], [[103.0, 5.0]]), reject=True)
+    result = _execute(executor)
+    assert result['status'] == 'unwound'
+    assert result['legs'][0]['error']
+    assert [(o['role'], o['venue'], o['side'], o['filled']) for o in result['rebalance']['orders']] == [
+        ('hedge', 'binance_spot', 'buy', 0.0), ('unwind', 'okx_spot', 'buy', 1.0)
+    ]
+
+
+def test_nothing_filled_fails():
+    executor = _executor(([[99.0, 5.0]], [[105.0, 5.0]]), ([[95.0, 5.0]], [[103.0, 5.0]]))
+    result = _execute(executor)
+    assert result['status'] == 'failed'
+    assert ArbitrageExecutor.fills(result) == []
+
+
+def test_record_writes_every_fill(monkeypatch):
+    calls = []
+
+    class Db:
+        async def execute_many(self, query, rows):
+            calls.append(rows)
+
+    monkeypatch.setattr(arbitrage_executor, 'db', Db())
+    executor = _executor(([], [[100.0, 5.0]]), ([[102.0, 0.4]], [[103.0, 5.0]]))
+    result = _execute(executor)
+    assert asyncio.run(executor.record(7, result)) == 2
+
+    (rows,) = calls
+    assert [(row[2], row[3], row[4], row[6], row[8]) for row in rows] == [
+        ('binance_spot', 1.0, 100.0, 'long', 'open'),
+        ('okx_spot', 0.4, 102.0, 'short', 'open')
+    ]
+
+
+class BalanceManager:
+    """Менеджер с кэшем балансов"""
+
+    def __init__(self):
+        self.balances = BalanceCache()
+
+
+def _funded_executor(usdt: float) -> ArbitrageExecutor:
+    buy = SimulatedExchange('binance_spot', balance={'USDT': usdt})
+    buy.set_book(SYMBOL, [[99.0, 5.0]], [[100.0, 5.0]])
+    sell = SimulatedExchange('okx_spot', balance={'BTC': 5.0})
+    sell.set_book(SYMBOL, [[102.0, 5.0]], [[103.0, 5.0]])
+    return ArbitrageExecutor(
+        BalanceManager(), clients={'binance_spot': buy, 'okx_spot': sell},
+        slippage=0.1, fill_timeout=0, poll_interval=0
+    )
+
+
+def test_insufficient_quote_balance_is_rejected():
+    executor = _funded_executor(50.0)
+    result = _execute(executor)
+    assert result['status'] == 'rejected'
+    assert 'USDT' in result['message']
+    assert not executor.clients['binance_spot'].orders
+    assert not executor.clients['okx_spot'].orders
+    assert executor.exchange_manager.balances.reserved((1, 'binance', 'spot'), 'USDT') == 0
+
+
+def test_reservation_is_settled_by_refresh():
+    executor = _funded_executor(1000.0)
+    balances = executor.exchange_manager.balances
+
+    async def run():
+        result = await executor.execute(1, dict(OPPORTUNITY), 1.0)
+        # Резерв подтверждён ордером и снимается фоновым обновлением после ноги
+        await asyncio.sleep(0.01)
+        return result
+
+    result = asyncio.run(run())
+    assert result['status'] == 'filled'
+    assert balances.reserved((1, 'binance', 'spot'), 'USDT') == 0
+    assert balances.refreshes >= 2
@@ -0,0 +1,57 @@
+import asyncio
+from exchanges.balance_cache import BalanceCache
+
+ACCOUNT = (1, 'binance', 'spot')
+
+
+def _loader(calls):
+    async def load():
+        calls.append(1)
+        return {'free': {'USDT': 100.0}}
+    return load
+
+
+def test_refresh_stale_skips_idle_accounts():
+    calls = []
+
+    async def run():
+        balances = BalanceCache(refresh_interval=0, max_age=60)
+        assert await balances.available(ACCOUNT, 'USDT', _loader(calls)) == 100.0
+        await balances.refresh_stale()
+        await asyncio.sleep(0.01)
+        assert len(calls) == 2
+
+        # Давно не использованный аккаунт без резервов не опрашивается
+        balances._used[ACCOUNT] -= 120
+        await balances.refresh_stale()
+        await asyncio.sleep(0.01)
+        assert len(calls) == 2
+
+        balances.reserve(ACCOUNT, 'USDT', 10.0)
+        balances._used[ACCOUNT] -= 120
+        await balances.refresh_stale()
+        await asyncio.sleep(0.01)
+        assert len(calls) == 3
+
+    asyncio.run(run())
+
+
+def test_forget_drops_loader_and_acked_reservations():
+    calls = []
+
+    async def run():
+        balances = BalanceCache(refresh_interval=0)
+        await balances.available(ACCOUNT, 'USDT', _loader(calls))
+        acked = balances.reserve(ACCOUNT, 'USDT', 10.0)
+        balances.acknowledge(acked, 'order-1')
+        balances.reserve(ACCOUNT, 'USDT', 5.0)
+
+        balances.forget(ACCOUNT)
+        await balances.refresh_stale()
+        balances.invalidate(ACCOUNT)
+        await asyncio.sleep(0.01)
+        assert len(calls) == 1
+        assert balances.stats()['accounts'] == 0
+        assert balances.reserved(ACCOUNT, 'USDT') == 5.0
+
+    asyncio.run(run())
@@ -0,0 +1,18 @@
+from strategies.opportunity_registry import OpportunityRegistry
+
+OPPORTUNITY = {'symbol': 'BTC/USDT', 'buy_exchange': 'binance_spot', 'sell_exchange': 'okx_spot', 'profit': 1.0}
+
+
+def test_claims_are_per_user():
+    registry = OpportunityRegistry(persist=False)
+    assert registry.claim(OPPORTUNITY, 1)
+    assert not registry.claim(dict(OPPORTUNITY), 1)
+    assert registry.claim(OPPORTUNITY, 2)
+    assert registry.is_acting(OPPORTUNITY) and registry.is_acting(OPPORTUNITY, 2)
+
+    registry.release(OPPORTUNITY, 1)
+    assert registry.claim(OPPORTUNITY, 1)
+    registry.release(OPPORTUNITY, 1)
+    registry.release(OPPORTUNITY, 2)
+    assert not registry.is_acting(OPPORTUNITY)
+    assert registry.stats()['acting'] == 0
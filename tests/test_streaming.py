@@ -0,0 +1,103 @@
+import asyncio
+import json
+from config.settings import Config
+from exchanges.streaming import LiveMarketCache, MarketFeed, ReplayServer, ReplaySource
+
+FRAMES = [
+    {'venue': 'binance_spot', 'symbol': 'BTC/USDT', 'kind': 'ticker', 'ts': 1000,
+     'data': {'bid': 100.0, 'ask': 101.0, 'last': 100.5, 'baseVolume': 10.0}},
+    {'venue': 'okx_spot', 'symbol': 'BTC/USDT', 'kind': 'ticker', 'ts': 1010,
+     'data': {'bid': 102.0, 'ask': 103.0, 'last': 102.5, 'baseVolume': 5.0}},
+    {'venue': 'binance_spot', 'symbol': 'BTC/USDT', 'kind': 'order_book', 'ts': 1020,
+     'data': {'bids': [[100.2, 1.0]], 'asks': [[100.8, 2.0]], 'timestamp': 1020}},
+    {'venue': 'binance_spot', 'symbol': 'ETH/USDT', 'kind': 'ticker', 'ts': 1030,
+     'data': {'bid': 10.0, 'ask': 11.0, 'last': 10.5, 'baseVolume': 1.0}},
+]
+
+
+class ListSource:
+    """Источник, отдающий заданные кадры и обрывающий поток"""
+
+    venue = 'binance_spot'
+
+    def __init__(self, frames):
+        self._frames = frames
+        self.connections = 0
+
+    async def frames(self, symbols):
+        self.connections += 1
+        for frame in self._frames:
+            if frame['symbol'] in symbols:
+                yield json.loads(json.dumps(frame))
+        raise ConnectionError("stream closed")
+
+    async def close(self):
+        pass
+
+
+async def _wait_for(condition, timeout: float = 5.0) -> None:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+def _record(path, symbols) -> ListSource:
+    async def run():
+        source = ListSource(FRAMES)
+        feed = MarketFeed(LiveMarketCache(), [source], record_path=str(path))
+        await feed.start(symbols)
+        await _wait_for(lambda: feed.reconnects >= 1)
+        await feed.stop()
+        return source
+
+    return asyncio.run(run())
+
+
+def test_record_writes_applied_frames(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'STREAM_RECONNECT_DELAY', 10)
+    path = tmp_path / 'frames.jsonl'
+    _record(path, ['BTC/USDT'])
+
+    recorded = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert recorded == [frame for frame in FRAMES if frame['symbol'] == 'BTC/USDT']
+
+
+def test_replay_fills_cache_and_reconnects(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'STREAM_RECONNECT_DELAY', 0.01)
+    monkeypatch.setattr(Config, 'STREAM_RECONNECT_MAX_DELAY', 0.05)
+    path = tmp_path / 'frames.jsonl'
+    _record(path, ['BTC/USDT', 'ETH/USDT'])
+
+    async def run():
+        server = ReplayServer(str(path))
+        url = await server.start()
+        cache = LiveMarketCache()
+        applied = []
+        cache.subscribe(lambda frame, received_at: applied.append(frame['ts']))
+        source = ReplaySource(url)
+        feed = MarketFeed(cache, [source])
+        try:
+            await feed.start(['BTC/USDT'])
+            # Сервер закрывает соединение после последнего кадра: фид
+            # переподключается и получает запись заново
+            await _wait_for(lambda: feed.reconnects >= 2)
+        finally:
+            await feed.stop()
+            await server.stop()
+        return cache, applied, feed.reconnects
+
+    cache, applied, reconnects = asyncio.run(run())
+    assert reconnects >= 2
+    assert applied[:3] == [1000, 1010, 1020]
+    assert applied[3:6] == [1000, 1010, 1020]
+
+    prices = cache.get_prices('BTC/USDT')
+    assert set(prices) == {'binance_spot', 'okx_spot'}
+    # Вершина стакана перекрывает bid/ask тикера
+    assert (prices['binance_spot']['bid'], prices['binance_spot']['ask']) == (100.2, 100.8)
+    assert (prices['okx_spot']['bid'], prices['okx_spot']['ask']) == (102.0, 103.0)
+    assert prices['okx_spot']['volume'] == 5.0
+    assert cache.get_prices('ETH/USDT') == {}
+    assert cache.get_order_book('binance_spot', 'BTC/USDT')['asks'] == [[100.8, 2.0]]
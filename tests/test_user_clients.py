@@ -0,0 +1,57 @@
+import asyncio
+from exchanges.balance_cache import BalanceCache
+from exchanges.user_clients import UserClientPool
+
+
+class Client:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class Manager:
+    def __init__(self):
+        self.balances = BalanceCache()
+
+
+def _pool() -> UserClientPool:
+    pool = UserClientPool(Manager())
+
+    async def create(user_id, exchange, ex_type):
+        return Client()
+    pool._create = create
+    return pool
+
+
+def test_invalidate_defers_closing_busy_client():
+    async def run():
+        pool = _pool()
+        idle = await pool.get(1, 'okx')
+        async with pool.client(1, 'binance') as busy:
+            await pool.invalidate(1)
+            assert idle.closed
+            assert not busy.closed
+            # Новый запрос получает свежий клиент с новыми ключами
+            async with pool.client(1, 'binance') as fresh:
+                assert fresh is not busy
+        assert busy.closed
+        assert not fresh.closed
+        assert pool._in_use == {(1, 'binance', 'spot'): 0}
+        assert list(pool._last_used) == [(1, 'binance', 'spot')]
+        assert pool._retired == {}
+
+    asyncio.run(run())
+
+
+def test_close_all_closes_retired_clients():
+    async def run():
+        pool = _pool()
+        async with pool.client(1, 'binance') as busy:
+            await pool.invalidate(1)
+            await pool.close_all()
+            assert busy.closed
+        assert pool._in_use == {} and pool._last_used == {}
+
+    asyncio.run(run())
@@ -0,0 +1,294 @@
+import asyncio
+import contextlib
+import logging
+import time
+from collections import Counter, deque
+from typing import Dict, List, Optional
+from config.settings import Config
+from database.db_manager import db
+
+logger = logging.getLogger(__name__)
+
+
+class ArbitrageExecutor:
+    """Одновременное исполнение двух ног арбитража.
+
+    Покупка на ``buy_exchange`` и продажа на ``sell_exchange`` выставляются
+    параллельно лимитными IOC-ордерами с допуском ``slippage`` % от цен
+    возможности (предполагается, что на обеих биржах заранее есть
+    инвентарь). Заполнение ног отслеживается до ``fill_timeout``, висящие
+    остатки отменяются. Перекос между ногами закрывается рыночным ордером
+    на бирже недобравшей ноги (хедж), а если он не прошёл — обратной
+    сделкой на бирже перебравшей (откат). Для каждой ноги записывается
+    задержка от сигнала до подтверждения ордера.
+
+    Котируемая валюта ноги покупки проверяется и резервируется в
+    ``exchange_manager.balances`` до выставления, как в ``create_order``;
+    после каждой ноги, хеджа и отката баланс аккаунта обновляется в фоне.
+
+    ``clients`` — клиенты по биржам (``'<биржа>_<тип>'``), например
+    ``SimulatedExchange``; без них используются авторизованные клиенты
+    пользователя из ``exchange_manager.user_clients``.
+    """
+
+    def __init__(self, exchange_manager, clients: Optional[Dict[str, object]] = None,
+                 slippage: float = Config.EXECUTION_SLIPPAGE,
+                 fill_timeout: float = Config.EXECUTION_FILL_TIMEOUT,
+                 poll_interval: float = Config.EXECUTION_POLL_INTERVAL,
+                 latency_window: int = 10000):
+        self.exchange_manager = exchange_manager
+        self.clients = clients
+        self.slippage = slippage
+        self.fill_timeout = fill_timeout
+        self.poll_interval = poll_interval
+        self.outcomes = Counter()
+        self._latencies = deque(maxlen=latency_window)
+
+    @contextlib.asynccontextmanager
+    async def _client(self, user_id: int, venue: str):
+        if self.clients is not None:
+            yield self.clients[venue]
+            return
+        exchange, ex_type = venue.rsplit('_', 1)
+        async with self.exchange_manager.user_clients.client(user_id, exchange, ex_type) as ex:
+            yield ex
+
+    def _invalidate(self, user_id: int, venue: str) -> None:
+        balances = getattr(self.exchange_manager, 'balances', None)
+        if balances is not None:
+            exchange, ex_type = venue.rsplit('_', 1)
+            balances.invalidate((user_id, exchange, ex_type))
+
+    async def _reserve(self, user_id: int, leg: Dict) -> Optional[int]:
+        """Резерв котируемой валюты под ногу покупки (None без кэша балансов).
+
+        ``ValueError``, если свободного остатка не хватает.
+        """
+        balances = getattr(self.exchange_manager, 'balances', None)
+        if balances is None:
+            return None
+        exchange, ex_type = leg['venue'].rsplit('_', 1)
+        account = (user_id, exchange, ex_type)
+        currency = leg['symbol'].split('/')[1].split(':')[0]
+        required = leg['amount'] * leg['price']
+        if self.clients is not None:
+            loader = self.clients[leg['venue']].fetch_balance
+        else:
+            loader = self.exchange_manager.user_clients.balance_loader(*account)
+        available = await balances.available(account, currency, loader)
+        if available < required:
+            raise ValueError(f"Insufficient {currency} balance on {leg['venue']}: need {required}, have {available}")
+        return balances.reserve(account, currency, required)
+
+    def _legs(self, opportunity: Dict, amount: float) -> List[Dict]:
+        symbol = opportunity['symbol']
+        buy_symbol = opportunity.get('buy_symbol', symbol)
+        sell_symbol = opportunity.get('sell_symbol', symbol)
+        buy_venue, sell_venue = opportunity['buy_exchange'], opportunity['sell_exchange']
+        buy_price = opportunity['buy_price'] * (1 + self.slippage / 100)
+        sell_price = opportunity['sell_price'] * (1 - self.slippage / 100)
+
+        fees = getattr(self.exchange_manager, 'fees', None)
+        if fees is not None:
+            if buy_symbol == sell_symbol:
+                amount = fees.round_amount(buy_symbol, amount, buy_venue, sell_venue, price=opportunity['buy_price'])
+            else:
+                amount = min(
+                    fees.round_amount(buy_symbol, amount, buy_venue, price=opportunity['buy_price']),
+                    fees.round_amount(sell_symbol, amount, sell_venue, price=opportunity['sell_price'])
+                )
+            buy_price = fees.round_price(buy_venue, buy_symbol, buy_price, 'buy')
+            sell_price = fees.round_price(sell_venue, sell_symbol, sell_price, 'sell')
+        return [
+            {'side': 'buy', 'venue': buy_venue, 'symbol': buy_symbol, 'amount': amount, 'price': buy_price},
+            {'side': 'sell', 'venue': sell_venue, 'symbol': sell_symbol, 'amount': amount, 'price': sell_price}
+        ]
+
+    async def _place(self, user_id: int, leg: Dict, signal_at: float) -> Dict:
+        """Выставление ноги; в ноге остаются ордер, задержки и ошибка"""
+        started = time.monotonic()
+        try:
+            async with self._client(user_id, leg['venue']) as ex:
+                order = await ex.create_order(
+                    leg['symbol'], 'limit', leg['side'], leg['amount'], leg['price'], {'timeInForce': 'IOC'}
+                )
+        except Exception as e:
+            leg.update(order=None, filled=0.0, average=None, error=str(e))
+            logger.error(f"Arbitrage leg {leg['side']} {leg['symbol']} on {leg['venue']} failed: {e}")
+            return leg
+        acked = time.monotonic()
+        leg.update(
+            order=order, filled=order.get('filled') or 0.0, average=order.get('average'), error=None,
+            ack_ms=(acked - started) * 1000, signal_to_ack_ms=(acked - signal_at) * 1000
+        )
+        self._latencies.append(acked - signal_at)
+        return leg
+
+    async def _settle(self, user_id: int, leg: Dict) -> Dict:
+        """Ожидание заполнения ноги до ``fill_timeout``, затем отмена остатка"""
+        order = leg.get('order')
+        if not order:
+            return leg
+        deadline = time.monotonic() + self.fill_timeout
+        try:
+            async with self._client(user_id, leg['venue']) as ex:
+                while order.get('status') == 'open' and time.monotonic() < deadline:
+                    await asyncio.sleep(self.poll_interval)
+                    order = await ex.fetch_order(order['id'], leg['symbol'])
+                if order.get('status') == 'open':
+                    await ex.cancel_order(order['id'], leg['symbol'])
+                    order = await ex.fetch_order(order['id'], leg['symbol'])
+        except Exception as e:
+            logger.error(f"Arbitrage leg {leg['side']} {leg['symbol']} on {leg['venue']} tracking failed: {e}")
+        leg.update(order=order, filled=order.get('filled') or 0.0, average=order.get('average'))
+        self._invalidate(user_id, leg['venue'])
+        return leg
+
+    async def _market(self, user_id: int, role: str, venue: str, symbol: str, side: str, amount: float) -> Dict:
+        """Рыночный ордер на перекос (``role`` — hedge или unwind)"""
+        leg = {'side': side, 'venue': venue, 'symbol': symbol, 'amount': amount, 'role': role}
+        try:
+            async with self._client(user_id, venue) as ex:
+                order = await ex.create_order(symbol, 'market', side, amount)
+            leg.update(order=order, filled=order.get('filled') or 0.0, average=order.get('average'), error=None)
+        except Exception as e:
+            logger.error(f"Arbitrage {role} {side} {amount} {symbol} on {venue} failed: {e}")
+            leg.update(order=None, filled=0.0, average=None, error=str(e))
+        self._invalidate(user_id, venue)
+        return leg
+
+    async def _rebalance(self, user_id: int, buy: Dict, sell: Dict) -> Dict:
+        """Хедж или откат перекоса между ногами"""
+        imbalance = buy['filled'] - sell['filled']
+        if imbalance > 0:
+            # Купили больше, чем продали: досылаем продажу, иначе продаём обратно
+            hedge = (sell['venue'], sell['symbol'], 'sell')
+            unwind = (buy['venue'], buy['symbol'], 'sell')
+        else:
+            hedge = (buy['venue'], buy['symbol'], 'buy')
+            unwind = (sell['venue'], sell['symbol'], 'buy')
+        excess = abs(imbalance)
+        orders = [await self._market(user_id, 'hedge', *hedge, excess)]
+        hedged, unwound = orders[0]['filled'], 0.0
+        if excess - hedged > 1e-12:
+            orders.append(await self._market(user_id, 'unwind', *unwind, excess - hedged))
+            unwound = orders[1]['filled']
+        return {
+            'imbalance': imbalance,
+            'hedged': hedged,
+            'unwound': unwound,
+            'open_exposure': excess - hedged - unwound,
+            'orders': orders
+        }
+
+    async def execute(self, user_id: int, opportunity: Dict, amount: float) -> Dict:
+        """Исполнение возможности на ``amount`` базовой валюты.
+
+        Статус результата: ``filled`` — обе ноги исполнены полностью,
+        ``partial`` — ноги исполнены частично, но равно, ``hedged`` /
+        ``unwound`` — перекос закрыт хеджем или откатом, ``exposed`` —
+        перекос закрыть не удалось, ``failed`` — ничего не исполнено.
+        """
+        signal_at = time.monotonic()
+        if opportunity.get('detected_at'):
+            signal_at -= max(0.0, time.time() - opportunity['detected_at'])
+        buy, sell = self._legs(opportunity, amount)
+        if buy['amount'] <= 0:
+            self.outcomes['rejected'] += 1
+            return {'status': 'rejected', 'legs': [buy, sell], 'message': "Amount below venue minimums"}
+
+        try:
+            reservation = await self._reserve(user_id, buy)
+        except Exception as e:
+            self.outcomes['rejected'] += 1
+            logger.warning(f"Arbitrage {opportunity['symbol']} for user {user_id} rejected: {e}")
+            return {'status': 'rejected', 'legs': [buy, sell], 'message': str(e)}
+
+        await asyncio.gather(self._place(user_id, buy, signal_at), self._place(user_id, sell, signal_at))
+        if reservation is not None:
+            if buy['order']:
+                self.exchange_manager.balances.acknowledge(reservation, buy['order'].get('id'))
+            else:
+                self.exchange_manager.balances.release(reservation)
+        await asyncio.gather(self._settle(user_id, buy), self._settle(user_id, sell))
+
+        rebalance = None
+        if abs(buy['filled'] - sell['filled']) > 1e-12:
+            rebalance = await self._rebalance(user_id, buy, sell)
+            if rebalance['open_exposure'] > 1e-12:
+                status = 'exposed'
+            elif rebalance['unwound'] > 0:
+                status = 'unwound'
+            else:
+                status = 'hedged'
+        elif buy['filled'] <= 0:
+            status = 'failed'
+        elif buy['filled'] >= buy['amount'] - 1e-12:
+            status = 'filled'
+        else:
+            status = 'partial'
+
+        self.outcomes[status] += 1
+        result = {
+            'status': status,
+            'symbol': opportunity['symbol'],
+            'amount': buy['amount'],
+            'legs': [buy, sell],
+            'rebalance': rebalance,
+            'signal_to_ack_ms': {
+                leg['side']: leg.get('signal_to_ack_ms') for leg in (buy, sell)
+            }
+        }
+        if status == 'exposed':
+            logger.error(f"Arbitrage {opportunity['symbol']} for user {user_id} left "
+                         f"{rebalance['open_exposure']} unhedged")
+        else:
+            logger.info(f"Arbitrage {opportunity['symbol']} for user {user_id}: {status}, "
+                        f"bought {buy['filled']} sold {sell['filled']}")
+        return result
+
+    @staticmethod
+    def fills(result: Dict) -> List[Dict]:
+        """Все исполненные ордера результата: обе ноги, хедж и откат"""
+        orders = list(result['legs'])
+        if result.get('rebalance'):
+            orders += result['rebalance']['orders']
+        return [order for order in orders if order.get('filled', 0) > 0]
+
+    async def record(self, user_id: int, result: Dict) -> int:
+        """Запись исполненных ордеров в ``trades``.
+
+        Каждый ордер — отдельная строка со своей стороной и средней ценой.
+        Если перекос закрыть не удалось, строки остаются ``open``.
+        """
+        status = 'open' if result['status'] == 'exposed' else 'closed'
+        rows = []
+        for order in self.fills(result):
+            ex_type = order['venue'].rsplit('_', 1)[1]
+            rows.append((
+                user_id, order['symbol'], order['venue'], order['filled'], order['average'],
+                ex_type, 'long' if order['side'] == 'buy' else 'short',
+                # Плечо фьючерсной ноги задаётся настройкой аккаунта и здесь неизвестно
+                1 if ex_type == 'spot' else None,
+                status
+            ))
+        if rows:
+            await db.execute_many(
+                '''INSERT INTO trades
+                (user_id, symbol, exchange, amount, entry_price, type, direction, leverage, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                rows
+            )
+        return len(rows)
+
+    def stats(self) -> Dict[str, float]:
+        """Исходы исполнений и задержка сигнал → подтверждение ноги, мс"""
+        latencies = sorted(self._latencies)
+        result = dict(self.outcomes)
+        if latencies:
+            result.update({
+                'signal_to_ack_p50_ms': latencies[len(latencies) // 2] * 1000,
+                'signal_to_ack_p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+                'signal_to_ack_max_ms': latencies[-1] * 1000
+            })
+        return result
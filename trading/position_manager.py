@@ -12,6 +12,15 @@ class PositionManager:
     def __init__(self, exchange_manager = ExchangeManager):
         self.exchange_manager = exchange_manager
 
+    async def _get_ticker(self, exchange: str, symbol: str) -> Dict:
+        """Тикер из потокового кэша или через REST"""
+        ex_type = self.exchange_manager.market_type(symbol, exchange)
+        ticker = self.exchange_manager.live.get_ticker(f"{exchange}_{ex_type}", symbol)
+        if ticker is not None:
+            return ticker
+        async with self.exchange_manager.get_exchange(exchange, ex_type) as ex:
+            return await ex.fetch_ticker(symbol)
+
     async def get_open_positions(self, user_id: int) -> List[Dict]:
         """Получение всех открытых позиций пользователя"""
         try:
@@ -31,30 +40,29 @@ class PositionManager:
                 
                 # Получаем текущую цену
                 try:
-                    async with self.exchange_manager.get_exchange(exchange) as ex:
-                        ticker = await ex.fetch_ticker(symbol)
-                        current_price = ticker['last']
-                        
-                        # Рассчитываем PnL
-                        pnl = None
-                        if entry_price and current_price:
-                            if direction == 'long':
-                                pnl = (current_price - entry_price) * amount
-                            else:
-                                pnl = (entry_price - current_price) * amount
-                                
-                        positions.append({
-                            'position_id': position_id,
-                            'symbol': symbol,
-                            'exchange': exchange,
-                            'direction': direction,
-                            'amount': amount,
-                            'entry_price': entry_price,
-                            'entry_time': entry_time,
-                            'current_price': current_price,
-                            'pnl': pnl,
-                            'pnl_percent': (pnl / (entry_price * amount) * 100 if pnl and entry_price else None)
-                        })
+                    ticker = await self._get_ticker(exchange, symbol)
+                    current_price = ticker['last']
+                    
+                    # Рассчитываем PnL
+                    pnl = None
+                    if entry_price and current_price:
+                        if direction == 'long':
+                            pnl = (current_price - entry_price) * amount
+                        else:
+                            pnl = (entry_price - current_price) * amount
+                            
+                    positions.append({
+                        'position_id': position_id,
+                        'symbol': symbol,
+                        'exchange': exchange,
+                        'direction': direction,
+                        'amount': amount,
+                        'entry_price': entry_price,
+                        'entry_time': entry_time,
+                        'current_price': current_price,
+                        'pnl': pnl,
+                        'pnl_percent': (pnl / (entry_price * amount) * 100 if pnl and entry_price else None)
+                    })
                 except Exception as e:
                     logger.error(f"Error getting price for {symbol}: {e}")
                     continue
@@ -85,19 +93,8 @@ class PositionManager:
             order_result = None
             
             try:
-                async with self.exchange_manager.get_exchange(exchange) as ex:
-                    # Получаем API ключи пользователя
-                    user_data = await db.fetch(
-                        "SELECT api_keys FROM users WHERE user_id = ?",
-                        (user_id,)
-                    )
-                    
-                    if user_data and user_data[0][0]:
-                        api_keys = json.loads(user_data[0][0])
-                        if exchange in api_keys:
-                            ex.apiKey = api_keys[exchange]['key']
-                            ex.secret = api_keys[exchange]['secret']
-                    
+                ex_type = self.exchange_manager.market_type(symbol, exchange)
+                async with self.exchange_manager.user_clients.client(user_id, exchange, ex_type) as ex:
                     order_result = await ex.create_order(
                         symbol=symbol,
                         type='market',
@@ -106,6 +103,7 @@ class PositionManager:
                     )
                     
                     if order_result:
+                        self.exchange_manager.balances.invalidate((user_id, exchange, ex_type))
                         # Обновляем статус позиции в БД
                         await db.execute(
                             "UPDATE positions SET status = 'closed', exit_price = ?, exit_time = ? "
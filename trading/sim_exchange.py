@@ -0,0 +1,119 @@
+import asyncio
+import itertools
+import random
+import time
+import ccxt
+from typing import Dict, List, Optional
+
+
+class SimulatedExchange:
+    """Локальная биржа с интерфейсом ордеров ccxt для проверки исполнения.
+
+    Ордер исполняется по заданному стакану с учётом лимитной цены: рыночный
+    и IOC — сразу на доступный объём (остаток отменяется), обычный
+    лимитный — сразу частично, остаток висит до ``cancel_order``.
+    ``fill_ratio`` ограничивает долю объёма, исполняемую сразу,
+    ``latency`` — задержка ответа, ``reject`` — ошибка при выставлении,
+    ``balance`` — свободные остатки по валютам для ``fetch_balance``.
+    """
+
+    def __init__(self, name: str, books: Optional[Dict[str, Dict[str, List[List[float]]]]] = None,
+                 latency: float = 0.0, fill_ratio: float = 1.0, reject: bool = False,
+                 jitter: float = 0.0, seed: int = 0, balance: Optional[Dict[str, float]] = None):
+        self.id = name
+        self.books = books or {}
+        self.latency = latency
+        self.fill_ratio = fill_ratio
+        self.reject = reject
+        self.jitter = jitter
+        self.balance = dict(balance or {})
+        self.orders: Dict[str, Dict] = {}
+        self._ids = itertools.count(1)
+        self._rng = random.Random(seed)
+
+    def set_book(self, symbol: str, bids: List[List[float]], asks: List[List[float]]) -> None:
+        self.books[symbol] = {'bids': [list(level) for level in bids], 'asks': [list(level) for level in asks]}
+
+    async def _delay(self) -> None:
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def _match(self, symbol: str, side: str, amount: float, price: Optional[float]) -> List[List[float]]:
+        """Снятие объёма со стакана; возвращает исполненные уровни [цена, объём]"""
+        levels = self.books.get(symbol, {}).get('asks' if side == 'buy' else 'bids', [])
+        fills = []
+        while levels and amount > 1e-12:
+            level_price, level_amount = levels[0]
+            if price is not None and (level_price > price if side == 'buy' else level_price < price):
+                break
+            take = min(amount, level_amount)
+            fills.append([level_price, take])
+            amount -= take
+            if take >= level_amount - 1e-12:
+                levels.pop(0)
+            else:
+                levels[0][1] -= take
+        return fills
+
+    async def create_order(self, symbol: str, type: str, side: str, amount: float,
+                           price: Optional[float] = None, params: Optional[Dict] = None) -> Dict:
+        await self._delay()
+        if self.reject:
+            raise ccxt.InsufficientFunds(f"{self.id} rejected {side} {amount} {symbol}")
+        params = params or {}
+        immediate = type == 'market' or params.get('timeInForce') in ('IOC', 'FOK')
+        fills = self._match(symbol, side, amount * self.fill_ratio, None if type == 'market' else price)
+        filled = sum(level_amount for _, level_amount in fills)
+        cost = sum(level_price * level_amount for level_price, level_amount in fills)
+        order = {
+            'id': f"{self.id}-{next(self._ids)}",
+            'symbol': symbol,
+            'type': type,
+            'side': side,
+            'amount': amount,
+            'price': price,
+            'filled': filled,
+            'remaining': amount - filled,
+            'cost': cost,
+            'average': cost / filled if filled else None,
+            'status': 'closed' if filled >= amount - 1e-12 else ('canceled' if immediate else 'open'),
+            'timestamp': int(time.time() * 1000)
+        }
+        self.orders[order['id']] = order
+        return dict(order)
+
+    async def fetch_balance(self, params: Optional[Dict] = None) -> Dict:
+        await self._delay()
+        return {'free': dict(self.balance), 'total': dict(self.balance)}
+
+    async def fetch_order(self, id: str, symbol: Optional[str] = None, params: Optional[Dict] = None) -> Dict:
+        await self._delay()
+        if id not in self.orders:
+            raise ccxt.OrderNotFound(f"{self.id} has no order {id}")
+        return dict(self.orders[id])
+
+    async def cancel_order(self, id: str, symbol: Optional[str] = None, params: Optional[Dict] = None) -> Dict:
+        await self._delay()
+        order = self.orders.get(id)
+        if order is None:
+            raise ccxt.OrderNotFound(f"{self.id} has no order {id}")
+        if order['status'] == 'open':
+            order['status'] = 'canceled'
+        return dict(order)
+
+    def fill_open(self, id: str, amount: Optional[float] = None) -> None:
+        """Исполнение висящего остатка ордера (например, пришедшим встречным объёмом)"""
+        order = self.orders[id]
+        if order['status'] != 'open':
+            return
+        take = min(order['remaining'], amount if amount is not None else order['remaining'])
+        order['cost'] += take * (order['price'] or order['average'] or 0)
+        order['filled'] += take
+        order['remaining'] -= take
+        order['average'] = order['cost'] / order['filled']
+        if order['remaining'] <= 1e-12:
+            order['status'] = 'closed'
+
+    async def close(self) -> None:
+        pass
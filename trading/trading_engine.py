@@ -1,58 +1,84 @@
-import ccxt
+import asyncio
 import logging
 import json
+import time
 import numpy as np
 from datetime import datetime
 from typing import Dict, Optional, List
 from config.settings import Config
 from database.db_manager import db
+from exchanges.coalescing import SingleFlight
 from analysis.analyzer import AIAnalyzer
 from analysis.risk_manager import RiskManager
 from analysis.liquidity import LiquidityAnalyzer
 from strategies.arbitrage import ArbitrageEngine
+from strategies.depth_arbitrage import DepthArbitrageEngine
+from strategies.opportunity_registry import OpportunityRegistry
+from trading.arbitrage_executor import ArbitrageExecutor
 
 logger = logging.getLogger(__name__)
 
+
+class AnalysisSnapshot:
+    """Результат анализа рынка за один цикл.
+
+    Неизменяемый после построения: пользователи одного цикла торгуют по
+    одной и той же версии, следующий цикл создаёт новую.
+    """
+
+    def __init__(self, version: int, analyses: Dict[str, Dict], duration: float):
+        self.version = version
+        self.created_at = time.time()
+        self.analyses = analyses
+        self.duration = duration
+
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+    def get(self, symbol: str) -> Optional[Dict]:
+        return self.analyses.get(symbol)
+
+
 class TradingEngine:
-    def __init__(self, exchange_manager):
+    def __init__(self, exchange_manager, registry: Optional[OpportunityRegistry] = None):
+        """``registry`` — реестр возможностей, общий с мониторингом: через его
+        захваты возможность не исполняется для пользователя дважды"""
         self.exchange_manager = exchange_manager
+        self.registry = registry or OpportunityRegistry()
         self.ai = AIAnalyzer(self.exchange_manager)
         self.risk_manager = RiskManager(exchange_manager)
         self.liquidity_analyzer = LiquidityAnalyzer(exchange_manager)
         self.arbitrage_engine = ArbitrageEngine(exchange_manager)
+        self.depth_engine = DepthArbitrageEngine(self.liquidity_analyzer)
+        self.executor = ArbitrageExecutor(exchange_manager)
+        self.snapshot: Optional[AnalysisSnapshot] = None
+        self._snapshot_flight = SingleFlight()
     def _create_default_exchange_manager(self):
         from .exchange import ExchangeManager
         return ExchangeManager()
 
+    @staticmethod
+    def _settings(row) -> dict:
+        return {
+            'api_keys': json.loads(row[0]) if row[0] else {},
+            'risk_level': row[1],
+            'auto_trading': row[2],
+            'strategy': row[3]
+        }
+
     async def get_user_settings(self, user_id: int) -> dict:
         """Получаем настройки пользователя"""
         user_data = await db.fetch(
             "SELECT api_keys, risk_level, auto_trading, trading_strategy FROM users WHERE user_id = ?",
             (user_id,)
         )
-        return {
-            'api_keys': json.loads(user_data[0][0]) if user_data[0][0] else {},
-            'risk_level': user_data[0][1],
-            'auto_trading': user_data[0][2],
-            'strategy': user_data[0][3]
-        }
+        return self._settings(user_data[0])
 
     async def initialize_exchange(self, user_id: int, exchange_name: str, symbol: str):
-        """Инициализация подключения к бирже"""
+        """Авторизованный клиент пользователя из общего пула"""
+        ex_type = self.exchange_manager.market_type(symbol, exchange_name)
         try:
-            settings = await self.get_user_settings(user_id)
-            api_keys = settings['api_keys']
-            
-            if exchange_name not in api_keys:
-                raise ValueError(f"API keys for {exchange_name} not configured")
-
-            exchange_class = getattr(ccxt, exchange_name)
-            return exchange_class({
-                'apiKey': api_keys[exchange_name]['key'],
-                'secret': api_keys[exchange_name]['secret'],
-                'enableRateLimit': True,
-                'options': {'defaultType': 'future'} if ':USDT' in symbol else {}
-            })
+            return await self.exchange_manager.user_clients.get(user_id, exchange_name, ex_type)
         except Exception as e:
             logger.error(f"Exchange init error: {e}")
             raise
@@ -61,26 +87,39 @@ class TradingEngine:
                           side: str, amount: float, order_type: str = 'market',
                           price: float = None, params: dict = None) -> Dict:
         """Выполнение торговой операции"""
+        ex_type = self.exchange_manager.market_type(symbol, exchange)
         try:
-            ex = await self.initialize_exchange(user_id, exchange, symbol)
-            
-            # Проверка баланса для ордеров на покупку
-            if side == 'buy':
-                balance = await ex.fetch_balance()
-                usdt_balance = balance['free'].get('USDT', 0)
-                required_amount = amount * (price or 1)
-                if usdt_balance < required_amount:
-                    raise ValueError(f"Insufficient USDT balance. Need {required_amount}, have {usdt_balance}")
-
-            # Создание ордера
-            order = await ex.create_order(
-                symbol,
-                order_type,
-                side,
-                amount,
-                price,
-                params or {}
-            )
+            balances = self.exchange_manager.balances
+            account = (user_id, exchange, ex_type)
+            reservation = None
+            async with self.exchange_manager.user_clients.client(user_id, exchange, ex_type) as ex:
+                # Проверка баланса для ордеров на покупку (по кэшу, без запроса к бирже)
+                if side == 'buy':
+                    usdt_balance = await balances.available(
+                        account, 'USDT', self.exchange_manager.user_clients.balance_loader(*account)
+                    )
+                    required_amount = amount * (price or 1)
+                    if usdt_balance < required_amount:
+                        raise ValueError(f"Insufficient USDT balance. Need {required_amount}, have {usdt_balance}")
+                    reservation = balances.reserve(account, 'USDT', required_amount)
+
+                # Создание ордера
+                try:
+                    order = await ex.create_order(
+                        symbol,
+                        order_type,
+                        side,
+                        amount,
+                        price,
+                        params or {}
+                    )
+                except Exception:
+                    if reservation is not None:
+                        balances.release(reservation)
+                    raise
+                if reservation is not None:
+                    balances.acknowledge(reservation, order.get('id'))
+            balances.invalidate(account)
             
             return {
                 'status': 'filled',
@@ -95,8 +134,8 @@ class TradingEngine:
             logger.error(f"Trade execution error: {e}")
             return {'status': 'error', 'message': str(e)}
 
-    async def analyze_market(self, symbol: str) -> Optional[Dict]:
-        """Полный анализ рынка для символа"""
+    async def analyze_market(self, symbol: str, prices: Optional[Dict[str, Dict]] = None) -> Optional[Dict]:
+        """Полный анализ рынка для символа (``prices`` — котировки из общего среза)"""
         try:
             # 1. Проверка ликвидности
             liquidity = await self.liquidity_analyzer.get_liquidity_score(symbol, 'binance')
@@ -109,11 +148,16 @@ class TradingEngine:
                 return None
 
             # 3. Поиск арбитражных возможностей
-            opportunity = await self.arbitrage_engine.find_opportunities(symbol)
+            opportunity = await self.arbitrage_engine.find_opportunities(symbol, prices)
             if not opportunity:
                 return None
 
-            # 4. Проверка рисков
+            # 4. Исполнимость по глубине стаканов
+            opportunity = await self.depth_engine.evaluate(opportunity)
+            if not opportunity:
+                return None
+
+            # 5. Проверка рисков
             if not await self.risk_manager.validate_opportunity(opportunity):
                 return None
 
@@ -127,7 +171,88 @@ class TradingEngine:
             logger.error(f"Market analysis error for {symbol}: {e}")
             return None
 
-    async def auto_trade(self, user_id: int):
+    async def _build_snapshot(self, symbols: List[str]) -> AnalysisSnapshot:
+        started = time.monotonic()
+        market = await self.exchange_manager.get_snapshot(symbols)
+        limit = asyncio.Semaphore(Config.ANALYSIS_CONCURRENCY)
+
+        async def analyze(symbol: str) -> Optional[Dict]:
+            async with limit:
+                return await self.analyze_market(
+                    symbol, self.exchange_manager.snapshot_prices(market, symbol)
+                )
+
+        results = await asyncio.gather(*(analyze(symbol) for symbol in symbols))
+        version = (self.snapshot.version if self.snapshot else 0) + 1
+        snapshot = AnalysisSnapshot(
+            version,
+            {symbol: result for symbol, result in zip(symbols, results) if result},
+            time.monotonic() - started
+        )
+        self.snapshot = snapshot
+        logger.info(f"Market analysis v{version}: {len(snapshot.analyses)} of {len(symbols)} symbols "
+                    f"tradable, {snapshot.duration:.2f}s")
+        return snapshot
+
+    async def analyze_all(self, symbols: Optional[List[str]] = None,
+                          max_age: float = Config.ANALYSIS_SNAPSHOT_TTL) -> AnalysisSnapshot:
+        """Анализ всех символов за цикл.
+
+        Свежий снимок (моложе ``max_age``) переиспользуется, одновременные
+        запросы нового снимка объединяются в одно построение.
+        """
+        symbols = list(symbols or Config.TRADING_PAIRS)
+        if self.snapshot is not None and self.snapshot.age() < max_age:
+            return self.snapshot
+        return await self._snapshot_flight.do(tuple(symbols), lambda: self._build_snapshot(symbols))
+
+    @staticmethod
+    def size_position(opportunity: Dict, risk_level: int) -> Optional[float]:
+        """Объём сделки по уровню риска пользователя (None — ниже минимума)"""
+        risk_multiplier = {1: 0.5, 2: 1.0, 3: 1.5}.get(risk_level, 1.0)
+
+        # Расчет объема позиции
+        max_amount = min(
+            opportunity['volume'] * 0.01 * risk_multiplier,
+            opportunity.get('executable_amount', float('inf')),
+            Config.MAX_ORDER_SIZE / opportunity['buy_price']
+        )
+
+        if max_amount * opportunity['buy_price'] < Config.MIN_ORDER_SIZE:
+            return None
+        return max_amount
+
+    async def trade_snapshot(self, user_id: int, settings: dict, snapshot: AnalysisSnapshot) -> int:
+        """Сделки пользователя по снимку анализа; возвращает их число"""
+        trades = 0
+        for symbol, analysis in snapshot.analyses.items():
+            try:
+                opportunity = analysis['opportunity']
+                max_amount = self.size_position(opportunity, settings['risk_level'])
+                if max_amount is None:
+                    continue
+
+                # Возможность может уже исполняться для пользователя мониторингом
+                if not self.registry.claim(opportunity, user_id):
+                    logger.info(f"Skipping {symbol} for user {user_id}: already being executed")
+                    continue
+                try:
+                    # Выполнение обеих ног
+                    result = await self.executor.execute(user_id, opportunity, max_amount)
+                finally:
+                    self.registry.release(opportunity, user_id)
+
+                # Логирование всех исполненных ордеров, включая хедж и откат
+                if await self.executor.record(user_id, result):
+                    trades += 1
+                    logger.info(f"Trade executed for user {user_id}: {symbol} {result['status']} "
+                                f"(analysis v{snapshot.version})")
+            except Exception as e:
+                logger.error(f"Error processing {symbol} for user {user_id}: {e}")
+                continue
+        return trades
+
+    async def auto_trade(self, user_id: int, snapshot: Optional[AnalysisSnapshot] = None):
         """Основной цикл автоматической торговли"""
         try:
             settings = await self.get_user_settings(user_id)
@@ -135,70 +260,37 @@ class TradingEngine:
                 return
 
             logger.info(f"Starting auto trading for user {user_id}")
-            
-            for symbol in Config.TRADING_PAIRS:
-                try:
-                    analysis = await self.analyze_market(symbol)
-                    if not analysis:
-                        continue
-
-                    opportunity = analysis['opportunity']
-                    risk_multiplier = {1: 0.5, 2: 1.0, 3: 1.5}.get(settings['risk_level'], 1.0)
-                    
-                    # Расчет объема позиции
-                    max_amount = min(
-                        opportunity['volume'] * 0.01 * risk_multiplier,
-                        Config.MAX_ORDER_SIZE / opportunity['buy_price']
-                    )
-
-                    if max_amount * opportunity['buy_price'] < Config.MIN_ORDER_SIZE:
-                        continue
-
-                    # Параметры ордера
-                    params = {
-                        'leverage': Config.DEFAULT_LEVERAGE,
-                        'stopLoss': {
-                            'price': opportunity['buy_price'] * (1 - (0.01 * risk_multiplier)),
-                            'type': 'limit'
-                        },
-                        'takeProfit': {
-                            'price': opportunity['sell_price'] * (1 + (0.02 * risk_multiplier)),
-                            'type': 'limit'
-                        }
-                    }
-
-                    # Выполнение сделки
-                    trade_result = await self.execute_trade(
-                        user_id,
-                        opportunity['buy_exchange'].split('_')[0],
-                        opportunity['symbol'],
-                        'buy',
-                        max_amount,
-                        params=params
-                    )
-
-                    if trade_result['status'] == 'filled':
-                        # Логирование сделки
-                        await db.execute(
-                            '''INSERT INTO trades 
-                            (user_id, symbol, exchange, amount, entry_price,
-                             type, direction, leverage, stop_loss, take_profit, status)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                            (user_id, symbol,
-                             f"{opportunity['buy_exchange']}->{opportunity['sell_exchange']}",
-                             max_amount, trade_result['price'],
-                             'futures' if ':USDT' in symbol else 'spot',
-                             'long',
-                             params['leverage'],
-                             params['stopLoss']['price'],
-                             params['takeProfit']['price'],
-                             'open')
-                        )
-                        
-                        logger.info(f"Trade executed for user {user_id}: {symbol}")
-                except Exception as e:
-                    logger.error(f"Error processing {symbol} for user {user_id}: {e}")
-                    continue
-                    
+            await self.trade_snapshot(user_id, settings, snapshot or await self.analyze_all())
         except Exception as e:
             logger.error(f"Auto trading error for user {user_id}: {e}")
+
+    async def auto_trade_all(self) -> Dict[int, int]:
+        """Автоторговля всех пользователей по одному снимку анализа.
+
+        Анализ выполняется один раз за цикл, затем расчёт объёмов и сделки
+        пользователей идут параллельно. Возвращает число сделок по
+        пользователям.
+        """
+        rows = await db.fetch(
+            "SELECT user_id, api_keys, risk_level, auto_trading, trading_strategy FROM users "
+            "WHERE auto_trading AND api_keys != '{}'"
+        )
+        users = {row[0]: self._settings(row[1:]) for row in rows}
+        users = {user_id: settings for user_id, settings in users.items() if settings['api_keys']}
+        if not users:
+            return {}
+
+        snapshot = await self.analyze_all()
+        if not snapshot.analyses:
+            return {}
+        results = await asyncio.gather(*(
+            self.trade_snapshot(user_id, settings, snapshot) for user_id, settings in users.items()
+        ), return_exceptions=True)
+        trades = {}
+        for user_id, result in zip(users, results):
+            if isinstance(result, Exception):
+                logger.error(f"Auto trading error for user {user_id}: {result}")
+                continue
+            trades[user_id] = result
+        logger.info(f"Auto trading v{snapshot.version}: {sum(trades.values())} trades for {len(users)} users")
+        return trades